@@ -4,7 +4,8 @@
 """
 Gera 'Setores_Indicadores_Censo_22.shp' a partir de:
 - Shapefile de setores censitários 2022 (BR inteiro)
-- Excel agregados do IBGE (varridos em subpastas), usando apenas:
+- Excel agregados do IBGE (varridos em subpastas; também CSV, como publicados pelo IBGE),
+  usando apenas:
     * caracteristicas_domicilio2 (água, esgoto, lixo)
     * cor_ou_raca (percentuais por raça/cor)
 Fluxo:
@@ -22,17 +23,25 @@ Fluxo:
   4) Faz merge por CD_SETOR e salva:
        - (opcional) intermediários: *_indice_calculado.shp
        - final: Setores_Indicadores_Censo_22.shp
+
+Os passos 1–4 estão em `build_indicators`, que devolve o GeoDataFrame sem gravar
+(encadeamento em memória com o script 02, ver `pipelines/pipeline.py chain`).
 """
 
 import argparse
 from pathlib import Path
 import os
 import re
+import sys
 import numpy as np
 import pandas as pd
-import geopandas as gpd
 
-VALID_EXT = (".xlsx", ".xls")
+# Pacote compartilhado (pipelines/common)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common import profiling
+from common.profiling import span
+
+VALID_EXT = (".xlsx", ".xls", ".csv")
 
 
 def find_col(df_or_gdf, candidates, required=True):
@@ -63,9 +72,26 @@ def format_cd_setor(val):
         return s  # devolve como veio se não der pra converter
 
 
+def read_table(path):
+    """
+    Lê uma tabela de agregados: XLSX/XLS pelo pandas; CSV com separador ';' ou ','
+    (detectado no cabeçalho), UTF-8 ou Latin-1, com as colunas como texto.
+    """
+    if not path.lower().endswith(".csv"):
+        return pd.read_excel(path)
+    for encoding in ("utf-8", "latin-1"):
+        try:
+            with open(path, encoding=encoding) as f:
+                header = f.readline()
+            sep = ";" if header.count(";") > header.count(",") else ","
+            return pd.read_csv(path, sep=sep, dtype=str, encoding=encoding)
+        except UnicodeDecodeError:
+            continue
+
+
 def read_and_clean_excels(input_excel_dir):
     """
-    Lê todos XLSX/XLS recursivamente.
+    Lê todos XLSX/XLS/CSV recursivamente.
     - Garante CD_setor como texto normalizado
     - Substitui 'X' por NaN e converte numéricos
     Retorna um dicionário {basename_lower: DataFrame}
@@ -77,7 +103,7 @@ def read_and_clean_excels(input_excel_dir):
                 continue
             path = os.path.join(root, file)
             try:
-                df = pd.read_excel(path)
+                df = read_table(path)
             except Exception as e:
                 print(f"[!] Erro lendo {path}: {e}")
                 continue
@@ -148,29 +174,22 @@ def compute_race_indicators(df):
     return pd.DataFrame(out)
 
 
-def main():
-    ap = argparse.ArgumentParser(
-        description="Gera Setores_Indicadores_Censo_22.shp a partir de Excel agregados (domicílio e raça/cor)."
-    )
-    ap.add_argument("--input-excel-dir", required=True, help="Pasta-raiz dos Excel agregados (varre subpastas).")
-    ap.add_argument("--sectors-shp", required=True, help="Shapefile de setores 2022 (Brasil inteiro).")
-    ap.add_argument("--out-dir", required=True, help="Pasta de saída dos arquivos gerados.")
-    ap.add_argument("--emit-intermediate", action="store_true",
-                    help="Se definido, salva shapefiles intermediários *_indice_calculado.shp.")
-    args = ap.parse_args()
-
-    input_excel_dir = Path(args.input_excel_dir)
-    sectors_shp = Path(args.sectors_shp)
-    out_dir = Path(args.out_dir); out_dir.mkdir(parents=True, exist_ok=True)
-
-    # Arquivos de saída
-    FINAL_SHP = out_dir / "Setores_Indicadores_Censo_22.shp"
-    DOM_INTER = out_dir / "Agregados_por_setores_caracteristicas_domicilio2_BR_indice_calculado.shp"
-    RACA_INTER = out_dir / "Agregados_por_setores_cor_ou_raca_BR_indice_calculado.shp"
+def build_indicators(sectors, input_excel_dir):
+    """
+    Setores 2022 (`sectors`: caminho do shapefile ou GeoDataFrame) acrescidos dos indicadores
+    de domicílio e raça/cor calculados a partir dos Excel de `input_excel_dir`.
+    Retorna o GeoDataFrame (sem gravar), para uso direto pelo script 02.
+    """
+    import geopandas as gpd
 
     # 1) Carrega shapefile base
-    print(f"🔄 Lendo shapefile base: {sectors_shp}")
-    gdf = gpd.read_file(sectors_shp)
+    if isinstance(sectors, gpd.GeoDataFrame):
+        gdf = sectors.copy()
+    else:
+        print(f"🔄 Lendo shapefile base: {sectors}")
+        with span('read', path=sectors) as step:
+            gdf = gpd.read_file(sectors)
+            step.count(rows_out=len(gdf))
     # padroniza ID
     cd_setor_g = find_col(gdf, ["CD_SETOR", "CDSETOR", "CD_SETOR_2022"])
     gdf[cd_setor_g] = gdf[cd_setor_g].apply(format_cd_setor).astype(str)
@@ -178,7 +197,9 @@ def main():
 
     # 2) Lê excéis
     print(f"\n📁 Lendo Excel agregados em: {input_excel_dir} (varredura recursiva)")
-    excels = read_and_clean_excels(str(input_excel_dir))
+    with span('read', path=input_excel_dir, source='excel') as step:
+        excels = read_and_clean_excels(str(input_excel_dir))
+        step.count(files=len(excels), rows_out=sum(len(df) for df in excels.values()))
 
     # 3) Localiza os dois conjuntos de interesse (por padrão, usa 'contains' no nome)
     #    - caracteristicas_domicilio2
@@ -198,22 +219,55 @@ def main():
         raise SystemExit("Não encontrei arquivo de 'cor_ou_raca' nas subpastas.")
 
     # 4) Calcula indicadores
-    print("\n🧮 Calculando indicadores de domicílio (P_Agua, P_Esgo, P_Lixo)…")
-    dom_idx = compute_domicile_indicators(df_dom)
+    with span('aggregate', step='indicadores', rows_in=len(df_dom) + len(df_rac)):
+        print("\n🧮 Calculando indicadores de domicílio (P_Agua, P_Esgo, P_Lixo)…")
+        dom_idx = compute_domicile_indicators(df_dom)
 
-    print("🧮 Calculando indicadores de raça/cor (% por raça)…")
-    rac_idx = compute_race_indicators(df_rac)
+        print("🧮 Calculando indicadores de raça/cor (% por raça)…")
+        rac_idx = compute_race_indicators(df_rac)
 
     # 5) Merges por CD_SETOR
     print("\n🔗 Integrando ao shapefile por CD_SETOR…")
-    gdf = gdf.merge(dom_idx, left_on=cd_setor_g, right_on="CD_setor", how="left")
-    gdf.drop(columns=["CD_setor"], inplace=True)
+    with span('aggregate', step='merge', rows_in=len(gdf)) as step:
+        gdf = gdf.merge(dom_idx, left_on=cd_setor_g, right_on="CD_setor", how="left")
+        gdf.drop(columns=["CD_setor"], inplace=True)
+
+        gdf = gdf.merge(rac_idx, left_on=cd_setor_g, right_on="CD_setor", how="left")
+        gdf.drop(columns=["CD_setor"], inplace=True)
+        step.count(rows_out=len(gdf))
+    return gdf
+
+
+def main():
+    ap = argparse.ArgumentParser(
+        description="Gera Setores_Indicadores_Censo_22.shp a partir de Excel agregados (domicílio e raça/cor)."
+    )
+    ap.add_argument("--input-excel-dir", required=True, help="Pasta-raiz dos Excel agregados (varre subpastas).")
+    ap.add_argument("--sectors-shp", required=True, help="Shapefile de setores 2022 (Brasil inteiro).")
+    ap.add_argument("--out-dir", required=True, help="Pasta de saída dos arquivos gerados.")
+    ap.add_argument("--emit-intermediate", action="store_true",
+                    help="Se definido, salva shapefiles intermediários *_indice_calculado.shp.")
+    profiling.add_profile_argument(ap)
+    args = ap.parse_args()
+    profiling.setup(args)
 
-    gdf = gdf.merge(rac_idx, left_on=cd_setor_g, right_on="CD_setor", how="left")
-    gdf.drop(columns=["CD_setor"], inplace=True)
+    input_excel_dir = Path(args.input_excel_dir)
+    sectors_shp = Path(args.sectors_shp)
+    out_dir = Path(args.out_dir); out_dir.mkdir(parents=True, exist_ok=True)
+
+    # Arquivos de saída
+    FINAL_SHP = out_dir / "Setores_Indicadores_Censo_22.shp"
+    DOM_INTER = out_dir / "Agregados_por_setores_caracteristicas_domicilio2_BR_indice_calculado.shp"
+    RACA_INTER = out_dir / "Agregados_por_setores_cor_ou_raca_BR_indice_calculado.shp"
+
+    # 1–5) Setores + indicadores
+    gdf = build_indicators(sectors_shp, input_excel_dir)
+    cd_setor_g = find_col(gdf, ["CD_SETOR", "CDSETOR", "CD_SETOR_2022"])
 
     # 6) (opcional) intermediários
     if args.emit_intermediate:
+        import geopandas as gpd
+
         # Precisamos de geometria para salvar como SHP
         # DOM
         dom_geo = gdf[[cd_setor_g, "geometry", "P_Agua", "P_Esgo", "P_Lixo"]].copy()
@@ -229,7 +283,8 @@ def main():
         print(f"💾 Intermediário (raça): {RACA_INTER}")
 
     # 7) Salva final
-    gdf.to_file(FINAL_SHP)
+    with span('write', path=FINAL_SHP, rows_in=len(gdf)):
+        gdf.to_file(FINAL_SHP)
     print(f"\n🎯 Arquivo final salvo: {FINAL_SHP}")
     print("✅ Concluído.")
 
@@ -2,26 +2,49 @@
 # -*- coding: utf-8 -*-
 
 """
-02) Harmoniza RpC (renda per capita) de 2010 para os setores 2022 por ponderação de área.
+02) Harmoniza RpC (renda per capita) de 2010 para os setores 2022 por ponderação de área
+    ou dasimétrica (população ou mancha urbana de 2022).
 - Entrada A: Setores 2022 com indicadores (saída do Script 01) -> Setores_Indicadores_Censo_22.shp
 - Entrada B: Setores 2010 com a coluna RpC (ou nome similar)
-- Saída   : Setores_raca_renda.shp  (mesma malha 2022, acrescida da coluna 'RpC_2010')
+- Saída   : Setores_raca_renda.shp  (mesma malha 2022, acrescida da coluna 'RpC_2010');
+            com extensão .parquet, grava GeoParquet tipado (ver pipelines/common/schema.py)
 
 Notas:
 - Ponderação de área é feita em CRS de área equivalente (Brazil Albers).
+- `--method` (ver pipelines/common/areal_weights.py):
+    area       → área do pedaço / área do setor 2010 (padrão, regra original);
+    population → o RpC de cada setor 2010 é repartido pela população 2022 (v0001) dos pedaços;
+    urban      → idem, pela área dos pedaços em setores 2022 urbanos (CD_SITU 1/2).
+  A interseção 2010×2022 vira uma matriz esparsa de áreas (STRtree); os pesos de cada método
+  são uma normalização vetorizada dessa matriz e a RpC harmonizada, um produto matriz-vetor.
+- `--approx-cell METROS` (exploratório): a matriz de áreas vem da rasterização das duas malhas
+  numa grade Albers comum, em ladrilhos, em vez do overlay exato; o erro em relação ao exato
+  é medido e impresso para uma amostra de `--approx-sample` setores 2022.
 - Não usa RpC_25 (foi removido).
 - Merge final é por ID (CD_SETOR), preservando geometria/CRS original do arquivo 2022.
+- `harmonize_income` aceita GeoDataFrames e devolve o resultado sem gravar (encadeamento
+  em memória 01 → 02 → 03, ver `pipelines/pipeline.py chain`).
 """
 
 import argparse
 from pathlib import Path
 import re
+import sys
 
-import geopandas as gpd
 import pandas as pd
 import numpy as np
 
-ALBERS_BR = "+proj=aea +lat_1=-5 +lat_2=-42 +lat_0=-25 +lon_0=-55 +x_0=0 +y_0=0 +ellps=GRS80 +units=m +no_defs"
+# Pacote compartilhado (pipelines/common)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common import profiling
+from common.areal_weights import (ALBERS_BR, METHODS, intersection_areas, interpolate,
+                                  raster_intersection_areas, sample_error, target_density,
+                                  urban_mask, weight_matrix)
+from common.profiling import span, timed
+from common.schema import apply_sector_schema, write_sectors
+
+# Modo aproximado: setores 2022 da amostra comparada ao overlay exato
+APPROX_SAMPLE = 500
 
 
 def find_col(df_or_gdf, candidates, required=True):
@@ -50,6 +73,7 @@ def format_cd_setor(val):
         return s
 
 
+@timed('repair')
 def fix_geoms(gdf):
     gdf = gdf.copy()
     gdf["geometry"] = gdf.geometry.apply(
@@ -58,31 +82,35 @@ def fix_geoms(gdf):
     return gdf
 
 
-def main():
-    ap = argparse.ArgumentParser(
-        description="Harmoniza RpC (2010) para a malha de setores 2022 por ponderação de área (Brazil Albers)."
-    )
-    ap.add_argument("--in-2022", required=True,
-                    help="Shapefile 2022 com indicadores (saída do Script 01): Setores_Indicadores_Censo_22.shp")
-    ap.add_argument("--in-2010", required=True,
-                    help="Shapefile 2010 com a coluna de RpC (ex.: Pessoa_Renda_Resultado.shp)")
-    ap.add_argument("--rpc-col", default="RpC",
-                    help="Nome da coluna de renda per capita no arquivo de 2010 (default: RpC)")
-    ap.add_argument("--out", required=True,
-                    help="Caminho de saída (ex.: .../Setores_raca_renda.shp)")
-    args = ap.parse_args()
+def _as_frame(source, label):
+    import geopandas as gpd
+
+    if isinstance(source, gpd.GeoDataFrame):
+        return source.copy()
+    print(f"🔄 Lendo {label}: {source}")
+    with span('read', path=source) as step:
+        gdf = gpd.read_file(source)
+        step.count(rows_out=len(gdf))
+    return gdf
+
 
-    p2022 = Path(args.in_2022)
-    p2010 = Path(args.in_2010)
-    pout  = Path(args.out)
+def harmonize_income(sectors_2022, sectors_2010, rpc_col="RpC", method="area",
+                     approx_cell=None, approx_sample=APPROX_SAMPLE):
+    """
+    Acrescenta `RpC_2010` aos setores 2022 (ponderação `method`: area, population ou urban)
+    e aplica o esquema tipado. `sectors_2022`/`sectors_2010` podem ser caminhos ou
+    GeoDataFrames (ex.: o resultado de `build_indicators` do script 01); retorna o
+    GeoDataFrame sem gravar. Com `approx_cell` (metros), usa a rasterização no lugar do
+    overlay exato e imprime o erro numa amostra de `approx_sample` setores (0 = sem amostra).
+    """
+    if method not in METHODS:
+        raise ValueError(f"Método de ponderação desconhecido: {method!r} (disponíveis: {METHODS})")
 
     # 1) Ler arquivos
-    print(f"🔄 Lendo 2022: {p2022}")
-    c22 = gpd.read_file(p2022)
+    c22 = _as_frame(sectors_2022, "2022")
     print(f"   Linhas 2022: {len(c22)}")
 
-    print(f"🔄 Lendo 2010: {p2010}")
-    c10 = gpd.read_file(p2010)
+    c10 = _as_frame(sectors_2010, "2010")
     print(f"   Linhas 2010: {len(c10)}")
 
     # 2) IDs e coluna RpC
@@ -90,49 +118,101 @@ def main():
     c22[id22] = c22[id22].apply(format_cd_setor).astype(str)
     c22["id_setor"] = c22[id22]  # chave estável
 
-    rpc10 = find_col(c10, [args.rpc_col, args.rpc_col.lower()], required=True)
+    rpc10 = find_col(c10, [rpc_col, rpc_col.lower()], required=True)
 
     # 3) Guardar CRS original de 2022 para a escrita final
     crs_out = c22.crs
 
     # 4) Reprojetar para CRS de área equivalente + corrigir geometrias
     print("📐 Reprojetando para Brazil Albers (área equivalente) e corrigindo geometrias…")
-    c22_a = fix_geoms(c22.to_crs(ALBERS_BR))
-    c10_a = fix_geoms(c10.to_crs(ALBERS_BR))
-
-    # 5) Área original 2010
-    c10_a["area_2010"] = c10_a.geometry.area
-
-    # 6) Interseção 22×10 (mantém atributos de ambos)
-    print("🔀 Calculando overlay (intersection) 2022×2010…")
-    inter = gpd.overlay(
-        c22_a[["id_setor", "geometry"]],
-        c10_a[[rpc10, "area_2010", "geometry"]],
-        how="intersection"
-    )
-    if inter.empty:
+    with span('reproject', rows_in=len(c22) + len(c10)):
+        c22_a = c22.to_crs(ALBERS_BR)
+        c10_a = c10.to_crs(ALBERS_BR)
+    c22_a = fix_geoms(c22_a)
+    c10_a = fix_geoms(c10_a)
+
+    # 5) Áreas originais 2010 e 2022 e peso por unidade de área dos setores 2022
+    area_2010 = c10_a.geometry.area.to_numpy()
+    population = urban = None
+    if method == "population":
+        pop_col = find_col(c22, ["v0001", "V0001", "PR"])
+        population = pd.to_numeric(c22[pop_col], errors="coerce").to_numpy(dtype=float)
+    elif method == "urban":
+        urban = urban_mask(c22)
+    density = target_density(method, c22_a.geometry.area.to_numpy(), population, urban)
+
+    # 6) Interseção 10×22: matriz esparsa com a área de cada pedaço (exata ou rasterizada)
+    g10, g22 = c10_a.geometry.values, c22_a.geometry.values
+    if approx_cell:
+        print(f"🔲 Rasterizando 2010×2022 em células de {approx_cell:g} m (modo aproximado)…")
+    else:
+        print("🔀 Calculando interseções 2010×2022 (STRtree)…")
+    with span('overlay', rows_in=len(c22_a) + len(c10_a), cell=approx_cell) as step:
+        if approx_cell:
+            areas = raster_intersection_areas(g10, g22, approx_cell)
+        else:
+            areas = intersection_areas(g10, g22)
+        step.count(rows_out=areas.nnz)
+    if areas.nnz == 0:
         raise SystemExit("Overlay vazio — verifique se as malhas se sobrepõem e se os CRS estão corretos.")
 
-    # 7) Proporção de área e ponderação de RpC
-    inter["area_intersec"] = inter.geometry.area
-    # evita divisão por zero
-    inter = inter[inter["area_2010"] > 0].copy()
-    inter["prop"] = inter["area_intersec"] / inter["area_2010"]
-    inter["RpC_w"] = inter["prop"] * inter[rpc10]
-
-    # 8) Agregar por setor 2022
-    print("🧮 Agregando RpC ponderada por id_setor (2022)…")
-    agg = inter.groupby("id_setor", as_index=True)["RpC_w"].sum().rename("RpC_2010")
-
-    # 9) Mesclar ao 2022 (no CRS original)
+    # 7) Pesos dos pedaços e RpC ponderada por setor 2022 (produto matriz-vetor)
+    print(f"🧮 Agregando RpC ponderada por id_setor (2022), pesos por '{method}'…")
+    with span('aggregate', method=method, rows_in=areas.nnz) as step:
+        weights = weight_matrix(areas, area_2010, density)
+        rpc_2010 = pd.to_numeric(c10_a[rpc10], errors="coerce").to_numpy(dtype=float)
+        rpc = interpolate(weights, rpc_2010)
+        agg = pd.Series(rpc, index=c22["id_setor"].to_numpy()).groupby(level=0).sum(min_count=1)
+        agg = agg.rename("RpC_2010")
+        step.count(rows_out=int(agg.notna().sum()))
+
+    if approx_cell and approx_sample:
+        with span('overlay', check='sample', rows_in=approx_sample):
+            err = sample_error(g10, g22, rpc, rpc_2010, area_2010, density, n=approx_sample)
+        print(f"📏 Erro do modo aproximado (amostra de {err['n']} setores 2022 × overlay exato): "
+              f"MAE {err['mae']:.2f} | erro relativo mediano {err['rel_median']:.1%} "
+              f"(p90 {err['rel_p90']:.1%}) | r = {err['corr']:.4f} | NaN divergentes: {err['nan_mismatch']}")
+
+    # 8) Mesclar ao 2022 (no CRS original)
     print("🔗 Mesclando RpC_2010 de volta ao 2022 (CRS original)…")
     c22_out = c22.copy()
     c22_out = c22_out.merge(agg.to_frame(), left_on="id_setor", right_index=True, how="left")
     c22_out = c22_out.set_crs(crs_out)
+    return apply_sector_schema(c22_out)
+
+
+def main():
+    ap = argparse.ArgumentParser(
+        description="Harmoniza RpC (2010) para a malha de setores 2022 por ponderação de área ou "
+                    "dasimétrica (Brazil Albers)."
+    )
+    ap.add_argument("--in-2022", required=True,
+                    help="Shapefile 2022 com indicadores (saída do Script 01): Setores_Indicadores_Censo_22.shp")
+    ap.add_argument("--in-2010", required=True,
+                    help="Shapefile 2010 com a coluna de RpC (ex.: Pessoa_Renda_Resultado.shp)")
+    ap.add_argument("--rpc-col", default="RpC",
+                    help="Nome da coluna de renda per capita no arquivo de 2010 (default: RpC)")
+    ap.add_argument("--method", default="area", choices=METHODS,
+                    help="Ponderação dos pedaços: area (padrão), population (v0001 de 2022) ou urban "
+                         "(mancha urbana de 2022)")
+    ap.add_argument("--approx-cell", type=float, default=None, metavar="METROS",
+                    help="Modo aproximado (exploratório): rasteriza as malhas em células deste tamanho "
+                         "no lugar do overlay exato (ex.: 50)")
+    ap.add_argument("--approx-sample", type=int, default=APPROX_SAMPLE,
+                    help=f"Setores 2022 comparados ao overlay exato no modo aproximado "
+                         f"(default: {APPROX_SAMPLE}; 0 = não comparar)")
+    ap.add_argument("--out", required=True,
+                    help="Caminho de saída (ex.: .../Setores_raca_renda.shp ou .parquet)")
+    profiling.add_profile_argument(ap)
+    args = ap.parse_args()
+    profiling.setup(args)
+
+    pout = Path(args.out)
+    c22_out = harmonize_income(Path(args.in_2022), Path(args.in_2010), args.rpc_col, args.method,
+                               args.approx_cell, args.approx_sample)
 
-    # 10) Salvar
-    pout.parent.mkdir(parents=True, exist_ok=True)
-    c22_out.to_file(pout)
+    # 9) Salvar
+    write_sectors(c22_out, pout)
     print(f"✅ Salvo: {pout}  | linhas={len(c22_out)}")
     print("🎯 Coluna adicionada: 'RpC_2010' (renda per capita de 2010 harmonizada para setores 2022).")
 
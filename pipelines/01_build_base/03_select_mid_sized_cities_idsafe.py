@@ -2,11 +2,15 @@
 # -*- coding: utf-8 -*-
 
 import argparse
+import sys
 from pathlib import Path
-import geopandas as gpd
 import pandas as pd
-import networkx as nx
-from libpysal.weights import Queen
+
+# Pacote compartilhado (pipelines/common)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common import profiling
+from common.profiling import span, timed
+from common.schema import apply_sector_schema, read_sectors, write_sectors
 
 def find_col(gdf, candidates, required=True):
     m = {c.lower(): c for c in gdf.columns}
@@ -17,6 +21,7 @@ def find_col(gdf, candidates, required=True):
         raise ValueError(f"Coluna não encontrada. Procurei: {candidates}")
     return None
 
+@timed('repair')
 def fix_geoms(gdf):
     gdf = gdf.copy()
     gdf["geometry"] = gdf.geometry.apply(
@@ -24,26 +29,23 @@ def fix_geoms(gdf):
     )
     return gdf
 
-def main():
-    ap = argparse.ArgumentParser(
-        description="Seleciona cidades médias (100–500k) por contiguidade (Queen) e filtra setores por CD_SETOR."
-    )
-    ap.add_argument("--in-2022", required=True, help="Setores 2022 (Brasil inteiro) JÁ com variáveis calculadasa partir de 02_harmonize_renda_2010_to_2022")
-    ap.add_argument("--out-dir", required=True, help="Pasta de saída.")
-    args = ap.parse_args()
-
-    IN = Path(args.in_2022)
-    OUT = Path(args.out_dir); OUT.mkdir(parents=True, exist_ok=True)
-
-    areas_urbanas = OUT / "Areas_Urbanas_Com_Variaveis.shp"
-    manchas_muns  = OUT / "Manchas_Urbanas_Populacao_Total_Raca.shp"
-    manchas_ok    = OUT / "Cidades_Medias_100_500_mil_SEM_Conurbacoes.shp"
-    comps_ok      = OUT / "Cidades_Medias_Componentes.shp"
-    lista_csv     = OUT / "Cidades_Medias_Lista.csv"
-    ids_csv       = OUT / "Cidades_Medias_CD_SETOR.csv"
-    setores_final = OUT / "Cidades_Medias_Variaveis.shp"
-
-    gdf = gpd.read_file(IN)
+def select_mid_sized_cities(sectors, out_dir=None):
+    """
+    Setores das cidades médias (tipados), a partir da base nacional `sectors` (caminho ou
+    GeoDataFrame, ex.: o resultado de `harmonize_income` do script 02). Com `out_dir`,
+    grava também os produtos auxiliares (áreas urbanas, manchas, listas de municípios e IDs);
+    sem ele, nada é gravado (encadeamento em memória, ver `pipelines/pipeline.py chain`).
+    """
+    OUT = Path(out_dir) if out_dir is not None else None
+    if OUT is not None:
+        OUT.mkdir(parents=True, exist_ok=True)
+
+    def save(frame, name):
+        if OUT is not None:
+            with span('write', path=OUT / name, rows_in=len(frame)):
+                frame.to_file(OUT / name)
+
+    gdf = read_sectors(sectors)
     gdf = fix_geoms(gdf)
 
     mun_col  = find_col(gdf, ["NM_MUN","NM_MUNICIP","NM_MUNICIPIO"])
@@ -59,7 +61,7 @@ def main():
         situ = find_col(gdf, ["SITUACAO"])
         urban = gdf[gdf[situ].astype(str).str.lower() == "urbana"].copy()
     urban = fix_geoms(urban)
-    urban.to_file(areas_urbanas)
+    save(urban, "Areas_Urbanas_Com_Variaveis.shp")
 
     # 2) Dissolve municipal (PR e raças se existirem)
     agg = {pop_col0: "sum"}
@@ -70,17 +72,24 @@ def main():
         if meta in urban.columns:
             agg[meta] = "first"
 
-    manchas = urban.dissolve(by=[mun_col, uf_col], aggfunc=agg).reset_index()
+    with span('dissolve', by='municipio', rows_in=len(urban)) as step:
+        manchas = urban.dissolve(by=[mun_col, uf_col], aggfunc=agg, observed=True).reset_index()
+        step.count(rows_out=len(manchas))
     if pop_col0 != "PR":
         manchas = manchas.rename(columns={pop_col0: "PR"})
     manchas = fix_geoms(manchas)
-    manchas.to_file(manchas_muns)
+    save(manchas, "Manchas_Urbanas_Populacao_Total_Raca.shp")
 
     # 3) Contiguidade Queen + regras
     manchas = manchas.reset_index(drop=True)
-    w = Queen.from_dataframe(manchas)
-    G = w.to_networkx()
-    components = list(nx.connected_components(G))
+    with span('contiguity', rows_in=len(manchas)) as step:
+        import networkx as nx
+        from libpysal.weights import Queen
+
+        w = Queen.from_dataframe(manchas)
+        G = w.to_networkx()
+        components = list(nx.connected_components(G))
+        step.count(components=len(components))
 
     comp_map = {}
     for comp_id, comp in enumerate(components):
@@ -102,30 +111,57 @@ def main():
     if len(selecionadas[selecionadas["PR"] < 100_000]) > 0:
         raise ValueError("Encontrada mancha <100k após o filtro.")
 
-    selecionadas.to_file(manchas_ok)
-    selecionadas.dissolve(by="component", aggfunc={"PR":"sum"}).to_file(comps_ok)
-    selecionadas[[mun_col, uf_col, "PR", "comp_pop", "comp_n"]].sort_values([uf_col, mun_col]).to_csv(
-        lista_csv, index=False, encoding="utf-8"
-    )
+    save(selecionadas, "Cidades_Medias_100_500_mil_SEM_Conurbacoes.shp")
+    save(selecionadas.dissolve(by="component", aggfunc={"PR":"sum"}), "Cidades_Medias_Componentes.shp")
+    if OUT is not None:
+        selecionadas[[mun_col, uf_col, "PR", "comp_pop", "comp_n"]].sort_values([uf_col, mun_col]).to_csv(
+            OUT / "Cidades_Medias_Lista.csv", index=False, encoding="utf-8"
+        )
 
     # 4) Seleção final por CD_SETOR (sem geom)
     pairs = set(selecionadas[[mun_col, uf_col]].apply(lambda r: (r[mun_col], r[uf_col]), axis=1))
     urban_sel = urban[urban[[mun_col, uf_col]].apply(lambda r: (r[mun_col], r[uf_col]) in pairs, axis=1)].copy()
 
     ids_ok = urban_sel[[id_col]].drop_duplicates().sort_values(id_col)
-    ids_ok.to_csv(ids_csv, index=False, encoding="utf-8")
+    if OUT is not None:
+        ids_ok.to_csv(OUT / "Cidades_Medias_CD_SETOR.csv", index=False, encoding="utf-8")
 
-    setores_finais = gdf[gdf[id_col].isin(set(ids_ok[id_col]))].copy()
-    # reforça urbano 1/2
-    if cd_situ:
-        setores_finais = setores_finais[setores_finais[cd_situ].astype(str).isin(["1","2",1,2])].copy()
-    setores_finais.to_file(setores_final)
+    with span('aggregate', step='selecao', rows_in=len(gdf)) as step:
+        setores_finais = gdf[gdf[id_col].isin(set(ids_ok[id_col]))].copy()
+        # reforça urbano 1/2
+        if cd_situ:
+            setores_finais = setores_finais[setores_finais[cd_situ].astype(str).isin(["1","2",1,2])].copy()
+        step.count(rows_out=len(setores_finais))
+    return apply_sector_schema(setores_finais)
+
+def main():
+    ap = argparse.ArgumentParser(
+        description="Seleciona cidades médias (100–500k) por contiguidade (Queen) e filtra setores por CD_SETOR."
+    )
+    ap.add_argument("--in-2022", required=True, help="Setores 2022 (Brasil inteiro) JÁ com variáveis calculadasa partir de 02_harmonize_renda_2010_to_2022")
+    ap.add_argument("--out-dir", required=True, help="Pasta de saída.")
+    profiling.add_profile_argument(ap)
+    args = ap.parse_args()
+    profiling.setup(args)
+
+    OUT = Path(args.out_dir)
+    manchas_ok    = OUT / "Cidades_Medias_100_500_mil_SEM_Conurbacoes.shp"
+    lista_csv     = OUT / "Cidades_Medias_Lista.csv"
+    ids_csv       = OUT / "Cidades_Medias_CD_SETOR.csv"
+    setores_final = OUT / "Cidades_Medias_Variaveis.shp"
+    setores_parquet = OUT / "Cidades_Medias_Variaveis.parquet"  # mesma base, tipada (scripts 04+)
+
+    setores_finais = select_mid_sized_cities(Path(args.in_2022), OUT)
+    with span('write', path=setores_final, rows_in=len(setores_finais)):
+        setores_finais.to_file(setores_final)
+    write_sectors(setores_finais, setores_parquet)
 
     print("✅ Concluído.")
     print(f"  - Manchas finais: {manchas_ok}")
     print(f"  - Lista municípios: {lista_csv}")
     print(f"  - IDs CD_SETOR: {ids_csv}")
     print(f"  - Setores finais: {setores_final}")
+    print(f"  - Setores finais (GeoParquet tipado): {setores_parquet}")
 
 if __name__ == "__main__":
     main()
@@ -1,19 +1,47 @@
 # scripts/04_plot_correlation_national.py
 
 import os
-import geopandas as gpd
+import sys
+from pathlib import Path
 import pandas as pd
-import matplotlib.pyplot as plt
-import numpy as np
+
+# Pacote compartilhado (pipelines/common)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common.figure_cache import FigureCache
+from common import correlation_stats
+from common.correlation_stats import correlation_table, fit_line, race_percentages
+from common import scatter_density
+from common.scatter_density import scatter_or_density
+from common import profiling
+from common.cli import stage_parser
+from common.profiling import timed
+from common.schema import read_sectors
 
 # >>>>>> PREENCHA AQUI <<<<<<
-# Shapefile de entrada: produto do script 03 (Cidades_Medias_Variaveis.shp)
+# Base de entrada: produto do script 03 (Cidades_Medias_Variaveis.shp ou .parquet, mais rápido)
 INPUT_SHP = r"inputs/Cidades_Medias_Variaveis.shp"
 
 # Pasta de saída para o PNG gerado
 OUTPUT_DIR = r"outputs/01_correlation_national"
 
-def plot_correlations(df, save_path):
+# True → re-renderiza todas as figuras, ignorando o manifesto de cache (.figure_manifest.json)
+FORCE_RENDER = False
+
+# Réplicas bootstrap para os intervalos de confiança da tabela exportada (0 = sem IC)
+N_BOOT = 1000
+
+# Modo dos pontos: 'auto' (densidade acima de DENSITY_THRESHOLD pontos), 'scatter', 'density' ou 'hexbin'
+SCATTER_MODE = 'auto'
+DENSITY_THRESHOLD = 50_000
+
+@timed('render')
+def plot_correlations(df, save_path, force=False, n_boot=N_BOOT,
+                      scatter_mode=SCATTER_MODE, density_threshold=DENSITY_THRESHOLD):
+    """
+    Dispersão RpC_2010 × % de cada raça (conjunto nacional), com Pearson e reta OLS.
+    As estatísticas vêm de `common.correlation_stats` e são exportadas em
+    `Correlation_Statistics.csv`; `df` não é alterado.
+    """
     if not os.path.exists(save_path):
         os.makedirs(save_path)
     
@@ -34,36 +62,50 @@ def plot_correlations(df, save_path):
         'Indigena': '#3F8D73'
     }
     
-    # Converter os valores das raças para porcentagem (por registro)
-    total_population = df[races].sum(axis=1)
-    df[races] = df[races].div(total_population, axis=0) * 100
+    # Cache incremental: pula a figura se dados, parâmetros e código não mudaram
+    filename = "All_Races_Correlation.png"
+    output_file = os.path.join(save_path, filename)
+    table_file = os.path.join(save_path, "Correlation_Statistics.csv")
+    cache = FigureCache(save_path, code_files=[__file__, correlation_stats.__file__, scatter_density.__file__], force=force)
+    key = cache.key(df[['RpC_2010'] + races], params={'races': races, 'colors': color_map, 'n_boot': n_boot,
+                                                      'scatter_mode': scatter_mode, 'density_threshold': density_threshold})
+    if cache.is_fresh(output_file, key) and cache.is_fresh(table_file, key):
+        print(f"Gráfico atualizado (cache): {output_file}")
+        return
+
+    # Percentual das raças por registro (cópia) e tabela de estatísticas
+    pct = race_percentages(df, races)
+    stats_input = pd.concat([df[['RpC_2010']], pct], axis=1)
+    table = correlation_table(stats_input, variables=races, levels={'nacional': None}, n_boot=n_boot)
+    table.to_csv(table_file, index=False, encoding='utf-8')
+    cache.record(table_file, key)
+    stats = table.set_index('variable')
+
+    import matplotlib.pyplot as plt
 
     # Configurar o layout: 2 linhas x 3 colunas (último subplot oculto, pois são 5 raças)
     fig, axes = plt.subplots(nrows=2, ncols=3, figsize=(16, 10))
     axes = axes.ravel()
 
     for i, race in enumerate(races):
-        axes[i].scatter(df['RpC_2010'], df[race], color=color_map[race], alpha=0.5)
+        # Dispersão (ou densidade, para muitos pontos)
+        scatter_or_density(axes[i], df['RpC_2010'], pct[race], color_map[race],
+                           mode=scatter_mode, threshold=density_threshold)
         axes[i].set_title(f'Correlação: RpC_2010 x % {race_names[race]}', fontsize=14, pad=10)
         axes[i].set_xlabel('Renda Média Domiciliar Per Capita (RpC_2010)', fontsize=12)
         axes[i].set_ylabel(f'% {race_names[race]}', fontsize=12)
         axes[i].tick_params(axis='both', which='major', labelsize=10)
         
-        # Calcular a correlação de Pearson e exibi-la
-        correlation = df['RpC_2010'].corr(df[race])
+        # Correlação de Pearson (tabela de estatísticas)
+        correlation = stats.loc[race, 'pearson']
         axes[i].text(0.95, 0.95, f'Pearson: {correlation:.2f}', transform=axes[i].transAxes,
                      horizontalalignment='right', verticalalignment='top', fontsize=12,
                      color='#3F8D73', fontweight='bold')
         
         # Adicionar a linha de tendência (regressão linear)
-        data_fit = df[['RpC_2010', race]].dropna()
-        if len(data_fit) > 1:
-            x = data_fit['RpC_2010']
-            y = data_fit[race]
-            coeffs = np.polyfit(x, y, 1)
-            poly = np.poly1d(coeffs)
-            x_vals = np.linspace(x.min(), x.max(), 100)
-            y_vals = poly(x_vals)
+        line = fit_line(stats.loc[race])
+        if line is not None:
+            x_vals, y_vals = line
             axes[i].plot(x_vals, y_vals, color='red', linewidth=2.5)
         
         # Garantir que o eixo Y comece em 0 e não ultrapasse 100
@@ -74,25 +116,31 @@ def plot_correlations(df, save_path):
     axes[-1].set_visible(False)
     
     plt.suptitle('Correlação entre Renda e Percentual Racial - Brasil', fontsize=16, y=0.98)
-    filename = "All_Races_Correlation.png"
     plt.tight_layout(rect=[0, 0, 1, 0.95])
-    output_file = os.path.join(save_path, filename)
     plt.savefig(output_file, bbox_inches='tight')
     plt.close()
+    cache.record(output_file, key)
     print(f"Gráfico salvo: {output_file}")
 
-if __name__ == "__main__":
+def main(input_shp=INPUT_SHP, output_dir=OUTPUT_DIR, force=FORCE_RENDER):
     # Caminhos
-    file_path = INPUT_SHP
-    save_path = OUTPUT_DIR
+    file_path = input_shp
+    save_path = output_dir
     os.makedirs(save_path, exist_ok=True)
 
     # Ler dados
-    data = gpd.read_file(file_path)
+    data = read_sectors(file_path)
     print("Total de registros lidos:", len(data))
 
     # RpC_2010 como numérico
     data['RpC_2010'] = pd.to_numeric(data['RpC_2010'], errors='coerce')
 
     # Plot
-    plot_correlations(data, save_path)
\ No newline at end of file
+    plot_correlations(data, save_path, force=force)
+
+if __name__ == "__main__":
+    args = stage_parser(
+        "Gráficos de correlação entre renda e composição racial (nacional).", INPUT_SHP, OUTPUT_DIR, force=True
+    ).parse_args()
+    profiling.setup(args)
+    main(args.input, args.out, force=args.force or FORCE_RENDER)
@@ -1,21 +1,52 @@
 # scripts/05_plot_correlation_by_region.py
 
 import os
-import geopandas as gpd
+import sys
+from pathlib import Path
 import pandas as pd
-import matplotlib.pyplot as plt
-import numpy as np
+
+# Pacote compartilhado (pipelines/common)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common.figure_cache import FigureCache
+from common import correlation_stats
+from common.correlation_stats import correlation_table, fit_line, race_percentages
+from common import scatter_density
+from common.scatter_density import scatter_or_density
+from common import profiling
+from common.cli import stage_parser
+from common.profiling import timed
+from common.schema import read_sectors
 
 # >>>>>> PREENCHA AQUI <<<<<<
-# Shapefile de entrada: produto do script 03 (Cidades_Medias_Variaveis.shp)
+# Base de entrada: produto do script 03 (Cidades_Medias_Variaveis.shp ou .parquet, mais rápido)
 INPUT_SHP = r"inputs/Cidades_Medias_Variaveis.shp"
 
 # Pasta de saída (um PNG por região)
 OUTPUT_DIR = r"outputs/02_correlation_region"
 
-def plot_correlations_by_region(df, save_path):
+# True → re-renderiza todas as figuras, ignorando o manifesto de cache (.figure_manifest.json)
+FORCE_RENDER = False
+
+# Réplicas bootstrap para os intervalos de confiança da tabela exportada (0 = sem IC)
+N_BOOT = 1000
+
+# Modo dos pontos: 'auto' (densidade acima de DENSITY_THRESHOLD pontos), 'scatter', 'density' ou 'hexbin'
+SCATTER_MODE = 'auto'
+DENSITY_THRESHOLD = 50_000
+
+@timed('render')
+def plot_correlations_by_region(df, save_path, force=False, n_boot=N_BOOT,
+                                scatter_mode=SCATTER_MODE, density_threshold=DENSITY_THRESHOLD):
+    """
+    Dispersão RpC_2010 × % de cada raça, um PNG por região, com Pearson e reta OLS.
+    As estatísticas de todas as regiões vêm de uma única chamada a
+    `common.correlation_stats.correlation_table` e são exportadas em
+    `Correlation_Statistics_by_Region.csv`; `df` não é alterado.
+    """
     if not os.path.exists(save_path):
         os.makedirs(save_path)
+
+    cache = FigureCache(save_path, code_files=[__file__, correlation_stats.__file__, scatter_density.__file__], force=force)
     
     # Colunas de raça com os novos nomes
     races = ['Brancos', 'Pretos', 'Amarelos', 'Pardos', 'Indigena']
@@ -34,43 +65,58 @@ def plot_correlations_by_region(df, save_path):
         'Indigena': '#3F8D73'
     }
     
-    # Usar a coluna NM_REGIAO para definir a região
-    df['Region'] = df['NM_REGIAO']
-    
-    # Converter as colunas de raça para porcentagem (por registro)
-    total_population = df[races].sum(axis=1)
-    df[races] = df[races].div(total_population, axis=0) * 100
+    # Percentual das raças por registro (cópia) e tabela de estatísticas por região
+    pct = race_percentages(df, races)
+    stats_input = pd.concat([df[['RpC_2010', 'NM_REGIAO']], pct], axis=1)
+    table_file = os.path.join(save_path, "Correlation_Statistics_by_Region.csv")
+    table_key = cache.key(stats_input, params={'n_boot': n_boot})
+    if cache.is_fresh(table_file, table_key):
+        table = pd.read_csv(table_file, encoding='utf-8')
+    else:
+        table = correlation_table(stats_input, variables=races, levels={'regiao': ['NM_REGIAO']}, n_boot=n_boot)
+        table.to_csv(table_file, index=False, encoding='utf-8')
+        cache.record(table_file, table_key)
 
     # Gerar gráficos para cada região
-    for region in df['Region'].unique():
+    for region in df['NM_REGIAO'].unique():
         if region:
             region_data = df[df['NM_REGIAO'] == region]
+            region_pct = pct[df['NM_REGIAO'] == region]
+            stats = table[table['group'] == str(region)].set_index('variable')
+            filename = os.path.join(save_path, f"{region}_racial_correlation.png")
+
+            # Cache incremental: só re-renderiza regiões cujos dados mudaram
+            key = cache.key(region_data[['RpC_2010'] + races],
+                            params={'region': region, 'races': races, 'colors': color_map,
+                                    'scatter_mode': scatter_mode, 'density_threshold': density_threshold})
+            if cache.is_fresh(filename, key):
+                print(f"Gráfico atualizado (cache): {filename}")
+                continue
             
+            import matplotlib.pyplot as plt
+
             # Configurar subplots: layout 2x3 (usando 5 subplots; último oculto)
             fig, axes = plt.subplots(nrows=2, ncols=3, figsize=(16, 10))
             axes = axes.ravel()
             
             for i, race in enumerate(races):
-                axes[i].scatter(region_data['RpC_2010'], region_data[race], color=color_map[race], alpha=0.5)
+                # Dispersão (ou densidade, para muitos pontos)
+                scatter_or_density(axes[i], region_data['RpC_2010'], region_pct[race], color_map[race],
+                                   mode=scatter_mode, threshold=density_threshold)
                 axes[i].set_title(f'Correlação: RpC_2010 x % {race_names[race]}', fontsize=14, pad=10)
                 axes[i].set_xlabel('Renda Média Domiciliar Per Capita (RpC_2010)', fontsize=12)
                 axes[i].set_ylabel(f'% {race_names[race]}', fontsize=12)
                 axes[i].tick_params(axis='both', which='major', labelsize=10)
                 
-                correlation = region_data['RpC_2010'].corr(region_data[race])
+                correlation = stats.loc[race, 'pearson']
                 axes[i].text(0.95, 0.95, f'Pearson: {correlation:.2f}', transform=axes[i].transAxes,
                              horizontalalignment='right', verticalalignment='top', fontsize=12,
                              color='#3F8D73', fontweight='bold')
                 
                 # Linha de tendência: regressão linear
-                data_fit = region_data[['RpC_2010', race]].dropna()
-                if len(data_fit) > 1:
-                    x = data_fit['RpC_2010']
-                    y = data_fit[race]
-                    coeffs = np.polyfit(x, y, 1)
-                    poly = np.poly1d(coeffs)
-                    x_vals = np.linspace(x.min(), x.max(), 100)
-                    y_vals = poly(x_vals)
+                line = fit_line(stats.loc[race])
+                if line is not None:
+                    x_vals, y_vals = line
                     axes[i].plot(x_vals, y_vals, color='red', linewidth=2.5)
             
             # Ocultar o último subplot, se houver
@@ -79,24 +125,31 @@ def plot_correlations_by_region(df, save_path):
             
             plt.suptitle(f'Correlação entre RpC_2010 e Percentual Racial - Região {region}', fontsize=16, y=0.98)
             # Salvar o gráfico diretamente na pasta de save_path com o nome incluindo a região
-            filename = os.path.join(save_path, f"{region}_racial_correlation.png")
             plt.tight_layout(rect=[0, 0, 1, 0.95])
             plt.savefig(filename, bbox_inches='tight')
             plt.close()
+            cache.record(filename, key)
             print(f"Gráfico salvo: {filename}")
 
-if __name__ == "__main__":
+def main(input_shp=INPUT_SHP, output_dir=OUTPUT_DIR, force=FORCE_RENDER):
     # Caminhos
-    file_path = INPUT_SHP
-    save_path = OUTPUT_DIR
+    file_path = input_shp
+    save_path = output_dir
     os.makedirs(save_path, exist_ok=True)
 
     # Ler dados
-    data = gpd.read_file(file_path)
+    data = read_sectors(file_path)
     print("Total de registros lidos:", len(data))
 
     # Converter a coluna de renda para numérico
     data['RpC_2010'] = pd.to_numeric(data['RpC_2010'], errors='coerce')
 
     # Plotar
-    plot_correlations_by_region(data, save_path)
+    plot_correlations_by_region(data, save_path, force=force)
+
+if __name__ == "__main__":
+    args = stage_parser(
+        "Gráficos de correlação entre renda e composição racial, por região.", INPUT_SHP, OUTPUT_DIR, force=True
+    ).parse_args()
+    profiling.setup(args)
+    main(args.input, args.out, force=args.force or FORCE_RENDER)
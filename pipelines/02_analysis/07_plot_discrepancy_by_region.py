@@ -1,20 +1,33 @@
 # scripts/07_plot_discrepancy_by_region.py
 
 import os
-import geopandas as gpd
+import sys
+from pathlib import Path
 import pandas as pd
-import matplotlib.pyplot as plt
 import numpy as np
 
+# Pacote compartilhado (pipelines/common)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common.classify import classify
+from common.figure_cache import FigureCache
+from common import profiling
+from common.cli import stage_parser
+from common.profiling import span, timed
+from common.schema import read_sectors
+
 # >>>>>> PREENCHA AQUI <<<<<<
-# Shapefile de entrada: produto do script 03 (Cidades_Medias_Variaveis.shp)
+# Base de entrada: produto do script 03 (Cidades_Medias_Variaveis.shp ou .parquet, mais rápido)
 INPUT_SHP = r"inputs/Cidades_Medias_Variaveis.shp"
 
 # Pasta de saída (um PNG por região)
 OUTPUT_DIR = r"outputs/04_discrepancy_region"
+
+# True → re-renderiza todas as figuras, ignorando o manifesto de cache (.figure_manifest.json)
+FORCE_RENDER = False
 # <<<<<<<<<<<<<<<<<<<<<<<<<<<<
 
-def plot_regional_discrepancy_data(df, region, save_path):
+@timed('render')
+def plot_regional_discrepancy_data(df, region, save_path, cache=None):
     """
     Plota, para cada quintil de renda, a discrepância entre a população observada
     (soma, em valores absolutos, da raça no quintil) e a população esperada
@@ -23,8 +36,6 @@ def plot_regional_discrepancy_data(df, region, save_path):
     if not os.path.exists(save_path):
         os.makedirs(save_path)
 
-    fig, ax = plt.subplots(figsize=(12, 6))
-    
     # Colunas de raça
     races = ['Brancos', 'Pretos', 'Amarelos', 'Pardos', 'Indigena']
     race_names = {
@@ -42,6 +53,19 @@ def plot_regional_discrepancy_data(df, region, save_path):
         'Indigena': '#3F8D73'
     }
     
+    filename = f"{region}_regional_population_discrepancy.png"
+    output_file = os.path.join(save_path, filename)
+
+    # Cache incremental: pula a figura se dados, parâmetros e código não mudaram
+    if cache is not None:
+        key = cache.key(df[['Region', 'Quintil'] + races], params={'region': region, 'colors': color_map})
+        if cache.is_fresh(output_file, key):
+            print(f"Gráfico atualizado (cache): {output_file}")
+            return
+
+    import matplotlib.pyplot as plt
+    fig, ax = plt.subplots(figsize=(12, 6))
+
     quintiles = range(1, 6)
     x_labels = ['Q1', 'Q2', 'Q3', 'Q4', 'Q5']
     x = np.arange(len(x_labels))
@@ -70,35 +94,39 @@ def plot_regional_discrepancy_data(df, region, save_path):
     ax.legend(loc='center left', bbox_to_anchor=(1, 0.5), fontsize=12)
 
     plt.tight_layout(rect=[0, 0, 0.85, 1])
-    filename = f"{region}_regional_population_discrepancy.png"
-    output_file = os.path.join(save_path, filename)
     plt.savefig(output_file, bbox_inches='tight')
     plt.close()
+    if cache is not None:
+        cache.record(output_file, key)
     print(f"Gráfico salvo: {output_file}")
 
-def main():
+def main(input_shp=INPUT_SHP, output_dir=OUTPUT_DIR, force=FORCE_RENDER):
     # Carregar dados
-    data = gpd.read_file(INPUT_SHP)
+    data = read_sectors(input_shp)
     print("Total de registros lidos:", len(data))
 
     # Converter a coluna de renda para numérico (RpC_2010)
     data['RpC_2010'] = pd.to_numeric(data['RpC_2010'], errors='coerce')
 
-    # Calcular os quintis de RpC_2010 por município (NM_MUN)
-    data['Quintil'] = data.groupby('NM_MUN')['RpC_2010'].transform(
-        lambda x: pd.qcut(x, 5, labels=[1, 2, 3, 4, 5])
-    )
+    # Calcular os quintis de RpC_2010 por município (NM_MUN + NM_UF; mesma regra do script 09)
+    with span('aggregate', step='quintis', rows_in=len(data)):
+        data['Quintil'] = classify(data, 'RpC_2010', k=5, method='quantiles', group_by='municipio')
 
     # Definir a região a partir da coluna NM_REGIAO
     data['Region'] = data['NM_REGIAO']
 
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    os.makedirs(output_dir, exist_ok=True)
+    cache = FigureCache(output_dir, code_files=[__file__], force=force)
 
     # Gerar e salvar os gráficos para cada região
     for region in data['Region'].unique():
         if region:
             regional_data = data[data['Region'] == region]
-            plot_regional_discrepancy_data(regional_data, region, OUTPUT_DIR)
+            plot_regional_discrepancy_data(regional_data, region, output_dir, cache=cache)
 
 if __name__ == "__main__":
-    main()
+    args = stage_parser(
+        "Discrepância entre população observada e esperada por quintil, por região.", INPUT_SHP, OUTPUT_DIR, force=True
+    ).parse_args()
+    profiling.setup(args)
+    main(args.input, args.out, force=args.force or FORCE_RENDER)
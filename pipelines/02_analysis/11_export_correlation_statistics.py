@@ -0,0 +1,60 @@
+# scripts/11_export_correlation_statistics.py
+
+import os
+import sys
+from pathlib import Path
+import pandas as pd
+
+# Pacote compartilhado (pipelines/common)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common.correlation_stats import INFRA, LEVELS, RACES, correlation_table, race_percentages
+from common import profiling
+from common.cli import stage_parser
+from common.profiling import span
+from common.schema import read_sectors
+
+# >>>>>> PREENCHA AQUI <<<<<<
+# Base de entrada: produto do script 03 (Cidades_Medias_Variaveis.shp ou .parquet, mais rápido)
+INPUT_SHP = r"inputs/Cidades_Medias_Variaveis.shp"
+
+# Pasta de saída (tabela única, todas as escalas)
+OUTPUT_DIR = r"outputs/06_correlation_statistics"
+
+# Réplicas bootstrap para os intervalos de confiança (0 = sem IC)
+N_BOOT = 1000
+# <<<<<<<<<<<<<<<<<<<<<<<<<<<<
+
+def main(input_shp=INPUT_SHP, output_dir=OUTPUT_DIR):
+    """
+    Exporta a tabela de correlação/regressão RpC_2010 × (% raças, P_Agua, P_Esgo, P_Lixo)
+    para todas as escalas (nacional, região, UF e município) numa única passada vetorizada.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    data = read_sectors(input_shp, ignore_geometry=True)
+    print("Total de registros lidos:", len(data))
+
+    data['RpC_2010'] = pd.to_numeric(data['RpC_2010'], errors='coerce')
+
+    # Percentuais das raças por setor (mesmo cálculo dos scripts 04/05) + infraestrutura
+    group_cols = sorted({c for cols in LEVELS.values() if cols for c in cols})
+    infra = [c for c in INFRA if c in data.columns]
+    stats_input = pd.concat(
+        [data[['RpC_2010'] + group_cols + infra], race_percentages(data, RACES)], axis=1
+    )
+
+    with span('aggregate', rows_in=len(stats_input)) as step:
+        table = correlation_table(stats_input, variables=RACES + infra, n_boot=N_BOOT)
+        step.count(rows_out=len(table))
+
+    output_file = os.path.join(output_dir, "correlation_statistics.csv")
+    with span('write', path=output_file, rows_in=len(table)):
+        table.to_csv(output_file, index=False, encoding='utf-8')
+    print(f"Tabela salva: {output_file}  (linhas={len(table)})")
+
+if __name__ == "__main__":
+    args = stage_parser(
+        "Tabela de correlação/regressão para todas as escalas.", INPUT_SHP, OUTPUT_DIR
+    ).parse_args()
+    profiling.setup(args)
+    main(args.input, args.out)
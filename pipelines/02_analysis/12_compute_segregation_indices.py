@@ -0,0 +1,53 @@
+# scripts/12_compute_segregation_indices.py
+
+import os
+import sys
+from pathlib import Path
+
+# Pacote compartilhado (pipelines/common)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common.correlation_stats import INFRA, LEVELS, RACES
+from common.segregation import segregation_table
+from common import profiling
+from common.cli import stage_parser
+from common.profiling import span
+from common.schema import read_sectors, sector_columns
+
+# >>>>>> PREENCHA AQUI <<<<<<
+# Entrada: produto do script 03 (Cidades_Medias_Variaveis.shp) ou, para todos os municípios
+# do Brasil, a malha nacional do script 02 (Setores_raca_renda.shp)
+INPUT_SHP = r"inputs/Cidades_Medias_Variaveis.shp"
+
+# Pasta de saída (tabela de índices por escala e grupo)
+OUTPUT_DIR = r"outputs/07_segregation_indices"
+# <<<<<<<<<<<<<<<<<<<<<<<<<<<<
+
+def main(input_shp=INPUT_SHP, output_dir=OUTPUT_DIR):
+    """
+    Calcula índices de segregação (dissimilaridade, isolamento/exposição e Theil H) por raça e
+    por acesso à infraestrutura, ponderados por população, para as escalas nacional, regional,
+    UF e municipal, e grava a tabela em CSV.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Lê só os atributos necessários (sem geometria): viável para a malha nacional
+    wanted = set(RACES + INFRA + ['v0001'] + [c for cols in LEVELS.values() if cols for c in cols])
+    cols = [c for c in sector_columns(input_shp) if c in wanted]
+    data = read_sectors(input_shp, columns=cols, ignore_geometry=True)
+    print("Total de registros lidos:", len(data))
+
+    with span('aggregate', rows_in=len(data)) as step:
+        table = segregation_table(data)
+        step.count(rows_out=len(table))
+
+    output_file = os.path.join(output_dir, "segregation_indices.csv")
+    with span('write', path=output_file, rows_in=len(table)):
+        table.to_csv(output_file, index=False, encoding='utf-8')
+    print(f"Tabela salva: {output_file}  (grupos={len(table)})")
+
+if __name__ == "__main__":
+    args = stage_parser(
+        "Índices de segregação por escala e grupo.", INPUT_SHP, OUTPUT_DIR
+    ).parse_args()
+    profiling.setup(args)
+    main(args.input, args.out)
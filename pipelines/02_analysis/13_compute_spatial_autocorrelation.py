@@ -0,0 +1,87 @@
+# scripts/13_compute_spatial_autocorrelation.py
+
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import pandas as pd
+import shapely
+
+# Pacote compartilhado (pipelines/common)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common.correlation_stats import INFRA, RACES, group_labels, race_percentages
+from common.spatial_autocorrelation import analyze_city
+from common import profiling
+from common.cli import stage_parser
+from common.profiling import span
+from common.schema import read_sectors
+
+# >>>>>> PREENCHA AQUI <<<<<<
+# Base de entrada: produto do script 03 (Cidades_Medias_Variaveis.shp ou .parquet, mais rápido)
+INPUT_SHP = r"inputs/Cidades_Medias_Variaveis.shp"
+
+# Pasta de saída (tabelas de Moran global e LISA)
+OUTPUT_DIR = r"outputs/08_spatial_autocorrelation"
+
+# Cache das matrizes de contiguidade (uma por cidade, reaproveitada entre execuções)
+ADJACENCY_CACHE_DIR = r"outputs/cache/adjacency"
+
+# Permutações, nível de significância do LISA e processos paralelos (None = nº de CPUs)
+PERMUTATIONS = 999
+ALPHA = 0.05
+N_WORKERS = None
+# <<<<<<<<<<<<<<<<<<<<<<<<<<<<
+
+def main(input_shp=INPUT_SHP, output_dir=OUTPUT_DIR, adjacency_cache_dir=ADJACENCY_CACHE_DIR):
+    """
+    I de Moran global e LISA por cidade para RpC_2010, % de cada raça e P_Agua/P_Esgo/P_Lixo,
+    usando contiguidade Queen por STRtree (cacheada em disco) e permutações vetorizadas.
+    As cidades são processadas em paralelo.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    data = read_sectors(input_shp)
+    print("Total de registros lidos:", len(data))
+
+    data['RpC_2010'] = pd.to_numeric(data['RpC_2010'], errors='coerce')
+    pct = race_percentages(data, RACES).add_prefix('pct_')
+    infra = [c for c in INFRA if c in data.columns]
+    values = pd.concat([data[['RpC_2010'] + infra], pct], axis=1)
+    variables = list(values.columns)
+
+    data['city'] = group_labels(data, ['NM_MUN', 'NM_UF'])
+    ids_all = data['CD_SETOR'].astype(str).to_numpy()
+    wkb_all = shapely.to_wkb(data.geometry.values)
+    X_all = values.to_numpy(dtype=float)
+
+    global_parts, local_parts = [], []
+    # Contiguidade (cacheada) + Moran/LISA por cidade, nos processos de trabalho
+    with span('contiguity', rows_in=len(data), permutations=PERMUTATIONS) as step, \
+            ProcessPoolExecutor(max_workers=N_WORKERS) as pool:
+        futures = []
+        for seed, (city, idx) in enumerate(data.groupby('city', observed=True).indices.items()):
+            futures.append(pool.submit(
+                analyze_city, city, ids_all[idx], wkb_all[idx], X_all[idx], variables,
+                adjacency_cache_dir, PERMUTATIONS, ALPHA, seed,
+            ))
+        for fut in futures:
+            g, loc = fut.result()
+            global_parts.append(g)
+            local_parts.append(loc)
+            print(f"✔ {g['city'].iloc[0]}: {g['n'].iloc[0]} setores")
+        step.count(cities=len(futures))
+
+    global_file = os.path.join(output_dir, "moran_global.csv")
+    local_file = os.path.join(output_dir, "lisa_clusters.csv")
+    with span('write', path=output_dir):
+        pd.concat(global_parts, ignore_index=True).to_csv(global_file, index=False, encoding='utf-8')
+        pd.concat(local_parts, ignore_index=True).to_csv(local_file, index=False, encoding='utf-8')
+    print(f"Tabela salva: {global_file}")
+    print(f"Tabela salva: {local_file}")
+
+if __name__ == "__main__":
+    args = stage_parser(
+        "I de Moran global e LISA por cidade.", INPUT_SHP, OUTPUT_DIR, cache_dir=ADJACENCY_CACHE_DIR
+    ).parse_args()
+    profiling.setup(args)
+    main(args.input, args.out, args.cache_dir)
@@ -0,0 +1,117 @@
+# scripts/16_compute_opportunity_distances.py
+
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+# Pacote compartilhado (pipelines/common)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common.areal_weights import ALBERS_BR
+from common.correlation_stats import group_labels
+from common.opportunity_distance import BATCH_SECTORS, batches, city_summary, distances_batch
+from common.urban_extents import UrbanExtents, key_columns
+from common import profiling
+from common.cli import stage_parser
+from common.profiling import span
+from common.schema import read_sectors, sector_columns
+
+# >>>>>> PREENCHA AQUI <<<<<<
+# Entrada: produto do script 03 (Cidades_Medias_Variaveis.shp ou .parquet) ou, para todos os
+# municípios do Brasil, a malha nacional do script 02 (Setores_raca_renda.shp)
+INPUT_SHP = r"inputs/Cidades_Medias_Variaveis.shp"
+
+# Pasta de saída (tabela por setor e distribuição por cidade)
+OUTPUT_DIR = r"outputs/11_opportunity_distance"
+
+# Pasta de cache: mancha urbana principal de cada município em urban_extents.csv
+# (reaproveitada entre execuções; ver common/urban_extents.py)
+CACHE_DIR = r"outputs/cache"
+BUFFER_KM = 1
+
+# Processos paralelos (None = nº de CPUs)
+N_WORKERS = None
+# <<<<<<<<<<<<<<<<<<<<<<<<<<<<
+
+def main(input_shp=INPUT_SHP, output_dir=OUTPUT_DIR, cache_dir=CACHE_DIR):
+    """
+    Para cada setor Q1 de cada cidade, distância (km) ao setor Q5 mais próximo e ao centroide
+    da mancha urbana principal do município (cKDTree sobre centroides projetados, cidades em
+    lotes paralelos). Grava a tabela por setor e a distribuição por cidade em CSV.
+    """
+    from pyproj import Transformer
+    import shapely
+
+    os.makedirs(output_dir, exist_ok=True)
+
+    wanted = ['CD_SETOR', 'NM_MUN', 'NM_UF', 'NM_REGIAO', 'CD_MUN', 'RpC_2010', 'Quintil']
+    data = read_sectors(input_shp, columns=[c for c in wanted if c in sector_columns(input_shp)])
+    print("Total de registros lidos:", len(data))
+
+    # Quintis de renda por município (mesma regra do script 09), se a base não os trouxer
+    if 'Quintil' not in data.columns:
+        from common.classify import classify
+
+        data['RpC_2010'] = pd.to_numeric(data['RpC_2010'], errors='coerce')
+        with span('aggregate', step='quintis', rows_in=len(data)):
+            data['Quintil'] = classify(data, 'RpC_2010', k=5, method='quantiles', group_by='municipio')
+
+    # Centro de cada município: centroide da mancha urbana principal (EPSG:4326 → Albers)
+    with span('aggregate', step='mancha_urbana', rows_in=len(data)):
+        extents = UrbanExtents.load_or_build(data, os.path.join(cache_dir, "urban_extents.csv"),
+                                             buffer_km=BUFFER_KM).table
+    extents = extents.assign(city=group_labels(extents, key_columns(extents))).set_index('city')
+    to_albers = Transformer.from_crs(4326, ALBERS_BR, always_xy=True)
+    center_x, center_y = to_albers.transform(extents['cx'].to_numpy(), extents['cy'].to_numpy())
+    centers = pd.DataFrame({'x': center_x, 'y': center_y}, index=extents.index)
+
+    with span('reproject', rows_in=len(data)):
+        centroids = shapely.centroid(np.asarray(data.to_crs(ALBERS_BR).geometry.values))
+        xy = shapely.get_coordinates(centroids)
+    data['city'] = group_labels(data, key_columns(data))
+    ids_all = data['CD_SETOR'].astype(str).to_numpy()
+    quintile_all = data['Quintil'].astype('float64').fillna(0).astype('int8').to_numpy()
+
+    groups = list(data.groupby('city', observed=True).indices.items())
+    tasks = []
+    for batch in batches([len(idx) for _, idx in groups], BATCH_SECTORS):
+        tasks.append([
+            (city, ids_all[idx], xy[idx], quintile_all[idx],
+             tuple(centers.loc[city]) if city in centers.index else (np.nan, np.nan))
+            for city, idx in (groups[i] for i in batch)
+        ])
+
+    # cKDTree por cidade; lotes de cidades nos processos de trabalho
+    with span('aggregate', step='distancias', cities=len(groups), batches=len(tasks)) as step:
+        if len(tasks) > 1:
+            with ProcessPoolExecutor(max_workers=N_WORKERS) as pool:
+                parts = list(pool.map(distances_batch, tasks))
+        else:
+            parts = [distances_batch(t) for t in tasks]
+        sectors = pd.concat(parts, ignore_index=True)
+        step.count(rows_out=len(sectors))
+
+    region = data.groupby('city', observed=True)['NM_REGIAO'].first() if 'NM_REGIAO' in data.columns else None
+    summary = city_summary(sectors)
+    if region is not None:
+        summary.insert(1, 'NM_REGIAO', summary['city'].map(region).astype(str))
+    print(f"Cidades: {len(summary)} | setores Q1: {int((sectors['Quintil'] == 1).sum())} | "
+          f"mediana Q1 → Q5: {sectors.loc[sectors['Quintil'] == 1, 'dist_q5_km'].median():.2f} km")
+
+    sectors_file = os.path.join(output_dir, "opportunity_distance_sectors.csv")
+    cities_file = os.path.join(output_dir, "opportunity_distance_cities.csv")
+    with span('write', path=output_dir):
+        sectors.to_csv(sectors_file, index=False, encoding='utf-8')
+        summary.to_csv(cities_file, index=False, encoding='utf-8')
+    print(f"Tabela salva: {sectors_file}")
+    print(f"Tabela salva: {cities_file}")
+
+if __name__ == "__main__":
+    args = stage_parser(
+        "Distância dos setores Q1 ao Q5 mais próximo e ao centro urbano, por cidade.", INPUT_SHP, OUTPUT_DIR,
+        cache_dir=CACHE_DIR,
+    ).parse_args()
+    profiling.setup(args)
+    main(args.input, args.out, args.cache_dir)
@@ -8,45 +8,61 @@ Licença: CC BY 4.0
 Descrição:
 -----------
 Este script calcula os quintis de renda per capita (RpC_2010) por município nas 92 cidades médias brasileiras
-e gera dois shapefiles correspondentes aos extratos extremos da distribuição:
+e grava uma única base GeoParquet com a coluna `Quintil` (int8, 1–5) para todos os setores,
+particionada por região (Hive: `NM_REGIAO=<região>/`). Os extratos extremos são obtidos por predicado:
 - Q1 → 20% mais pobres (quintil inferior)
 - Q5 → 20% mais ricos (quintil superior)
 
 Entrada:
 ---------
 - Shapefile base com variáveis integradas: `Cidades_Medias_Variaveis.shp`
+  (ou a versão tipada `Cidades_Medias_Variaveis.parquet`, de leitura mais rápida)
   (gerado no pipeline 02_preprocessing ou 03_selection)
 
 Saídas:
 --------
-- `quintil_inferior.shp`
-- `quintil_superior.shp`
+- `Cidades_Medias_Quintis.parquet/` → base particionada por região, todos os quintis
+- (opcional) `quintil_inferior.shp` e `quintil_superior.shp`, para uso em SIG
 
-Esses arquivos são utilizados no script seguinte (`10_plot_income_maps_grouped_by_region.py`)
-para gerar os mapas regionais comparando Q1 e Q5.
+A base particionada é utilizada no script seguinte (`10_plot_income_maps_grouped_by_region.py`),
+que lê só a partição de cada região e seleciona Q1/Q5 (ou outro par) sem duplicar geometrias.
 """
 
 # =============================================================================
 # 📦 Importação de bibliotecas
 # =============================================================================
-import geopandas as gpd
-import pandas as pd
+import argparse
 import os
+import sys
+from pathlib import Path
+import pandas as pd
+
+# Pacote compartilhado (pipelines/common)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common.classify import classify
+from common import profiling
+from common.profiling import span
+from common.schema import read_sectors, write_partitioned
 
 # =============================================================================
 # ⚙️ Função principal
 # =============================================================================
-def select_quintiles(input_shp, output_inferior, output_superior):
+def select_quintiles(input_shp, output_dataset=None, output_inferior=None, output_superior=None):
     """
-    Calcula os quintis de renda (RpC_2010) por município e exporta shapefiles
-    com os setores correspondentes ao 1º e 5º quintis (Q1 e Q5).
+    Calcula os quintis de renda (RpC_2010) por município e grava `output_dataset`
+    (GeoParquet particionado por NM_REGIAO, com `Quintil` para todos os setores).
+    Se `output_inferior`/`output_superior` forem informados, exporta também os
+    shapefiles dos setores do 1º e 5º quintis (Q1 e Q5).
+
+    `input_shp` pode ser a base já em memória; sem `output_dataset` nada é gravado. Retorna
+    o GeoDataFrame com `Quintil`, que o script 10 aceita no lugar da base particionada.
     """
 
     # -------------------------------------------------------------------------
     # Etapa 1: Leitura da base
     # -------------------------------------------------------------------------
     print("🔹 Lendo o shapefile de entrada...")
-    gdf = gpd.read_file(input_shp)
+    gdf = read_sectors(input_shp)
     print(f"Total de feições lidas: {len(gdf)}")
 
     # -------------------------------------------------------------------------
@@ -59,49 +75,51 @@ def select_quintiles(input_shp, output_inferior, output_superior):
     # Etapa 3: Cálculo dos quintis por município
     # -------------------------------------------------------------------------
     print("🔹 Calculando quintis de renda por município...")
-    gdf['Quintil'] = gdf.groupby('NM_MUN')['RpC_2010'].transform(
-        lambda x: pd.qcut(x, 5, labels=[1, 2, 3, 4, 5]) 
-        if x.notna().sum() >= 5 else pd.Series([None] * len(x))
-    )
-
-    # Converte para inteiro (tratando valores nulos)
-    gdf['Quintil'] = pd.to_numeric(gdf['Quintil'], errors='coerce').astype('Int64')
+    # Mesmos cortes de pd.qcut(x, 5), vetorizados para todos os municípios (common.classify);
+    # município = NM_MUN + NM_UF, de modo que homônimos em UFs diferentes não se misturam
+    # (mesma regra dos scripts 06–08, 16, do geocode e do serviço de consultas). Municípios
+    # com menos de 5 setores com renda ficam sem quintil. Resultado em Int8.
+    with span('aggregate', step='quintis', rows_in=len(gdf)):
+        gdf['Quintil'] = classify(gdf, 'RpC_2010', k=5, method='quantiles', group_by='municipio')
 
     # -------------------------------------------------------------------------
-    # Etapa 4: Filtragem dos extratos Q1 e Q5
+    # Etapa 4: Exportação da base particionada (todos os quintis)
     # -------------------------------------------------------------------------
-    print("🔹 Filtrando os setores dos quintis extremos...")
-    gdf_inferior = gdf[gdf['Quintil'] == 1]
-    gdf_superior = gdf[gdf['Quintil'] == 5]
-
-    print(f"Feições no quintil inferior (Q1): {len(gdf_inferior)}")
-    print(f"Feições no quintil superior (Q5): {len(gdf_superior)}")
+    if output_dataset:
+        print("💾 Salvando base particionada por região...")
+        write_partitioned(gdf, output_dataset, 'NM_REGIAO')
+    for q in range(1, 6):
+        print(f"Feições no quintil Q{q}: {int((gdf['Quintil'] == q).sum())}")
+    if output_dataset:
+        print(f"✅ Base salva: {output_dataset}")
 
     # -------------------------------------------------------------------------
-    # Etapa 5: Exportação dos resultados
+    # Etapa 5 (opcional): shapefiles dos extratos Q1 e Q5
     # -------------------------------------------------------------------------
-    os.makedirs(os.path.dirname(output_inferior), exist_ok=True)
-    os.makedirs(os.path.dirname(output_superior), exist_ok=True)
-
-    print("💾 Salvando shapefiles resultantes...")
-    gdf_inferior.to_file(output_inferior)
-    gdf_superior.to_file(output_superior)
-
-    print("✅ Shapefiles salvos com sucesso:")
-    print(f"   → Quintil inferior (Q1): {output_inferior}")
-    print(f"   → Quintil superior (Q5): {output_superior}")
+    for q, output in ((1, output_inferior), (5, output_superior)):
+        if output:
+            os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+            with span('write', path=output, quintile=q):
+                gdf[gdf['Quintil'] == q].to_file(output)
+            print(f"   → Quintil Q{q}: {output}")
+    return gdf
 
 
 # =============================================================================
 # ▶️ Execução direta do script
 # =============================================================================
 if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Quintis de renda por município (base particionada por região).")
     # Caminho de entrada (produto do Script 03)
-    input_shp = r"C:\\path\\to\\data\\Cidades_Medias_Variaveis.shp"
-
-    # Caminhos de saída (ajustar conforme organização local)
-    output_inferior = r"C:\\path\\to\\outputs\\03_mapping\\quintil_inferior.shp"
-    output_superior = r"C:\\path\\to\\outputs\\03_mapping\\quintil_superior.shp"
+    ap.add_argument("--input", default=r"C:\\path\\to\\data\\Cidades_Medias_Variaveis.shp")
+    # Caminho de saída (ajustar conforme organização local)
+    ap.add_argument("--out", default=r"C:\\path\\to\\outputs\\03_mapping\\Cidades_Medias_Quintis.parquet")
+    # Shapefiles Q1/Q5 para uso em SIG (omitidos → não exporta)
+    ap.add_argument("--out-inferior", default=None)
+    ap.add_argument("--out-superior", default=None)
+    profiling.add_profile_argument(ap)
+    args = ap.parse_args()
+    profiling.setup(args)
 
     # Executar processo
-    select_quintiles(input_shp, output_inferior, output_superior)
\ No newline at end of file
+    select_quintiles(args.input, args.out, args.out_inferior, args.out_superior)
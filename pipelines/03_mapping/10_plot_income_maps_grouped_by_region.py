@@ -15,9 +15,8 @@ produzindo painéis de 6 municípios por figura, agrupados por macrorregião.
 
 Entradas:
 ---------
-- `Cidades_Medias_Variaveis.shp` → shapefile base com variáveis integradas.
-- `quintil_inferior.shp` → setores do 1º quintil (Q1).
-- `quintil_superior.shp` → setores do 5º quintil (Q5).
+- `Cidades_Medias_Quintis.parquet/` → base com `Quintil` para todos os setores, particionada por
+  região (script 09); cada região lê só a sua partição e seleciona Q1/Q5 por predicado.
 - `ne_10m_ocean.shp` → camada auxiliar (oceanos).
 - `geoft_bho_massa_dagua_v2019.shp` → camada auxiliar (massas d’água).
 
@@ -25,187 +24,142 @@ Saídas:
 --------
 - Painéis regionais (PNG, 300 dpi), agrupando até 6 municípios por figura:
   `outputs/03_mapping/{REGIAO}/{REGIAO}_municipios_01_agrupados.png`
+- `{REGIAO}/urban_extents.csv` → bbox da mancha urbana principal de cada município
+  (reaproveitada entre execuções; ver `common/urban_extents.py`).
 """
 
 # =============================================================================
 # 📦 Importação de bibliotecas
 # =============================================================================
+import argparse
 import os
-import geopandas as gpd
-import matplotlib.pyplot as plt
-import pandas as pd
+import sys
+from pathlib import Path
 import numpy as np
-import networkx as nx
-from shapely.ops import unary_union
-
-# =============================================================================
-# 🧩 Função 1 – Determinar a principal massa urbana do município
-# =============================================================================
-def determine_main_urban_area(municipality_data, buffer_km=1):
-    """
-    Determina os limites da massa urbana conectada de um município.
-
-    Procedimento:
-    -------------
-    1. Reprojeta para CRS métrico (EPSG:3857);
-    2. Aplica buffer de 'buffer_km' em km;
-    3. Cria grafo de conectividade entre setores (arestas = intersecção dos buffers);
-    4. Calcula a área de cada componente urbano;
-    5. Seleciona o maior (ou une o 2º se distante ≤ buffer_km);
-    6. Retorna o bounding box da área unificada em EPSG:4326.
-    """
-    if municipality_data.empty:
-        return None
-
-    # Reprojeção para CRS métrico
-    metric_data = municipality_data.to_crs(epsg=3857).reset_index(drop=True)
-    buffered = metric_data.geometry.buffer(buffer_km * 1000)
-
-    # Construção do grafo de conectividade
-    G = nx.Graph()
-    for idx, geom in buffered.items():
-        G.add_node(idx)
-    for idx, geom in buffered.items():
-        possible = list(buffered.sindex.intersection(geom.bounds))
-        for j in possible:
-            if idx != j and geom.intersects(buffered.loc[j]):
-                G.add_edge(idx, j)
-
-    components = list(nx.connected_components(G))
-    if not components:
-        return None
-
-    # União e área dos componentes
-    comp_area, comp_geom = {}, {}
-    for comp in components:
-        union_geom = unary_union(metric_data.loc[list(comp)].geometry)
-        comp_geom[frozenset(comp)] = union_geom
-        comp_area[frozenset(comp)] = union_geom.area
-
-    # Selecionar o maior componente
-    sorted_comps = sorted(comp_area.items(), key=lambda x: x[1], reverse=True)
-    comp1 = sorted_comps[0][0]
-    union1 = comp_geom[comp1]
-
-    # Verificar se há segundo componente a ≤ 1 km
-    if len(sorted_comps) > 1:
-        comp2 = sorted_comps[1][0]
-        union2 = comp_geom[comp2]
-        distance = union1.distance(union2)
-        final_union = unary_union([union1, union2]) if distance <= buffer_km * 1000 else union1
-    else:
-        final_union = union1
-
-    # Retornar bounding box reprojetado
-    final_union_gs = gpd.GeoSeries([final_union], crs=metric_data.crs).to_crs(epsg=4326).iloc[0]
-    return final_union_gs.bounds
 
+# Pacote compartilhado (pipelines/common)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common import thematic
+from common.figure_cache import FigureCache
+from common.pipeline import code_dependencies
+from common import profiling
+from common.profiling import span
+from common.schema import partition_values, read_sectors
+from common.thematic import BaseMap, PanelFigure, RegionMaps, sector_layers
 
 # =============================================================================
-# 🗺️ Função 2 – Geração dos mapas regionais (Q1 × Q5)
+# 🗺️ Geração dos mapas regionais (Q1 × Q5)
 # =============================================================================
-def plot_income_maps_grouped_by_region_unified(base_shp, upper_quintil_shp, lower_quintil_shp, ocean_shp, water_bodies_shp, save_path):
+def plot_income_maps_grouped_by_region_unified(quintiles_dataset, ocean_shp, water_bodies_shp, save_path, force=False,
+                                               clip_margin=0.05, simplify=True, buffer_km=1, lower_q=1, upper_q=5,
+                                               lod_cache_dir=None):
     """
     Cria mapas comparativos entre o quintil inferior (Q1) e superior (Q5)
     de renda per capita, agrupados por macrorregião e até 6 municípios por painel.
-    """
-    os.makedirs(save_path, exist_ok=True)
+    Outro par de quintis pode ser escolhido com `lower_q`/`upper_q`.
 
-    # Paleta de cores
-    quintil_superior_color = '#156E7A'  # verde petróleo (Q5)
-    quintil_inferior_color = '#EF7C80'  # vermelho (Q1)
-    ocean_color = '#4e76b7'
-    water_body_color = '#4cc4d9'
+    Painéis cujos dados (setores dos 6 municípios, Q1/Q5), camadas auxiliares e código não
+    mudaram desde a última execução são mantidos (ver `common.figure_cache`);
+    `force=True` re-renderiza todos.
 
-    # Carregar camadas
-    base_data = gpd.read_file(base_shp)
-    upper_quintil = gpd.read_file(upper_quintil_shp)
-    lower_quintil = gpd.read_file(lower_quintil_shp)
-    ocean_data = gpd.read_file(ocean_shp)
-    water_bodies = gpd.read_file(water_bodies_shp)
+    Oceano e massas d'água são recortados por painel ao limite urbano + `clip_margin`
+    (fração da maior dimensão) e, com `simplify=True`, simplificados a meio pixel; os setores
+    usam o nível de detalhe (`common.lod`) adequado a esse meio pixel, com os níveis
+    simplificados guardados em `lod_cache_dir` (padrão: `save_path/lod_cache`).
 
-    # Reprojeção para WGS84
-    for layer in [base_data, upper_quintil, lower_quintil, ocean_data, water_bodies]:
-        layer.to_crs(epsg=4326, inplace=True)
+    O enquadramento de cada município vem da tabela de manchas urbanas principais
+    (`common.urban_extents`), calculada uma vez por região e gravada em
+    `{REGIAO}/urban_extents.csv`; só é refeita se a malha ou `buffer_km` mudam.
 
-    base_data['Region'] = base_data['NM_REGIAO']
-    upper_quintil['Region'] = upper_quintil['NM_REGIAO']
-    lower_quintil['Region'] = lower_quintil['NM_REGIAO']
+    Renderização em lote (`common.batch_render`): a geometria de cada nível de detalhe vira
+    buffers de vértices uma vez por região, os setores de cada painel (base, Q1 e Q5) são
+    uma única `PathCollection` com cor por setor, e a figura 2 × 3 é criada uma vez e
+    reaproveitada entre os grupos.
+    """
+    os.makedirs(save_path, exist_ok=True)
+    cache = FigureCache(save_path, code_files=code_dependencies(__file__), force=force)
+
+    # Paleta: fundo, Q1 e Q5 (demais quintis ficam com a cor de fundo)
+    palette = np.full(6, thematic.BASE_COLOR, dtype=object)
+    palette[lower_q] = thematic.LOWER_COLOR   # vermelho (Q1)
+    palette[upper_q] = thematic.UPPER_COLOR   # verde petróleo (Q5)
 
-    base_data['RpC_2010'] = pd.to_numeric(base_data['RpC_2010'], errors='coerce')
+    # Camadas auxiliares indexadas uma única vez; cada painel recorta só a área visível
+    basemap = BaseMap(ocean_shp, water_bodies_shp)
+    figure = PanelFigure()
 
-    # Processar por região
-    regions = base_data['Region'].dropna().unique()
+    # Processar por região: só a partição da região é lida
+    regions = partition_values(quintiles_dataset, 'NM_REGIAO')
     for region in regions:
         region_path = os.path.join(save_path, region)
         os.makedirs(region_path, exist_ok=True)
 
-        region_data = base_data[base_data['Region'] == region]
-        upper_region = upper_quintil[upper_quintil['Region'] == region]
-        lower_region = lower_quintil[lower_quintil['Region'] == region]
+        region_data = read_sectors(quintiles_dataset, filters=[('NM_REGIAO', '==', region)])
+        with span('reproject', region=region, rows_in=len(region_data)):
+            region_data = region_data.to_crs(epsg=4326)
 
-        municipalities = sorted(region_data['NM_MUN'].unique())
+        # Manchas urbanas (tabela persistida), níveis de detalhe e buffers de vértices da região
+        with span('aggregate', step='regiao', region=region, rows_in=len(region_data)):
+            maps = RegionMaps(region_data, region_path, lod_cache_dir or os.path.join(save_path, "lod_cache"),
+                              buffer_km=buffer_km)
+        basemap.clear()
+        layers = sector_layers(region_data['Quintil'], highlight=(lower_q, upper_q))
+
+        municipalities = maps.municipalities
         municipality_ids = {m: f"{i+1:02d}" for i, m in enumerate(municipalities)}
 
         # Agrupar 6 municípios por figura
-        for i in range(0, len(municipalities), 6):
-            grouped = municipalities[i:i + 6]
-            fig, axes = plt.subplots(nrows=2, ncols=3, figsize=(18, 12))
-            fig.suptitle(f"Região {region} - Municípios Agrupados", fontsize=26, fontweight='bold')
-            axes = axes.ravel()
-
-            for j, municipality in enumerate(grouped):
-                municipality_data = region_data[region_data['NM_MUN'] == municipality]
-                upper_data = upper_region[upper_region['NM_MUN'] == municipality]
-                lower_data = lower_region[lower_region['NM_MUN'] == municipality]
-                uf = municipality_data['NM_UF'].iloc[0] if 'NM_UF' in municipality_data.columns else ''
-
-                urban_bounds = determine_main_urban_area(municipality_data, buffer_km=1)
-                if urban_bounds:
-                    xlim = [urban_bounds[0], urban_bounds[2]]
-                    ylim = [urban_bounds[1], urban_bounds[3]]
-                    municipality_id = municipality_ids[municipality]
-
-                    # Plotagem
-                    ocean_data.plot(color=ocean_color, ax=axes[j])
-                    water_bodies.plot(color=water_body_color, ax=axes[j])
-                    municipality_data.plot(color='#D6E6F2', linewidth=0.1, edgecolor='gray', ax=axes[j])
-                    lower_data.plot(color=quintil_inferior_color, linewidth=0.1, edgecolor='gray', ax=axes[j])
-                    upper_data.plot(color=quintil_superior_color, linewidth=0.1, edgecolor='gray', ax=axes[j])
-
-                    axes[j].set_title(f"({municipality_id}) {municipality} - {uf}", fontsize=15, fontweight='bold')
-                    axes[j].set_xlim(xlim)
-                    axes[j].set_ylim(ylim)
-                    axes[j].axis("off")
-
-            # Ocultar subplots vazios
-            for k in range(len(grouped), len(axes)):
-                axes[k].set_visible(False)
-
-            filename = os.path.join(region_path, f"{region}_municipios_{(i // 6) + 1}_agrupados.png")
-            plt.tight_layout()
-            plt.subplots_adjust(top=0.92)
-            plt.savefig(filename, dpi=300, bbox_inches='tight')
-            plt.close()
+        for i in range(0, len(municipalities), thematic.PANELS_PER_FIGURE):
+            grouped = municipalities[i:i + thematic.PANELS_PER_FIGURE]
+            filename = os.path.join(region_path, f"{region}_municipios_{(i // thematic.PANELS_PER_FIGURE) + 1}_agrupados.png")
+
+            # Cache incremental: só re-renderiza painéis cujos municípios mudaram
+            key = cache.key(
+                region_data[maps.in_group(grouped)],
+                params={
+                    'region': region, 'municipalities': grouped, 'quintiles': [lower_q, upper_q],
+                    'ids': [municipality_ids[m] for m in grouped],
+                    'colors': list(palette) + [thematic.OCEAN_COLOR, thematic.WATER_BODY_COLOR],
+                    'aux': basemap.signature, 'dpi': thematic.DPI, 'buffer_km': buffer_km,
+                    'clip_margin': clip_margin, 'simplify': simplify,
+                },
+            )
+            if cache.is_fresh(filename, key):
+                print(f"🗺️ Mapa atualizado (cache): {filename}")
+                continue
+
+            with span('render', region=region, panels=len(grouped)):
+                axes = figure.start(f"Região {region} - Municípios Agrupados")
+                for j, municipality in enumerate(grouped):
+                    title = f"({municipality_ids[municipality]}) {maps.name(municipality)} - {maps.uf(municipality)}"
+                    maps.draw_panel(axes[j], basemap, municipality, layers, palette, title,
+                                    clip_margin=clip_margin, simplify=simplify)
+
+            figure.save(filename, len(grouped))
+            cache.record(filename, key)
             print(f"🗺️ Mapa salvo: {filename}")
 
+    figure.close()
+
 
 # =============================================================================
 # ▶️ Execução direta
 # =============================================================================
 if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Mapas Q1 × Q5 por município, agrupados por região.")
     # Caminhos de entrada (ajustar conforme diretório local)
-    base_shp = r"C:\\path\\to\\data\\Cidades_Medias_Variaveis.shp"
-    upper_quintil_shp = r"C:\\path\\to\\outputs\\03_mapping\\quintil_superior.shp"
-    lower_quintil_shp = r"C:\\path\\to\\outputs\\03_mapping\\quintil_inferior.shp"
-    ocean_shp = r"C:\\path\\to\\data\\auxiliary\\ne_10m_ocean.shp"
-    water_bodies_shp = r"C:\\path\\to\\data\\auxiliary\\geoft_bho_massa_dagua_v2019.shp"
-
+    ap.add_argument("--input", default=r"C:\\path\\to\\outputs\\03_mapping\\Cidades_Medias_Quintis.parquet")
+    ap.add_argument("--ocean", default=r"C:\\path\\to\\data\\auxiliary\\ne_10m_ocean.shp")
+    ap.add_argument("--water", default=r"C:\\path\\to\\data\\auxiliary\\geoft_bho_massa_dagua_v2019.shp")
     # Diretório de saída
-    save_path = r"C:\\path\\to\\outputs\\03_mapping\\maps"
+    ap.add_argument("--out", default=r"C:\\path\\to\\outputs\\03_mapping\\maps")
+    # Re-renderiza todos os painéis, ignorando o manifesto de cache
+    ap.add_argument("--force", action="store_true")
+    profiling.add_profile_argument(ap)
+    args = ap.parse_args()
+    profiling.setup(args)
 
     # Executar função
     plot_income_maps_grouped_by_region_unified(
-        base_shp, upper_quintil_shp, lower_quintil_shp,
-        ocean_shp, water_bodies_shp, save_path
-    )
\ No newline at end of file
+        args.input, args.ocean, args.water, args.out, force=args.force
+    )
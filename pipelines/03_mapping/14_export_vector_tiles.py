@@ -0,0 +1,151 @@
+# scripts/14_export_vector_tiles.py
+"""
+Exporta a base de setores das cidades médias (com Quintil, raça e infraestrutura) como
+vector tiles num arquivo MBTiles e, opcionalmente, serve o arquivo num visualizador local.
+
+Uso:
+    python 14_export_vector_tiles.py                       # exporta (constantes abaixo)
+    python 14_export_vector_tiles.py --serve               # exporta e abre o servidor local
+    python 14_export_vector_tiles.py --serve-only          # só serve um MBTiles já gerado
+
+Os tiles de cada zoom são gerados em lotes (`CHUNK_TILES`) distribuídos entre processos;
+cada processo recebe a malha uma única vez e consulta o próprio STRtree. A geometria é
+recortada ao tile e simplificada a 1 unidade da grade do tile (tolerância do zoom).
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import shapely
+from pyproj import Transformer
+
+# Pacote compartilhado (pipelines/common)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common.correlation_stats import INFRA, RACES
+from common import profiling
+from common.mbtiles import MBTilesWriter
+from common.profiling import span
+from common.schema import read_sectors
+from common.tile_server import serve_mbtiles
+from common.vector_tiles import init_worker, render_chunk, tiles_for_bounds
+
+# >>>>>> PREENCHA AQUI <<<<<<
+# Entrada: base de quintis do script 09 (Cidades_Medias_Quintis.parquet) ou qualquer base
+# de setores (sem a coluna Quintil, os tiles saem sem ela)
+INPUT_PATH = r"outputs/03_mapping/Cidades_Medias_Quintis.parquet"
+
+# Arquivo MBTiles de saída
+OUTPUT_MBTILES = r"outputs/09_vector_tiles/cidades_medias.mbtiles"
+
+# Zooms gerados (8 ≈ região metropolitana; 14 ≈ quadra)
+MIN_ZOOM = 8
+MAX_ZOOM = 14
+
+# Tiles por tarefa e processos paralelos (None = nº de CPUs)
+CHUNK_TILES = 256
+N_WORKERS = None
+
+# Servidor local
+HOST = "127.0.0.1"
+PORT = 8080
+# <<<<<<<<<<<<<<<<<<<<<<<<<<<<
+
+LAYER_NAME = "setores"
+
+ATTRIBUTES = (
+    ['CD_SETOR', 'NM_MUN', 'NM_UF', 'NM_REGIAO', 'Quintil', 'RpC_2010', 'v0001']
+    + RACES + ['P_Branca', 'P_Preta', 'P_Amarela', 'P_Parda', 'P_Indigena'] + INFRA
+)
+
+def _field_type(dtype):
+    if pd.api.types.is_bool_dtype(dtype):
+        return "Boolean"
+    if pd.api.types.is_numeric_dtype(dtype):
+        return "Number"
+    return "String"
+
+
+def export_vector_tiles(input_path, output_mbtiles, min_zoom=MIN_ZOOM, max_zoom=MAX_ZOOM,
+                        chunk_tiles=CHUNK_TILES, n_workers=N_WORKERS):
+    """Gera o MBTiles (zooms `min_zoom`…`max_zoom`) a partir da base de setores (caminho ou em memória)."""
+    data = read_sectors(input_path)
+    print("Total de registros lidos:", len(data))
+    data = data[~(data.geometry.isna() | data.geometry.is_empty)]
+    columns = [c for c in ATTRIBUTES if c in data.columns]
+
+    with span('reproject', rows_in=len(data)):
+        mercator = data.to_crs(epsg=3857)
+    geoms = np.asarray(mercator.geometry.values)
+    bounds = shapely.bounds(geoms)
+    # Floats arredondados (4 casas): tiles menores e sem ruído de float32 nos atributos
+    table = data[columns].copy()
+    for c in columns:
+        if pd.api.types.is_float_dtype(table[c].dtype):
+            table[c] = table[c].astype('float64').round(4)
+    attributes = table.astype(object).where(table.notna(), None).to_dict('records')
+
+    t0 = time.perf_counter()
+    n_tiles = 0
+    with MBTilesWriter(output_mbtiles) as out, ProcessPoolExecutor(
+            max_workers=n_workers, initializer=init_worker,
+            initargs=(shapely.to_wkb(geoms), attributes, LAYER_NAME)) as pool:
+        for z in range(min_zoom, max_zoom + 1):
+            with span('render', zoom=z) as step:
+                tiles = tiles_for_bounds(bounds, z)
+                futures = [pool.submit(render_chunk, z, tiles[i:i + chunk_tiles])
+                           for i in range(0, len(tiles), chunk_tiles)]
+                written = 0
+                for fut in as_completed(futures):
+                    result = fut.result()
+                    out.write_many(result)
+                    written += len(result)
+                step.count(tiles_in=len(tiles), tiles_out=written)
+            n_tiles += written
+            print(f"✔ zoom {z}: {written} tiles ({len(tiles)} candidatos)")
+
+        lon0, lat0, lon1, lat1 = data.to_crs(epsg=4326).total_bounds
+        to_wgs84 = Transformer.from_crs(3857, 4326, always_xy=True)
+        cx, cy = to_wgs84.transform(*np.median(bounds.reshape(-1, 2, 2).mean(axis=1), axis=0))
+        out.set_metadata(
+            name=Path(output_mbtiles).stem, format="pbf", type="overlay", version="1.0",
+            description="Setores censitários das cidades médias: quintis de renda, raça e infraestrutura",
+            minzoom=min_zoom, maxzoom=max_zoom,
+            bounds=f"{lon0:.6f},{lat0:.6f},{lon1:.6f},{lat1:.6f}",
+            center=f"{cx:.6f},{cy:.6f},{min(max_zoom, max(min_zoom, 11))}",
+            json={"vector_layers": [{
+                "id": LAYER_NAME, "minzoom": min_zoom, "maxzoom": max_zoom,
+                "fields": {c: _field_type(data[c].dtype) for c in columns},
+            }]},
+        )
+    print(f"MBTiles salvo: {output_mbtiles}  (tiles={n_tiles}, {time.perf_counter() - t0:.1f} s)")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Exporta a base de setores para vector tiles (MBTiles) e serve localmente.")
+    ap.add_argument("--input", default=INPUT_PATH, help="Base de setores (GeoParquet/shapefile).")
+    ap.add_argument("--out", default=OUTPUT_MBTILES, help="Arquivo .mbtiles de saída.")
+    ap.add_argument("--min-zoom", type=int, default=MIN_ZOOM)
+    ap.add_argument("--max-zoom", type=int, default=MAX_ZOOM)
+    ap.add_argument("--workers", type=int, default=N_WORKERS, help="Processos paralelos (padrão: nº de CPUs).")
+    ap.add_argument("--serve", action="store_true", help="Após exportar, serve o MBTiles em http://HOST:PORT/.")
+    ap.add_argument("--serve-only", action="store_true", help="Só serve um MBTiles já existente.")
+    ap.add_argument("--host", default=HOST)
+    ap.add_argument("--port", type=int, default=PORT)
+    profiling.add_profile_argument(ap)
+    args = ap.parse_args()
+    profiling.setup(args)
+
+    if not args.serve_only:
+        os.makedirs(os.path.dirname(args.out) or '.', exist_ok=True)
+        export_vector_tiles(args.input, args.out, args.min_zoom, args.max_zoom, n_workers=args.workers)
+    if args.serve or args.serve_only:
+        serve_mbtiles(args.out, args.host, args.port)
+
+if __name__ == "__main__":
+    main()
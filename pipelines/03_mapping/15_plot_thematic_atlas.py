@@ -0,0 +1,169 @@
+# scripts/15_plot_thematic_atlas.py
+"""
+Atlas temático das cidades médias: para cada variável, classes por município (ou UF/região)
+e painéis regionais de 6 municípios no mesmo formato dos mapas Q1 × Q5 (script 10).
+
+Uso:
+    python 15_plot_thematic_atlas.py                                   # constantes abaixo
+    python 15_plot_thematic_atlas.py --variables P_Esgo P_Preta --method jenks --classes 4
+    python 15_plot_thematic_atlas.py --variables RpC_2010 --highlight 1 5   # = script 10
+
+Classificação (`common.classify`): 'quantiles', 'jenks' ou 'equal_interval', calculada de
+forma vetorizada para todos os grupos de `--group-by` ('municipio', 'uf' ou 'regiao').
+Com `--highlight`, só as classes indicadas são coloridas (as demais ficam com a cor de fundo).
+
+Custo: cada região é lida uma vez e as manchas urbanas, níveis de detalhe, buffers de
+vértices e recortes de oceano/massas d'água (`common.thematic`) servem a todas as variáveis;
+por variável restam a classificação e o desenho. Com `CACHE_DIR` apontando para a pasta do
+script 10, as tabelas de manchas urbanas e o `lod_cache` gravados por ele são reaproveitados.
+Figuras inalteradas são puladas (`common.figure_cache`).
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Pacote compartilhado (pipelines/common)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common import thematic
+from common.classify import GROUPINGS, METHODS, classify
+from common.figure_cache import FigureCache
+from common.pipeline import code_dependencies
+from common import profiling
+from common.profiling import span
+from common.schema import partition_values, read_sectors
+from common.thematic import BaseMap, PanelFigure, RegionMaps, class_palette, sector_layers
+
+# >>>>>> PREENCHA AQUI <<<<<<
+# Base particionada por região do script 09 (todas as variáveis dos setores)
+INPUT_DATASET = r"outputs/03_mapping/Cidades_Medias_Quintis.parquet"
+
+# Camadas auxiliares
+OCEAN_SHP = r"data/auxiliary/ne_10m_ocean.shp"
+WATER_BODIES_SHP = r"data/auxiliary/geoft_bho_massa_dagua_v2019.shp"
+
+# Saída: {OUTPUT_DIR}/{variável}/{REGIAO}/{REGIAO}_{variável}_NN.png
+OUTPUT_DIR = r"outputs/03_mapping/atlas"
+
+# Manchas urbanas ({REGIAO}/urban_extents.csv) e lod_cache/ — a pasta do script 10 os reaproveita
+CACHE_DIR = r"outputs/03_mapping/maps"
+
+# Variáveis, classificação e classes destacadas (None = todas)
+VARIABLES = ['RpC_2010', 'P_Esgo', 'P_Agua', 'P_Lixo', 'P_Preta', 'P_Branca']
+METHOD = 'quantiles'
+N_CLASSES = 5
+GROUP_BY = 'municipio'
+HIGHLIGHT = None
+# <<<<<<<<<<<<<<<<<<<<<<<<<<<<
+
+METHOD_LABELS = {'quantiles': 'quantis', 'equal_interval': 'intervalos iguais', 'jenks': 'Jenks'}
+GROUP_LABELS = {'municipio': 'município', 'uf': 'UF', 'regiao': 'região'}
+
+
+def plot_thematic_atlas(input_dataset, ocean_shp, water_bodies_shp, output_dir, variables,
+                        method=METHOD, n_classes=N_CLASSES, group_by=GROUP_BY, highlight=HIGHLIGHT,
+                        cache_dir=CACHE_DIR, force=False, clip_margin=0.05, simplify=True, buffer_km=1):
+    """Gera os painéis regionais de cada variável de `variables`; retorna a lista de PNGs."""
+    if method not in METHODS:
+        raise ValueError(f"method deve ser um de {METHODS}: {method!r}")
+    if group_by not in GROUPINGS:
+        raise ValueError(f"group_by deve ser um de {sorted(GROUPINGS)}: {group_by!r}")
+    os.makedirs(output_dir, exist_ok=True)
+    cache_dir = cache_dir or output_dir
+    cache = FigureCache(output_dir, code_files=code_dependencies(__file__), force=force)
+
+    palette = class_palette(n_classes, highlight)
+    shown = [c for c in range(1, n_classes + 1) if highlight is None or c in highlight]
+    labels = [f"C{c}" + (" (menor)" if c == 1 else " (maior)" if c == n_classes else "") for c in shown]
+
+    basemap = BaseMap(ocean_shp, water_bodies_shp)
+    figure = PanelFigure()
+    saved = []
+
+    for region in partition_values(input_dataset, 'NM_REGIAO'):
+        region_data = read_sectors(input_dataset, filters=[('NM_REGIAO', '==', region)])
+        with span('reproject', region=region, rows_in=len(region_data)):
+            region_data = region_data.to_crs(epsg=4326)
+        missing = [v for v in variables if v not in region_data.columns]
+        if missing:
+            raise KeyError(f"Variáveis ausentes na base: {missing}")
+
+        # Estado da região compartilhado por todas as variáveis
+        with span('aggregate', step='regiao', region=region, rows_in=len(region_data)):
+            maps = RegionMaps(region_data, os.path.join(cache_dir, region), os.path.join(cache_dir, "lod_cache"),
+                              buffer_km=buffer_km)
+        basemap.clear()
+        municipalities = maps.municipalities
+        municipality_ids = {m: f"{i+1:02d}" for i, m in enumerate(municipalities)}
+
+        for variable in variables:
+            var_path = os.path.join(output_dir, variable, region)
+            os.makedirs(var_path, exist_ok=True)
+            with span('aggregate', step='classes', region=region, variable=variable, rows_in=len(region_data)):
+                classes = classify(region_data, variable, n_classes, method, group_by)
+            layers = sector_layers(classes, highlight)
+            title = (f"{variable} – {METHOD_LABELS[method]} ({n_classes} classes por "
+                     f"{GROUP_LABELS[group_by]}) – Região {region}")
+
+            for i in range(0, len(municipalities), thematic.PANELS_PER_FIGURE):
+                grouped = municipalities[i:i + thematic.PANELS_PER_FIGURE]
+                filename = os.path.join(var_path, f"{region}_{variable}_{(i // thematic.PANELS_PER_FIGURE) + 1:02d}.png")
+
+                in_group = maps.in_group(grouped)
+                key = cache.key(
+                    region_data.loc[in_group, maps.key_cols + ['geometry']], classes[in_group],
+                    params={
+                        'region': region, 'variable': variable, 'method': method, 'k': n_classes,
+                        'group_by': group_by, 'highlight': highlight, 'municipalities': grouped,
+                        'ids': [municipality_ids[m] for m in grouped], 'colors': list(palette),
+                        'aux': basemap.signature, 'dpi': thematic.DPI, 'buffer_km': buffer_km,
+                        'clip_margin': clip_margin, 'simplify': simplify,
+                    },
+                )
+                if cache.is_fresh(filename, key):
+                    print(f"🗺️ Mapa atualizado (cache): {filename}")
+                    saved.append(filename)
+                    continue
+
+                with span('render', region=region, variable=variable, panels=len(grouped)):
+                    axes = figure.start(title)
+                    for j, municipality in enumerate(grouped):
+                        panel_title = f"({municipality_ids[municipality]}) {maps.name(municipality)} - {maps.uf(municipality)}"
+                        maps.draw_panel(axes[j], basemap, municipality, layers, palette, panel_title,
+                                        clip_margin=clip_margin, simplify=simplify)
+                    figure.legend(labels, palette[np.array(shown, dtype=int)])
+                figure.save(filename, len(grouped))
+                cache.record(filename, key)
+                saved.append(filename)
+                print(f"🗺️ Mapa salvo: {filename}")
+
+    figure.close()
+    return saved
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Atlas temático por município (classes por variável), agrupado por região.")
+    ap.add_argument("--input", default=INPUT_DATASET, help="Base particionada por região (script 09).")
+    ap.add_argument("--ocean", default=OCEAN_SHP)
+    ap.add_argument("--water", default=WATER_BODIES_SHP)
+    ap.add_argument("--out", default=OUTPUT_DIR)
+    ap.add_argument("--cache-dir", default=CACHE_DIR, help="Pasta com urban_extents/lod_cache (ex.: a do script 10).")
+    ap.add_argument("--variables", nargs="+", default=VARIABLES)
+    ap.add_argument("--method", choices=METHODS, default=METHOD)
+    ap.add_argument("--classes", type=int, default=N_CLASSES)
+    ap.add_argument("--group-by", choices=sorted(GROUPINGS), default=GROUP_BY)
+    ap.add_argument("--highlight", type=int, nargs="+", default=HIGHLIGHT, help="Classes destacadas (ex.: 1 5).")
+    ap.add_argument("--force", action="store_true", help="Re-renderiza todas as figuras.")
+    profiling.add_profile_argument(ap)
+    args = ap.parse_args()
+    profiling.setup(args)
+
+    plot_thematic_atlas(args.input, args.ocean, args.water, args.out, args.variables,
+                        method=args.method, n_classes=args.classes, group_by=args.group_by,
+                        highlight=args.highlight, cache_dir=args.cache_dir, force=args.force)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# scripts/17_aggregate_hexgrid.py
+"""
+Reagrega população, contagens por raça, acesso à infraestrutura e renda da base de setores
+das cidades médias numa grade hexagonal regular (ver `common/hexgrid.py`).
+
+Uso:
+    python 17_aggregate_hexgrid.py                              # hexágonos de 500 m (constantes abaixo)
+    python 17_aggregate_hexgrid.py --size 1000 --out outputs/10_hexgrid/Cidades_Medias_Hex1000.parquet
+
+A saída é um GeoParquet com o esquema da base de setores (uma célula por linha, id em
+CD_SETOR), que pode ser usado como `--input` dos scripts 04–16 e 09/10 no lugar de
+`Cidades_Medias_Variaveis`: as células têm o mesmo tamanho em todas as cidades e a malha
+é bem mais leve de desenhar. As interseções setor × hexágono ficam em cache em
+`CACHE_DIR`; enquanto a malha e o lado não mudam, a reagregação não refaz nenhuma.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Pacote compartilhado (pipelines/common)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common import profiling
+from common.hexgrid import HEX_SIZE, HexGrid
+from common.schema import read_sectors, write_sectors
+
+# >>>>>> PREENCHA AQUI <<<<<<
+# Entrada: produto do script 03 (Cidades_Medias_Variaveis.parquet ou .shp)
+INPUT_PATH = r"outputs/00_build_base/cidades_medias/Cidades_Medias_Variaveis.parquet"
+
+# Camada de hexágonos (GeoParquet) e cache das interseções setor × hexágono
+OUTPUT_PATH = r"outputs/10_hexgrid/Cidades_Medias_Hex500.parquet"
+CACHE_DIR = r"outputs/cache/hexgrid"
+
+# Lado do hexágono (m) e processos paralelos (None = nº de CPUs)
+SIZE_M = HEX_SIZE
+N_WORKERS = None
+# <<<<<<<<<<<<<<<<<<<<<<<<<<<<
+
+
+def aggregate_hexgrid(input_path, output_path=None, size=SIZE_M, cache_dir=CACHE_DIR, n_workers=N_WORKERS):
+    """
+    Camada de hexágonos de lado `size` (m) da base `input_path` (caminho ou GeoDataFrame).
+    Com `output_path`, grava o GeoParquet; retorna o GeoDataFrame.
+    """
+    t0 = time.perf_counter()
+    sectors = read_sectors(input_path)
+    print(f"🔹 Setores lidos: {len(sectors)}")
+
+    grid = HexGrid.load_or_build(sectors, cache_dir, size=size, workers=n_workers)
+    print(f"🔹 Grade: {len(grid)} células de {size:g} m ({grid.areas.nnz} pares setor × célula)")
+    hexes = grid.aggregate(sectors)
+
+    if output_path:
+        write_sectors(hexes, output_path)
+        print(f"✅ Camada salva: {output_path}  ({len(hexes)} células, {time.perf_counter() - t0:.1f} s)")
+    return hexes
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Reagrega a base de setores numa grade hexagonal (Albers).")
+    ap.add_argument("--input", default=INPUT_PATH, help="Base de setores (GeoParquet/shapefile).")
+    ap.add_argument("--out", default=OUTPUT_PATH, help="GeoParquet de saída.")
+    ap.add_argument("--size", type=float, default=SIZE_M, help=f"Lado do hexágono em metros (padrão: {SIZE_M}).")
+    ap.add_argument("--cache-dir", default=CACHE_DIR, help="Pasta do cache de interseções.")
+    ap.add_argument("--workers", type=int, default=N_WORKERS, help="Processos paralelos (padrão: nº de CPUs).")
+    profiling.add_profile_argument(ap)
+    args = ap.parse_args()
+    profiling.setup(args)
+    aggregate_hexgrid(args.input, args.out, args.size, args.cache_dir, args.workers)
+
+if __name__ == "__main__":
+    main()
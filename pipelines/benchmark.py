@@ -0,0 +1,541 @@
+# scripts/benchmark.py
+"""
+Benchmarks das etapas do pipeline sobre a malha censitária sintética (`common/synthetic.py`),
+sem os dados do IBGE.
+
+Uso:
+    python pipelines/benchmark.py run                             # escala 'pequena', todos os casos
+    python pipelines/benchmark.py run --scale regiao --repeat 5 overlay select
+    python pipelines/benchmark.py compare                         # última execução × commit anterior
+    python pipelines/benchmark.py generate --scale nacional --out data/synthetic/nacional
+
+Casos (`CASES`):
+    - excel_ingest → leitura e limpeza dos agregados (script 01);
+    - indicators   → percentuais de domicílio e raça/cor (script 01);
+    - overlay      → harmonização da renda 2010 → 2022 (script 02);
+    - raster       → harmonização com a interseção aproximada por rasterização (células de
+                     `RASTER_CELL` m, sem a amostra de erro);
+    - reweight     → pesos area/population/urban + RpC harmonizada sobre a matriz de
+                     interseções já calculada (troca de método sem novo overlay);
+    - crosswalk    → RpC de 2000 levada à malha 2022 pela composição dos crosswalks em cache
+                     2000 → 2010 → 2022 (`common/crosswalk.py`; os overlays ficam fora da medição);
+    - hexgrid      → interseções setor × hexágono (lado `HEX_SIZE` m) e reagregação da base
+                     das cidades médias (`common/hexgrid.py`, sem o cache em disco);
+    - geocode      → `GEOCODE_POINTS` pontos sorteados nos setores das cidades médias → setor e
+                     indicadores (`common/geocode.py`; o índice em cache fica fora da medição);
+    - select       → dissolve por município + contiguidade Queen + seleção (script 03);
+    - quintiles    → quintis de renda por município (script 09);
+    - render       → mapas Q1 × Q5 por região (script 10);
+    - startup      → `<script> --help` de cada script numerado (01–17) sob `python -X importtime`:
+                     tempo de parede e soma das importações de primeiro nível, com os módulos
+                     pesados (matplotlib, libpysal, networkx, geopandas) que foram carregados.
+                     Não usa os dados sintéticos; ver "Importações" em `common/__init__.py`.
+
+Cada repetição de cada caso roda num subprocesso novo: a leitura das entradas fica fora da
+medição e o pico de memória não herda o das medições anteriores. Tempo e memória (pico de
+RSS) vêm de `common.profiling`; os passos internos das etapas entram no resultado com o
+caminho completo (ex.: `select/dissolve`, `select/contiguity`, `overlay/overlay`). O tempo
+registrado é o mínimo entre as repetições, e o pico de memória, o máximo.
+
+Os insumos sintéticos e as bases intermediárias (indicadores, harmonizada, cidades médias,
+quintis) de cada escala são gerados uma vez em `<workdir>/data/<escala>_seed<seed>/` e
+refeitos quando o gerador ou o código das etapas 01–03/09 mudam. Cada execução é
+acrescentada a `<workdir>/history.jsonl` com o commit (git) e comparada à última execução de
+outro commit na mesma escala: tempos ou picos acima de `--threshold` são listados como
+regressão (`--fail-on-regression` → código de saída 1, para uso em CI).
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Pacote compartilhado (pipelines/common)
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from common import profiling, synthetic
+from common.pipeline import code_dependencies, load_script
+
+# >>>>>> PREENCHA AQUI <<<<<<
+WORKDIR = r"outputs/benchmarks"
+SCALE = "pequena"            # ver common.synthetic.SCALES
+SEED = 0
+REPEAT = 3
+
+# Regressão: variação relativa acima de THRESHOLD e absoluta acima dos mínimos abaixo
+THRESHOLD = 0.10
+MIN_DELTA_S = 0.05
+MIN_DELTA_MB = 20
+
+# Caso 'raster': lado da célula (m) do modo aproximado do script 02
+RASTER_CELL = 50
+
+# Caso 'hexgrid': lado do hexágono (m)
+HEX_SIZE = 500
+
+# Caso 'geocode': pontos consultados
+GEOCODE_POINTS = 1_000_000
+# <<<<<<<<<<<<<<<<<<<<<<<<<<<<
+
+HERE = Path(__file__).resolve().parent
+
+SCRIPTS = {
+    '01': ("01_build_base", "01_build_indicators_from_excels.py"),
+    '02': ("01_build_base", "02_harmonize_renda_2010_to_2022.py"),
+    '03': ("01_build_base", "03_select_mid_sized_cities_idsafe.py"),
+    '09': ("03_mapping", "09_select_quintiles_q1_q5.py"),
+    '10': ("03_mapping", "10_plot_income_maps_grouped_by_region.py"),
+}
+
+
+def script(key):
+    folder, filename = SCRIPTS[key]
+    return load_script(HERE / folder / filename)
+
+
+# =============================================================================
+# Dados sintéticos e bases intermediárias
+# =============================================================================
+def _data_version(scale, seed):
+    h = hashlib.sha256(json.dumps([scale, seed]).encode('utf-8'))
+    paths = {Path(synthetic.__file__).resolve()}
+    for key in ('01', '02', '03', '09'):
+        paths.update(code_dependencies(HERE.joinpath(*SCRIPTS[key])))
+    for path in sorted(paths):
+        h.update(path.read_bytes())
+    return h.hexdigest()
+
+
+def prepare(workdir=WORKDIR, scale=SCALE, seed=SEED):
+    """
+    Insumos sintéticos da escala + bases intermediárias de cada etapa (gravados uma vez).
+    Retorna {nome: caminho}: os de `synthetic.generate` e 'indicators', 'harmonized',
+    'base', 'quintiles'.
+    """
+    from common.schema import write_sectors
+
+    data_dir = Path(workdir) / "data" / f"{scale}_seed{seed}"
+    manifest = data_dir / "benchmark_data.json"
+    version = _data_version(scale, seed)
+    if manifest.exists():
+        saved = json.loads(manifest.read_text(encoding='utf-8'))
+        paths = {k: Path(v) for k, v in saved['paths'].items()}
+        if saved['version'] == version and all(p.exists() for p in paths.values()):
+            return paths
+
+    print(f"🧪 Preparando dados de benchmark: {data_dir}")
+    paths = synthetic.generate(data_dir / "raw", scale, seed=seed)
+    fixtures = data_dir / "fixtures"
+    fixtures.mkdir(parents=True, exist_ok=True)
+    paths.update({
+        'indicators': fixtures / "Setores_Indicadores_Censo_22.parquet",
+        'harmonized': fixtures / "Setores_raca_renda.parquet",
+        'base': fixtures / "Cidades_Medias_Variaveis.parquet",
+        'quintiles': fixtures / "Cidades_Medias_Quintis.parquet",
+    })
+    gdf = script('01').build_indicators(paths['sectors_2022'], paths['excel_dir'])
+    write_sectors(gdf, paths['indicators'])
+    gdf = script('02').harmonize_income(gdf, paths['sectors_2010'])
+    write_sectors(gdf, paths['harmonized'])
+    gdf = script('03').select_mid_sized_cities(gdf)
+    write_sectors(gdf, paths['base'])
+    gdf = script('09').select_quintiles(gdf)
+    write_sectors(gdf, paths['quintiles'])
+
+    manifest.write_text(json.dumps({'version': version, 'paths': {k: str(v) for k, v in paths.items()}},
+                                   indent=2), encoding='utf-8')
+    return paths
+
+
+# =============================================================================
+# Casos: preparo (fora da medição) → função medida
+# =============================================================================
+def _excel_ingest(paths):
+    s01 = script('01')
+    return lambda: s01.read_and_clean_excels(str(paths['excel_dir']))
+
+
+def _indicators(paths):
+    s01 = script('01')
+    excels = s01.read_and_clean_excels(str(paths['excel_dir']))
+    dom = next(df for name, df in excels.items() if 'caracteristicas_domicilio2' in name)
+    race = next(df for name, df in excels.items() if 'cor_ou_raca' in name)
+
+    def run():
+        s01.compute_domicile_indicators(dom.copy())
+        s01.compute_race_indicators(race)
+    return run
+
+
+def _overlay(paths):
+    import geopandas as gpd
+    from common.schema import read_sectors
+
+    s02 = script('02')
+    sectors_2022 = read_sectors(paths['indicators'])
+    sectors_2010 = gpd.read_file(paths['sectors_2010'])
+    return lambda: s02.harmonize_income(sectors_2022, sectors_2010)
+
+
+def _raster(paths):
+    import geopandas as gpd
+    from common.schema import read_sectors
+
+    s02 = script('02')
+    sectors_2022 = read_sectors(paths['indicators'])
+    sectors_2010 = gpd.read_file(paths['sectors_2010'])
+    return lambda: s02.harmonize_income(sectors_2022, sectors_2010, approx_cell=RASTER_CELL, approx_sample=0)
+
+
+def _reweight(paths):
+    import geopandas as gpd
+    from common.areal_weights import METHODS, intersection_areas, interpolate, target_density, weight_matrix
+    from common.schema import read_sectors
+
+    s02 = script('02')
+    c22 = read_sectors(paths['indicators']).to_crs(s02.ALBERS_BR)
+    c10 = gpd.read_file(paths['sectors_2010']).to_crs(s02.ALBERS_BR)
+    areas = intersection_areas(c10.geometry.values, c22.geometry.values)
+    area_2010, area_2022 = c10.geometry.area.to_numpy(), c22.geometry.area.to_numpy()
+    population, urban = c22['v0001'].to_numpy(dtype=float), s02.urban_mask(c22)
+    rpc = c10['RpC'].to_numpy(dtype=float)
+
+    def run():
+        for method in METHODS:
+            weights = weight_matrix(areas, area_2010, target_density(method, area_2022, population, urban))
+            interpolate(weights, rpc)
+    return run
+
+
+def _crosswalk(paths):
+    from common.crosswalk import CrosswalkRegistry
+
+    registry = CrosswalkRegistry(paths['scratch'] / "crosswalks")
+    registry.register_mesh("2000", paths['sectors_2000'], id_col="CD_GEOCODI", year=2000)
+    registry.register_mesh("2010", paths['sectors_2010'], id_col="CD_GEOCODI", year=2010)
+    registry.register_mesh("2022", paths['indicators'], year=2022)
+    registry.build("2000", "2010")
+    registry.build("2010", "2022")
+    return lambda: registry.harmonize("2000", "2022", ["RpC"])
+
+
+def _hexgrid(paths):
+    from common.hexgrid import HexGrid
+    from common.schema import read_sectors
+
+    base = read_sectors(paths['base'])
+    return lambda: HexGrid.build(base, HEX_SIZE).aggregate(base)
+
+
+def _geocode(paths):
+    import numpy as np
+    import shapely
+    from common.geocode import SectorIndex
+
+    index = SectorIndex.load_or_build(paths['base'], paths['scratch'] / "geocode" / "setores.parquet")
+    rng = np.random.default_rng(SEED)
+    points = shapely.point_on_surface(index.geoms[rng.integers(0, len(index), GEOCODE_POINTS)])
+    lon, lat = shapely.get_x(points), shapely.get_y(points)
+    return lambda: index.lookup(lon, lat)
+
+
+def _select(paths):
+    import libpysal.weights  # noqa: F401  (importados pela etapa só na contiguidade; fora da medição)
+    import networkx  # noqa: F401
+    from common.schema import read_sectors
+
+    s03 = script('03')
+    sectors = read_sectors(paths['harmonized'])
+    return lambda: s03.select_mid_sized_cities(sectors)
+
+
+def _quintiles(paths):
+    from common.schema import read_sectors
+
+    s09 = script('09')
+    base = read_sectors(paths['base'])
+    return lambda: s09.select_quintiles(base)
+
+
+def _render(paths):
+    import matplotlib.pyplot  # noqa: F401  (importado só ao desenhar; fora da medição)
+    from common.schema import read_sectors
+
+    s10 = script('10')
+    quintiles = read_sectors(paths['quintiles'])
+    return lambda: s10.plot_income_maps_grouped_by_region_unified(
+        quintiles, paths['ocean'], paths['water'], paths['scratch'] / "maps", force=True)
+
+
+CASES = {
+    'excel_ingest': _excel_ingest,
+    'indicators': _indicators,
+    'overlay': _overlay,
+    'raster': _raster,
+    'reweight': _reweight,
+    'crosswalk': _crosswalk,
+    'hexgrid': _hexgrid,
+    'geocode': _geocode,
+    'select': _select,
+    'quintiles': _quintiles,
+    'render': _render,
+}
+
+STARTUP = 'startup'
+HEAVY_MODULES = ('matplotlib', 'libpysal', 'networkx', 'geopandas')
+
+
+def run_case(case, paths, report_dir):
+    """
+    Executado no subprocesso: prepara o caso e mede a chamada como o passo `case`. O relatório
+    de `common.profiling` é gravado em `report_dir`, que também serve de pasta de rascunho.
+    """
+    profiling.enable(report_dir, name=case)
+    func = CASES[case](dict(paths, scratch=Path(report_dir)))
+    with profiling.span(case):
+        func()
+
+
+def _summarize(report, case):
+    """{passo: {'time_s', 'peak_mb'}} do caso e dos passos internos (somados por caminho)."""
+    out = {}
+    for step in report['steps']:
+        if step['step'] != case and not step['step'].startswith(case + '/'):
+            continue
+        entry = out.setdefault(step['step'], {'time_s': 0.0, 'peak_mb': None})
+        entry['time_s'] = round(entry['time_s'] + step['duration_s'], 4)
+        if step['rss_peak_mb'] is not None:
+            entry['peak_mb'] = max(entry['peak_mb'] or 0, step['rss_peak_mb'])
+    return out
+
+
+def measure(case, paths, repeat=REPEAT):
+    """Roda o caso `repeat` vezes em subprocessos; tempo mínimo e pico máximo por passo."""
+    env = {k: v for k, v in os.environ.items() if k != profiling.ENV_VAR}
+    env.update(MPLBACKEND='Agg', PYTHONIOENCODING='utf-8')
+    runs = []
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as tmp:
+            cmd = [sys.executable, str(Path(__file__).resolve()), "_case", case,
+                   json.dumps({k: str(v) for k, v in paths.items()}), tmp]
+            proc = subprocess.run(cmd, env=env, capture_output=True, text=True, encoding='utf-8')
+            reports = [p for p in Path(tmp).glob("*.json") if not p.name.endswith(".trace.json")]
+            if proc.returncode != 0 or not reports:
+                print(f"❌ {case}: falhou (código {proc.returncode})")
+                for line in (proc.stderr or proc.stdout).splitlines()[-15:]:
+                    print(f"      {line}")
+                return None
+            runs.append(_summarize(json.loads(reports[0].read_text(encoding='utf-8')), case))
+
+    result = {}
+    for step in runs[0]:
+        times = [r[step]['time_s'] for r in runs if step in r]
+        peaks = [r[step]['peak_mb'] for r in runs if r.get(step, {}).get('peak_mb') is not None]
+        result[step] = {'time_s': min(times), 'peak_mb': max(peaks) if peaks else None}
+    return result
+
+
+def import_times(stderr):
+    """{módulo: tempo cumulativo (s)} da saída de `-X importtime`; só os de primeiro nível não têm recuo."""
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit():
+            times[name[1:].rstrip()] = int(cumulative) / 1e6
+    return times
+
+
+def measure_startup(repeat=REPEAT):
+    """
+    Partida de cada script numerado (`--help`, sem dados): tempo de parede mínimo, soma mínima
+    das importações de primeiro nível e módulos de `HEAVY_MODULES` carregados.
+    """
+    env = {k: v for k, v in os.environ.items() if k != profiling.ENV_VAR}
+    env.update(MPLBACKEND='Agg', PYTHONIOENCODING='utf-8')
+    result = {}
+    for path in sorted(HERE.glob("0*_*/[0-9][0-9]_*.py")):
+        walls, imports, heavy = [], [], set()
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            proc = subprocess.run([sys.executable, "-X", "importtime", str(path), "--help"],
+                                  env=env, capture_output=True, text=True, encoding='utf-8')
+            walls.append(time.perf_counter() - t0)
+            if proc.returncode != 0:
+                print(f"❌ {STARTUP}/{path.stem}: falhou (código {proc.returncode})")
+                break
+            times = import_times(proc.stderr)
+            imports.append(sum(t for name, t in times.items() if not name.startswith(" ")))
+            heavy.update(m for m in HEAVY_MODULES if any(n.strip() == m for n in times))
+        else:
+            result[f"{STARTUP}/{path.stem}"] = {
+                'time_s': round(min(walls), 4), 'peak_mb': None,
+                'imports_s': round(min(imports), 4), 'heavy': sorted(heavy),
+            }
+    return result
+
+
+# =============================================================================
+# Histórico e regressões
+# =============================================================================
+def git_commit():
+    """(commit abreviado, árvore com alterações?) do repositório, ou (None, None) fora do git."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=HERE,
+                               capture_output=True, text=True, check=True).stdout.strip()
+        return commit, bool(dirty)
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+
+def read_history(path):
+    path = Path(path)
+    if not path.exists():
+        return []
+    return [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines() if line.strip()]
+
+
+def find_baseline(history, entry, commit=None):
+    """Execução de referência: a do `commit` pedido ou a última de outro commit, mesma escala."""
+    same = [h for h in history if h['scale'] == entry['scale'] and h['seed'] == entry['seed'] and h is not entry]
+    if commit:
+        same = [h for h in same if (h.get('commit') or '').startswith(commit)]
+    else:
+        same = [h for h in same if h.get('commit') != entry.get('commit')]
+    return same[-1] if same else None
+
+
+def compare(entry, baseline, threshold=THRESHOLD):
+    """Linhas (passo, métrica, referência, atual, variação, regressão?) dos passos em comum."""
+    rows = []
+    for step, current in entry['results'].items():
+        ref = baseline['results'].get(step)
+        if not ref:
+            continue
+        for metric, min_delta in (('time_s', MIN_DELTA_S), ('peak_mb', MIN_DELTA_MB)):
+            a, b = ref.get(metric), current.get(metric)
+            if a is None or b is None:
+                continue
+            change = (b - a) / a if a else 0.0
+            rows.append((step, metric, a, b, change, change > threshold and b - a > min_delta))
+    return rows
+
+
+def print_results(entry):
+    print(f"\n⏱️ Benchmarks — escala '{entry['scale']}' ({entry['sectors']} setores), "
+          f"commit {entry['commit'] or '?'}{' + alterações' if entry['dirty'] else ''}:")
+    for step, r in entry['results'].items():
+        peak = f"{r['peak_mb']:8.1f} MB" if r['peak_mb'] is not None else "       - MB"
+        extra = ""
+        if 'imports_s' in r:
+            extra = f"  importações {r['imports_s']:.3f} s: {', '.join(r['heavy']) or '-'}"
+        print(f"   {step:<56} {r['time_s']:9.3f} s {peak}{extra}")
+
+
+def print_comparison(rows, baseline):
+    print(f"\n📊 Comparação com {baseline['commit'] or '?'} ({baseline['date']}):")
+    for step, metric, a, b, change, regression in rows:
+        unit = 's' if metric == 'time_s' else 'MB'
+        flag = "  ⚠️ regressão" if regression else ""
+        print(f"   {step:<56} {metric:<8} {a:9.2f} → {b:9.2f} {unit:<2} ({change:+.1%}){flag}")
+    n = sum(r[-1] for r in rows)
+    print(f"   {'⚠️ ' + str(n) + ' regressão(ões)' if n else '✅ sem regressões'}")
+
+
+# =============================================================================
+# Linha de comando
+# =============================================================================
+def main():
+    ap = argparse.ArgumentParser(description="Benchmarks das etapas sobre a malha censitária sintética.")
+    ap.add_argument("--workdir", default=WORKDIR, help="Pasta dos dados sintéticos e do histórico.")
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    gen = sub.add_parser("generate", help="Só gera os insumos sintéticos.")
+    gen.add_argument("--out", required=True, help="Pasta de saída.")
+    gen.add_argument("--scale", default=SCALE, choices=sorted(synthetic.SCALES))
+    gen.add_argument("--municipalities", type=int, help="Nº de municípios (no lugar de --scale).")
+    gen.add_argument("--seed", type=int, default=SEED)
+    gen.add_argument("--aggregates-format", default="auto", choices=["auto", "xlsx", "csv"])
+
+    run = sub.add_parser("run", help="Mede os casos e registra no histórico.")
+    run.add_argument("cases", nargs="*", help=f"Casos (padrão: todos): {', '.join([*CASES, STARTUP])}.")
+    run.add_argument("--scale", default=SCALE, choices=sorted(synthetic.SCALES))
+    run.add_argument("--seed", type=int, default=SEED)
+    run.add_argument("--repeat", type=int, default=REPEAT)
+    run.add_argument("--threshold", type=float, default=THRESHOLD)
+    run.add_argument("--baseline", help="Commit de referência (padrão: última execução de outro commit).")
+    run.add_argument("--no-save", action="store_true", help="Não acrescenta a execução ao histórico.")
+    run.add_argument("--fail-on-regression", action="store_true")
+
+    cmp_ = sub.add_parser("compare", help="Compara a última execução do histórico com a referência.")
+    cmp_.add_argument("--scale", default=SCALE, choices=sorted(synthetic.SCALES))
+    cmp_.add_argument("--seed", type=int, default=SEED)
+    cmp_.add_argument("--threshold", type=float, default=THRESHOLD)
+    cmp_.add_argument("--baseline", help="Commit de referência.")
+    cmp_.add_argument("--fail-on-regression", action="store_true")
+
+    case = sub.add_parser("_case")           # uso interno (subprocesso de `measure`)
+    case.add_argument("case")
+    case.add_argument("paths")
+    case.add_argument("report_dir")
+    args = ap.parse_args()
+
+    if args.command == "_case":
+        run_case(args.case, {k: Path(v) for k, v in json.loads(args.paths).items()}, args.report_dir)
+        return
+    if args.command == "generate":
+        synthetic.generate(args.out, args.scale, args.municipalities, args.seed, args.aggregates_format)
+        return
+
+    history_path = Path(args.workdir) / "history.jsonl"
+    history = read_history(history_path)
+    if args.command == "compare":
+        entries = [h for h in history if h['scale'] == args.scale and h['seed'] == args.seed]
+        if not entries:
+            raise SystemExit(f"Nenhuma execução registrada em {history_path} para a escala '{args.scale}'.")
+        entry = entries[-1]
+    else:
+        unknown = set(args.cases) - set(CASES) - {STARTUP}
+        if unknown:
+            raise SystemExit(f"Casos desconhecidos: {sorted(unknown)} (disponíveis: {[*CASES, STARTUP]})")
+        paths = prepare(args.workdir, args.scale, args.seed)
+        summary = json.loads((paths['sectors_2022'].parent / "synthetic.json").read_text(encoding='utf-8'))
+        commit, dirty = git_commit()
+        entry = {
+            'commit': commit, 'dirty': dirty, 'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'scale': args.scale, 'seed': args.seed, 'sectors': summary['sectors_2022'],
+            'repeat': args.repeat, 'python': platform.python_version(), 'machine': platform.node(),
+            'results': {},
+        }
+        for name in args.cases or [*CASES, STARTUP]:
+            print(f"▶️  {name}…")
+            result = measure_startup(args.repeat) if name == STARTUP else measure(name, paths, args.repeat)
+            if result:
+                entry['results'].update(result)
+        if not args.no_save:
+            history_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(history_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            history.append(entry)
+    print_results(entry)
+
+    baseline = find_baseline(history, entry, args.baseline)
+    if baseline is None:
+        print("\nℹ️ Sem execução de referência para comparar (outro commit, mesma escala).")
+        return
+    rows = compare(entry, baseline, args.threshold)
+    print_comparison(rows, baseline)
+    if args.fail_on_regression and any(r[-1] for r in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
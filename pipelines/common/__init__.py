@@ -0,0 +1,12 @@
+"""
+Módulos compartilhados pelos scripts dos pipelines (01_build_base, 02_analysis, 03_mapping).
+
+Os scripts numerados continuam sendo executados diretamente (`python pipelines/.../04_...py`);
+para importar este pacote, cada script acrescenta a pasta `pipelines/` ao `sys.path`.
+
+Importações: no nível do módulo ficam só as bibliotecas usadas em toda execução (numpy,
+pandas, shapely). matplotlib, geopandas, libpysal e networkx são importados dentro das
+funções que desenham, leem/gravam camadas ou montam a contiguidade, de modo que `--help`,
+`pipeline.py status` e as execuções cujas figuras estão no cache não pagam por eles
+(`benchmark.py run startup` mede a partida de cada script).
+"""
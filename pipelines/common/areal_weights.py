@@ -0,0 +1,293 @@
+"""
+Pesos de interpolação areal entre duas malhas de setores (origem → destino), como matriz
+esparsa.
+
+A interseção das malhas é calculada uma única vez (`intersection_areas`): uma consulta em lote
+`STRtree.query(..., predicate="intersects")` e `shapely.intersection` vetorizado sobre os
+pares candidatos, em blocos de `CHUNK` pares, resultando numa matriz CSR n_origem × n_destino
+com a área de cada pedaço. Os métodos (`METHODS`) só mudam o peso de cada pedaço:
+
+    - 'area'       → área do pedaço / área do setor de origem (regra original do script 02);
+    - 'population' → população do destino (v0001) no pedaço, supondo densidade uniforme
+                     dentro de cada setor de destino (v0001 × área do pedaço / área do destino);
+    - 'urban'      → área do pedaço quando o setor de destino é urbano (mancha urbana de 2022;
+                     a máscara vem do script 02, com a regra de situação do script 03).
+
+Nos métodos dasimétricos cada linha (setor de origem) é normalizada para somar 1: o valor do
+setor é repartido entre os destinos que ele cobre, proporcionalmente à população ou à área
+urbana de cada pedaço, em vez de espalhado pela área rural. Setores de origem sem população
+ou área urbana nos pedaços ficam com os pesos por área.
+
+Normalização e interpolação são operações esparsas vetorizadas: `diags(d) @ A` para os pesos e
+`W.T @ valores` para o valor harmonizado. Trocar de método custa um produto esparso, não um
+novo overlay.
+
+Modo aproximado (`raster_intersection_areas`): as duas malhas são rasterizadas numa grade
+comum de `cell_size` (unidades do CRS; metros em Albers) e a área de cada pedaço é o número de
+células com o mesmo par de rótulos (origem, destino) × área da célula. A rasterização é uma
+varredura por linhas vetorizada em numpy (cruzamentos das arestas com o centro de cada linha
+de células, regra par-ímpar), que produz trechos (linha, coluna inicial, coluna final,
+rótulo); os pares de rótulos são contados com `np.bincount` por ladrilho de `TILE` × `TILE`
+células, o que limita a memória. Setores de destino menores que a célula (sem nenhuma
+célula) recebem o pedaço inteiro do setor de origem que contém seu ponto interior.
+`sample_error` compara o resultado aproximado com o exato numa amostra de destinos.
+"""
+
+import numpy as np
+import shapely
+from scipy import sparse
+
+METHODS = ('area', 'population', 'urban')
+
+# CRS de área equivalente das interseções (Brazil Albers)
+ALBERS_BR = "+proj=aea +lat_1=-5 +lat_2=-42 +lat_0=-25 +lon_0=-55 +x_0=0 +y_0=0 +ellps=GRS80 +units=m +no_defs"
+
+# Pares origem × destino por bloco de `shapely.intersection` (limita a memória das geometrias)
+CHUNK = 200_000
+
+# Lado do ladrilho (em células) do modo aproximado: rótulos de um ladrilho em int32 = 4 MB
+TILE = 1024
+
+
+def intersection_areas(source_geoms, target_geoms, chunk=CHUNK):
+    """Matriz CSR n_origem × n_destino com a área de interseção de cada par (zeros omitidos)."""
+    source_geoms = np.asarray(source_geoms)
+    target_geoms = np.asarray(target_geoms)
+    tree = shapely.STRtree(target_geoms)
+    s, t = tree.query(source_geoms, predicate="intersects")
+    areas = np.empty(len(s))
+    for start in range(0, len(s), chunk):
+        part = slice(start, start + chunk)
+        areas[part] = shapely.area(shapely.intersection(source_geoms[s[part]], target_geoms[t[part]]))
+    keep = areas > 0
+    A = sparse.csr_matrix((areas[keep], (s[keep], t[keep])), shape=(len(source_geoms), len(target_geoms)))
+    A.sum_duplicates()
+    return A
+
+
+def _cells(start, end):
+    """Índices de todos os intervalos [start, end) concatenados (vetorizado)."""
+    lengths = end - start
+    offsets = np.cumsum(lengths) - lengths
+    return np.repeat(start - offsets, lengths) + np.arange(lengths.sum())
+
+
+def raster_runs(geoms, x0, y_top, cell_size, n_rows, n_cols):
+    """
+    Trechos de células cujo centro está dentro de cada geometria: arrays (linha, coluna
+    inicial, coluna final exclusiva, índice da geometria). Células (r, c) têm centro em
+    (x0 + (c + 0.5) · cell_size, y_top − (r + 0.5) · cell_size).
+    """
+    geoms = np.asarray(geoms)
+    if (shapely.get_type_id(geoms) == shapely.GeometryType.POLYGON).all():
+        parts, part_of = geoms, np.arange(len(geoms))
+    else:
+        parts, part_of = shapely.get_parts(geoms, return_index=True)
+    rings, ring_of = shapely.get_rings(parts, return_index=True)
+    coords, vertex_of = shapely.get_coordinates(rings, return_index=True)
+
+    # Arestas (vértices consecutivos do mesmo anel) e linhas cujo centro yc cumpre
+    # min(y) <= yc < max(y) (semiaberto: cada anel cruza cada linha um número par de vezes;
+    # arestas horizontais ou entre dois centros de linha não cruzam nenhuma)
+    ya, yb = coords[:-1, 1], coords[1:, 1]
+    first = np.floor((y_top - np.maximum(ya, yb)) / cell_size - 0.5) + 1
+    last = np.floor((y_top - np.minimum(ya, yb)) / cell_size - 0.5)
+    np.maximum(first, 0, out=first)
+    np.minimum(last, n_rows - 1, out=last)
+    edge = np.flatnonzero((vertex_of[:-1] == vertex_of[1:]) & (last >= first))
+    first = first[edge].astype(np.int64)
+    count = last[edge].astype(np.int64) - first + 1
+    row = _cells(first, first + count)
+    edge = np.repeat(edge, count)
+    xa, ya, xb, yb = coords[edge, 0], ya[edge], coords[edge + 1, 0], yb[edge]
+    yc = y_top - (row + 0.5) * cell_size
+    x = xa + (yc - ya) * (xb - xa) / (yb - ya)
+    label = part_of[ring_of[vertex_of[edge]]]
+
+    # Cruzamentos ordenados por (geometria, linha, x): pares consecutivos delimitam o interior
+    order = np.lexsort((x, row, label))
+    x, row, label = x[order], row[order], label[order]
+    start = np.clip(np.ceil((x[0::2] - x0) / cell_size - 0.5), 0, n_cols).astype(np.int64)
+    end = np.clip(np.ceil((x[1::2] - x0) / cell_size - 0.5), 0, n_cols).astype(np.int64)
+    keep = end > start
+    return row[0::2][keep], start[keep], end[keep], label[0::2][keep]
+
+
+def _tile_runs(runs, n_tile_cols, tile):
+    """Divide os trechos nas bordas dos ladrilhos; devolve (ladrilho, índice local inicial, final, rótulo)."""
+    row, start, end, label = runs
+    first, last = start // tile, (end - 1) // tile
+    k = np.repeat(np.arange(len(row)), last - first + 1)
+    tile_col = _cells(first, last + 1)
+    s = np.maximum(start[k], tile_col * tile)
+    e = np.minimum(end[k], (tile_col + 1) * tile)
+    key = (row[k] // tile) * n_tile_cols + tile_col
+    base = (row[k] % tile) * tile - tile_col * tile
+    order = np.argsort(key, kind="stable")
+    return key[order], (base + s)[order], (base + e)[order], label[k][order]
+
+
+def raster_intersection_areas(source_geoms, target_geoms, cell_size, tile=TILE):
+    """
+    Versão aproximada de `intersection_areas` por rasterização numa grade comum de
+    `cell_size`: mesma matriz CSR n_origem × n_destino, com áreas múltiplas de cell_size².
+    """
+    source_geoms = np.asarray(source_geoms)
+    target_geoms = np.asarray(target_geoms)
+    n_s, n_t = len(source_geoms), len(target_geoms)
+    b_s, b_t = shapely.total_bounds(source_geoms), shapely.total_bounds(target_geoms)
+    x0, y0 = min(b_s[0], b_t[0]), min(b_s[1], b_t[1])
+    x1, y_top = max(b_s[2], b_t[2]), max(b_s[3], b_t[3])
+    n_cols = max(int(np.ceil((x1 - x0) / cell_size)), 1)
+    n_rows = max(int(np.ceil((y_top - y0) / cell_size)), 1)
+    n_tile_cols = -(-n_cols // tile)
+
+    src = _tile_runs(raster_runs(source_geoms, x0, y_top, cell_size, n_rows, n_cols), n_tile_cols, tile)
+    tgt = _tile_runs(raster_runs(target_geoms, x0, y_top, cell_size, n_rows, n_cols), n_tile_cols, tile)
+    src_bounds = np.searchsorted(src[0], np.append(np.unique(src[0]), np.inf))
+    labels = np.full(tile * tile, -1, dtype=np.int64)
+    pairs_s, pairs_t, counts = [], [], []
+    for a, b in zip(src_bounds[:-1], src_bounds[1:]):
+        key = src[0][a]
+        ta, tb = np.searchsorted(tgt[0], [key, key + 1])
+        if ta == tb:
+            continue
+        # Rótulos de destino do ladrilho; células de origem → par (origem, destino)
+        t_cells = _cells(tgt[1][ta:tb], tgt[2][ta:tb])
+        labels[t_cells] = np.repeat(tgt[3][ta:tb], tgt[2][ta:tb] - tgt[1][ta:tb])
+        s_cells = _cells(src[1][a:b], src[2][a:b])
+        ls = np.repeat(src[3][a:b], src[2][a:b] - src[1][a:b])
+        lt = labels[s_cells]
+        labels[t_cells] = -1
+        ok = lt >= 0
+        us, ls = np.unique(ls[ok], return_inverse=True)
+        ut, lt = np.unique(lt[ok], return_inverse=True)
+        pair = ls.astype(np.int64) * len(ut) + lt
+        if len(us) * len(ut) <= 4 * len(pair):
+            count = np.bincount(pair, minlength=len(us) * len(ut))
+            pair = np.flatnonzero(count)
+            count = count[pair]
+        else:
+            pair, count = np.unique(pair, return_counts=True)
+        pairs_s.append(us[pair // len(ut)])
+        pairs_t.append(ut[pair % len(ut)])
+        counts.append(count)
+
+    s = np.concatenate(pairs_s) if pairs_s else np.zeros(0, dtype=np.int64)
+    t = np.concatenate(pairs_t) if pairs_t else np.zeros(0, dtype=np.int64)
+    areas = np.concatenate(counts) * float(cell_size) ** 2 if counts else np.zeros(0)
+
+    # Destinos sem célula (menores que a célula): pedaço inteiro na origem do ponto interior
+    missing = np.setdiff1d(np.arange(n_t), t)
+    if len(missing):
+        points = shapely.point_on_surface(target_geoms[missing])
+        i, j = shapely.STRtree(source_geoms).query(points, predicate="within")
+        i, first = np.unique(i, return_index=True)
+        s = np.concatenate([s, j[first]])
+        t = np.concatenate([t, missing[i]])
+        areas = np.concatenate([areas, shapely.area(target_geoms[missing[i]])])
+
+    A = sparse.csr_matrix((areas, (s, t)), shape=(n_s, n_t))
+    A.sum_duplicates()
+    return A
+
+
+def _inverse(values):
+    values = np.asarray(values, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(values > 0, 1.0 / values, 0.0)
+
+
+def urban_mask(df):
+    """Setores urbanos (regra do script 03: CD_SITU 1/2 ou, sem ela, SITUACAO == 'urbana')."""
+    cols = {c.lower(): c for c in df.columns}
+    situ = cols.get('cd_situ') or cols.get('cd_sit')
+    if situ:
+        return df[situ].astype(str).isin(["1", "2"]).to_numpy()
+    if 'situacao' not in cols:
+        raise ValueError("Coluna não encontrada. Procurei: ['CD_SITU', 'CD_SIT', 'SITUACAO']")
+    return (df[cols['situacao']].astype(str).str.lower() == "urbana").to_numpy()
+
+
+def target_density(method, target_area=None, population=None, urban=None):
+    """
+    Peso por unidade de área de cada setor de destino para o `method`, ou None para 'area'.
+    `population`: contagem por setor (v0001); `urban`: máscara booleana da mancha urbana.
+    """
+    if method == 'area':
+        return None
+    if method == 'population':
+        if population is None or target_area is None:
+            raise ValueError("Método 'population' exige a população e a área dos setores de destino.")
+        pop = np.nan_to_num(np.asarray(population, dtype=float), nan=0.0)
+        return pop * _inverse(target_area)
+    if method == 'urban':
+        if urban is None:
+            raise ValueError("Método 'urban' exige a situação (urbano/rural) dos setores de destino.")
+        return np.asarray(urban, dtype=float)
+    raise ValueError(f"Método de ponderação desconhecido: {method!r} (disponíveis: {METHODS})")
+
+
+def weight_matrix(A, source_area, density=None):
+    """
+    Pesos n_origem × n_destino a partir das áreas de interseção `A`.
+    Sem `density` (método 'area'): área do pedaço / área da origem. Com `density`: pesos
+    dos pedaços `A @ diags(density)` normalizados por linha, com 'area' nas linhas nulas.
+    """
+    by_area = sparse.diags(_inverse(source_area)) @ A
+    if density is None:
+        return by_area.tocsr()
+    D = A @ sparse.diags(np.asarray(density, dtype=float))
+    row = np.asarray(D.sum(axis=1)).ravel()
+    fallback = (row <= 0).astype(float)
+    W = sparse.diags(_inverse(row)) @ D + sparse.diags(fallback) @ by_area
+    W = W.tocsr()
+    W.eliminate_zeros()
+    return W
+
+
+def interpolate(W, values):
+    """
+    Valores das origens levados aos destinos (`W.T @ valores`; `values` com uma coluna por
+    variável também é aceito). Origens sem valor (NaN) não contribuem; destinos sem peso de
+    nenhuma origem (sem interseção ou, nos métodos dasimétricos, sem população/área urbana)
+    ficam NaN.
+    """
+    values = np.asarray(values, dtype=float)
+    out = W.T @ np.nan_to_num(values, nan=0.0)
+    covered = np.diff(W.tocsc().indptr) > 0
+    return np.where(covered[:, None] if out.ndim == 2 else covered, out, np.nan)
+
+
+def sample_error(source_geoms, target_geoms, approx, values, source_area, density=None, n=500, seed=0):
+    """
+    Erro do resultado aproximado (`approx`, um valor por destino) em relação ao exato numa
+    amostra de `n` destinos. O exato usa as linhas completas das origens que tocam a amostra
+    (necessárias à normalização dos métodos dasimétricos).
+    Retorna {'n', 'mae', 'rel_median', 'rel_p90', 'corr', 'nan_mismatch'}.
+    """
+    source_geoms = np.asarray(source_geoms)
+    target_geoms = np.asarray(target_geoms)
+    rng = np.random.default_rng(seed)
+    sample = np.sort(rng.choice(len(target_geoms), size=min(n, len(target_geoms)), replace=False))
+    src = np.unique(shapely.STRtree(source_geoms).query(target_geoms[sample], predicate="intersects")[1])
+    tgt = np.unique(np.concatenate([
+        sample, shapely.STRtree(target_geoms).query(source_geoms[src], predicate="intersects")[1]]))
+    A = intersection_areas(source_geoms[src], target_geoms[tgt])
+    W = weight_matrix(A, np.asarray(source_area)[src], None if density is None else np.asarray(density)[tgt])
+    exact = interpolate(W, np.asarray(values, dtype=float)[src])[np.searchsorted(tgt, sample)]
+    approx = np.asarray(approx, dtype=float)[sample]
+
+    both = ~np.isnan(exact) & ~np.isnan(approx)
+    diff = np.abs(approx[both] - exact[both])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rel = np.where(exact[both] != 0, diff / np.abs(exact[both]), np.where(diff == 0, 0.0, np.inf))
+    corr = np.corrcoef(approx[both], exact[both])[0, 1] if both.sum() > 1 else np.nan
+    return {
+        'n': int(len(sample)),
+        'mae': float(diff.mean()) if both.any() else np.nan,
+        'rel_median': float(np.median(rel)) if both.any() else np.nan,
+        'rel_p90': float(np.quantile(rel, 0.9)) if both.any() else np.nan,
+        'corr': float(corr),
+        'nan_mismatch': int((np.isnan(exact) != np.isnan(approx)).sum()),
+    }
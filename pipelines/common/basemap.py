@@ -0,0 +1,55 @@
+"""
+Camadas auxiliares de fundo (oceano, massas d'água) recortadas por painel (script 10).
+
+A camada nacional é indexada uma única vez (STRtree). Para cada painel, consulta-se apenas
+o retângulo visível (limites + margem): as feições candidatas são recortadas ao retângulo
+(`shapely.clip_by_rect`, vetorizado) e, opcionalmente, simplificadas na resolução de saída
+(tolerância ≈ meio pixel). O custo de desenho passa a depender do que aparece no painel,
+e não do tamanho da camada nacional.
+"""
+
+import numpy as np
+import shapely
+
+
+def expand_bounds(bounds, margin=0.05):
+    """(minx, miny, maxx, maxy) expandido de `margin` × a maior dimensão em cada lado."""
+    minx, miny, maxx, maxy = bounds
+    pad = max(maxx - minx, maxy - miny) * margin
+    return (minx - pad, miny - pad, maxx + pad, maxy + pad)
+
+
+def pixel_size(bounds, width_in, dpi):
+    """Tamanho de um pixel (em unidades do mapa) para um painel de `width_in` polegadas."""
+    minx, miny, maxx, maxy = bounds
+    return max(maxx - minx, maxy - miny) / (width_in * dpi)
+
+
+class ClippedLayer:
+    """
+    Camada indexada para recortes rápidos por retângulo.
+
+    Uso:
+        ocean = ClippedLayer(ocean_gdf)
+        ocean.clip(view_bounds, tolerance=px / 2).plot(ax=ax, color=...)
+    """
+
+    def __init__(self, gdf):
+        self.crs = gdf.crs
+        geoms = gdf.geometry.values
+        self.geoms = np.asarray(geoms[~(geoms.isna() | geoms.is_empty)])
+        self.tree = shapely.STRtree(self.geoms)
+
+    def __len__(self):
+        return len(self.geoms)
+
+    def clip(self, bounds, tolerance=None):
+        """GeoSeries das feições recortadas ao retângulo `bounds` (vazia se nada é visível)."""
+        idx = self.tree.query(shapely.box(*bounds))
+        geoms = shapely.clip_by_rect(self.geoms[np.sort(idx)], *bounds)
+        if tolerance:
+            geoms = shapely.simplify(geoms, tolerance, preserve_topology=True)
+        geoms = geoms[~shapely.is_empty(geoms)]
+        import geopandas as gpd
+
+        return gpd.GeoSeries(geoms, crs=self.crs)
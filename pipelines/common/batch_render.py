@@ -0,0 +1,121 @@
+"""
+Renderização em lote de polígonos com matplotlib (script 10).
+
+`GeoDataFrame.plot` reconstrói um patch por geometria a cada chamada. Aqui as geometrias são
+convertidas uma única vez em buffers de vértices e códigos (`MeshPaths`, vetorizado com
+`shapely.get_rings`/`get_coordinates`), os `Path` de cada feição ficam em cache, e cada
+camada do painel é desenhada como uma única `PathCollection` com cores por feição. O custo
+passa a acompanhar o número de vértices, e não o de objetos Python.
+
+Convenções copiadas do `GeoDataFrame.plot` para manter a aparência:
+    - `color=` pinta face e borda; linhas com a largura padrão de patches;
+    - em CRS geográfico, aspecto 1 / cos(latitude média).
+
+O matplotlib é importado na primeira malha convertida ou coleção desenhada, não na
+importação do módulo.
+"""
+
+import numpy as np
+import shapely
+
+
+def _oriented(geoms):
+    """Anéis externos anti-horários e furos horários (regra nonzero do matplotlib)."""
+    if hasattr(shapely, 'orient_polygons'):
+        return shapely.orient_polygons(geoms)
+    from shapely.geometry.polygon import orient
+    return np.array([orient(g) if g is not None and g.geom_type == 'Polygon' else g for g in geoms],
+                    dtype=object)
+
+
+def path_buffers(geoms):
+    """
+    Vértices (m × 2), códigos (m,) e deslocamentos (n + 1,) por feição para (Multi)Polygons.
+    Feição i ocupa vertices[offsets[i]:offsets[i + 1]]; feições vazias ficam sem vértices.
+    """
+    from matplotlib.path import Path
+
+    geoms = np.asarray(geoms)
+    n = len(geoms)
+    parts, part_owner = shapely.get_parts(geoms, return_index=True)
+    parts = _oriented(parts)
+    rings, ring_part = shapely.get_rings(parts, return_index=True)
+    coords, ring_of_vertex = shapely.get_coordinates(rings, return_index=True)
+
+    codes = np.full(len(coords), Path.LINETO, dtype=Path.code_type)
+    if len(coords):
+        starts = np.flatnonzero(np.r_[True, ring_of_vertex[1:] != ring_of_vertex[:-1]])
+        ends = np.r_[starts[1:], len(coords)] - 1
+        codes[starts] = Path.MOVETO
+        codes[ends] = Path.CLOSEPOLY
+
+    owner = part_owner[ring_part][ring_of_vertex]
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.add.at(offsets, owner + 1, 1)
+    return coords, codes, np.cumsum(offsets)
+
+
+class MeshPaths:
+    """
+    `Path` de cada feição de uma malha, construídos uma vez e reutilizados entre painéis.
+
+    Uso:
+        paths = MeshPaths(gdf.geometry.values)
+        idx = paths.nonempty(idx)                 # cores por feição alinhadas às que têm Path
+        draw_paths(ax, paths.take(idx), facecolors[idx], edgecolor='gray', linewidth=0.1)
+    """
+
+    def __init__(self, geoms):
+        from matplotlib.path import Path
+
+        self._path_type = Path
+        self.vertices, self.codes, self.offsets = path_buffers(geoms)
+        self._paths = [None] * (len(self.offsets) - 1)
+
+    def __len__(self):
+        return len(self._paths)
+
+    def path(self, i):
+        p = self._paths[i]
+        if p is None:
+            a, b = self.offsets[i], self.offsets[i + 1]
+            p = self._paths[i] = self._path_type(self.vertices[a:b], self.codes[a:b], readonly=True)
+        return p
+
+    def nonempty(self, idx):
+        """Posições de `idx` cujas feições têm geometria (None/vazias não viram `Path`)."""
+        idx = np.asarray(idx)
+        return idx[self.offsets[idx + 1] > self.offsets[idx]]
+
+    def take(self, idx):
+        """
+        Lista de `Path` das feições `idx` (posições na malha), sem as vazias. Com cores por
+        feição, filtre antes com `nonempty` e indexe as cores pelas mesmas posições.
+        """
+        return [self.path(i) for i in self.nonempty(idx)]
+
+
+def draw_paths(ax, paths, facecolors, edgecolors=None, linewidth=None, zorder=1):
+    """Uma `PathCollection` com as cores por feição (ou uma cor única)."""
+    if not paths:
+        return None
+    from matplotlib.collections import PathCollection
+
+    collection = PathCollection(
+        paths, facecolors=facecolors,
+        edgecolors=facecolors if edgecolors is None else edgecolors,
+        linewidths=linewidth, zorder=zorder,
+    )
+    ax.add_collection(collection, autolim=False)
+    return collection
+
+
+def draw_geoseries(ax, geoseries, color, **kwargs):
+    """Equivalente a `geoseries.plot(color=color, ax=ax)`, numa só coleção."""
+    return draw_paths(ax, MeshPaths(geoseries.values).take(np.arange(len(geoseries))), color, **kwargs)
+
+
+def set_geographic_aspect(ax, bounds):
+    """Aspecto usado pelo geopandas em CRS geográfico: 1 / cos(latitude média)."""
+    y_mid = (bounds[1] + bounds[3]) / 2
+    ax.set_aspect(1 / np.cos(np.deg2rad(y_mid)))
@@ -0,0 +1,140 @@
+"""
+Classificação de variáveis dos setores em classes por grupo (município, UF ou região).
+
+Métodos (`METHODS`):
+    - 'quantiles'      → quantis com interpolação linear (mesmos cortes de `pd.qcut`);
+    - 'equal_interval' → k intervalos iguais entre o mínimo e o máximo do grupo;
+    - 'jenks'          → quebras naturais (Fisher-Jenks: mínima soma de desvios quadráticos
+                         dentro das classes, por programação dinâmica).
+
+Os cortes de todos os grupos são calculados de uma vez: os valores são ordenados por
+(grupo, valor) e os quantis/extremos saem por indexação nos deslocamentos de cada grupo.
+A classe de cada setor é 1 + nº de cortes internos estritamente menores que o valor
+(intervalos fechados à direita, como em `pd.cut`/`pd.qcut`). Grupos com menos de k valores
+válidos ficam sem classe (NA), como no script 09.
+
+Jenks é O(k·n²) por grupo; acima de `JENKS_MAX_N` valores as quebras são calculadas sobre
+`JENKS_MAX_N` quantis do grupo (amostra determinística) e aplicadas a todos os setores.
+"""
+
+import numpy as np
+import pandas as pd
+
+from common.correlation_stats import group_labels
+
+METHODS = ('quantiles', 'equal_interval', 'jenks')
+
+# Níveis de agrupamento da classificação → colunas que identificam o grupo
+GROUPINGS = {
+    'municipio': ['NM_MUN', 'NM_UF'],
+    'uf': ['NM_UF'],
+    'regiao': ['NM_REGIAO'],
+}
+
+JENKS_MAX_N = 2000
+
+
+def group_codes(df, group_by='municipio'):
+    """Código inteiro do grupo por setor (-1 = grupo indefinido); colunas ausentes são ignoradas."""
+    if group_by not in GROUPINGS:
+        raise ValueError(f"group_by deve ser um de {sorted(GROUPINGS)}: {group_by!r}")
+    cols = [c for c in GROUPINGS[group_by] if c in df.columns]
+    if not cols:
+        return np.zeros(len(df), dtype=np.int64)
+    return pd.factorize(group_labels(df, cols))[0]
+
+
+def _sorted_groups(values, codes):
+    """Valores válidos ordenados por (grupo, valor), início e tamanho de cada grupo."""
+    values = np.asarray(values, dtype='float64')
+    codes = np.asarray(codes)
+    n_groups = int(codes.max()) + 1 if len(codes) else 0
+    valid = np.isfinite(values) & (codes >= 0)
+    v, c = values[valid], codes[valid]
+    order = np.lexsort((v, c))
+    v = v[order]
+    counts = np.bincount(c, minlength=n_groups)
+    starts = np.r_[0, np.cumsum(counts)[:-1]]
+    return v, starts, counts
+
+
+def _fisher_jenks(x, k):
+    """k − 1 quebras (limite superior das classes 1…k−1) de `x` ordenado."""
+    n = len(x)
+    s1 = np.r_[0.0, np.cumsum(x)]
+    s2 = np.r_[0.0, np.cumsum(x * x)]
+    i = np.arange(n + 1)[:, None]
+    j = np.arange(n + 1)[None, :]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ssd = (s2[j] - s2[i]) - (s1[j] - s1[i]) ** 2 / (j - i)   # soma dos desvios² de x[i:j]
+    ssd[i >= j] = np.inf
+
+    cost = ssd[0].copy()              # cost[j]: melhor custo de x[:j] em c classes
+    back = np.zeros((k, n + 1), dtype=np.int64)
+    for c in range(1, k):
+        total = cost[:, None] + ssd   # última classe = x[i:j]
+        back[c] = np.argmin(total, axis=0)
+        cost = total[back[c], np.arange(n + 1)]
+
+    ends, j = [], n
+    for c in range(k - 1, 0, -1):
+        j = back[c][j]
+        ends.append(j)
+    return x[np.array(ends[::-1]) - 1]
+
+
+def class_breaks(values, codes, k=5, method='quantiles'):
+    """
+    Matriz (nº de grupos × k − 1) com os cortes internos de cada grupo (`codes` de 0 a G − 1);
+    linhas NaN para grupos com menos de k valores válidos.
+    """
+    if method not in METHODS:
+        raise ValueError(f"method deve ser um de {METHODS}: {method!r}")
+    v, starts, counts = _sorted_groups(values, codes)
+    breaks = np.full((len(counts), k - 1), np.nan)
+    ok = counts >= k
+    if not ok.any():
+        return breaks
+    s, n = starts[ok], counts[ok]
+    probs = np.arange(1, k) / k
+
+    if method == 'quantiles':
+        h = (n[:, None] - 1) * probs[None, :]
+        lo = np.floor(h).astype(np.int64)
+        hi = np.minimum(lo + 1, n[:, None] - 1)
+        frac = h - lo
+        a, b = v[s[:, None] + lo], v[s[:, None] + hi]
+        breaks[ok] = a + frac * (b - a)
+    elif method == 'equal_interval':
+        vmin, vmax = v[s], v[s + n - 1]
+        breaks[ok] = vmin[:, None] + (vmax - vmin)[:, None] * probs[None, :]
+    else:
+        for g, (start, size) in zip(np.flatnonzero(ok), zip(s, n)):
+            x = v[start:start + size]
+            if size > JENKS_MAX_N:
+                x = np.quantile(x, np.linspace(0, 1, JENKS_MAX_N))
+            breaks[g] = _fisher_jenks(x, k)
+    return breaks
+
+
+def assign_classes(values, codes, breaks):
+    """Classe (1…k, Int8) de cada valor segundo os cortes do seu grupo; NA sem valor/cortes."""
+    values = np.asarray(values, dtype='float64')
+    codes = np.asarray(codes)
+    out = np.full(len(values), -1, dtype=np.int8)
+    rows = np.isfinite(values) & (codes >= 0)
+    rows[rows] = ~np.isnan(breaks[codes[rows], 0]) if breaks.shape[1] else True
+    b = breaks[codes[rows]]
+    out[rows] = 1 + (values[rows, None] > b).sum(axis=1)
+    return pd.array(np.where(out < 0, None, out), dtype='Int8')
+
+
+def classify(df, variable, k=5, method='quantiles', group_by='municipio'):
+    """
+    Classes (1…k) de `variable` dentro de cada grupo de `group_by`, como Series Int8 alinhada
+    ao índice de `df`. Ex.: `classify(gdf, 'RpC_2010')` → quintis de renda por município.
+    """
+    values = pd.to_numeric(df[variable], errors='coerce').astype('float64').to_numpy(na_value=np.nan)
+    codes = group_codes(df, group_by)
+    breaks = class_breaks(values, codes, k, method)
+    return pd.Series(assign_classes(values, codes, breaks), index=df.index, name=variable)
@@ -0,0 +1,28 @@
+"""
+Argumentos de linha de comando comuns aos scripts de análise (04–08, 11–13, 16).
+
+Os valores padrão são as constantes do bloco PREENCHA AQUI de cada script; o `pipeline.py`
+passa os caminhos da execução por estes argumentos (inclusive `--cache-dir`, para que os
+caches fiquem sob a pasta-raiz da execução). `--profile` ativa o relatório de tempos e
+memória por passo (`common.profiling`).
+"""
+
+import argparse
+
+from common.profiling import add_profile_argument
+
+
+def stage_parser(description, input_path, output_dir, force=False, cache_dir=None):
+    """
+    Parser com `--input`, `--out` e `--profile` (e `--force`, para scripts de figuras, e
+    `--cache-dir`, para scripts com cache em disco, se `cache_dir` for dado).
+    """
+    ap = argparse.ArgumentParser(description=description)
+    ap.add_argument("--input", default=input_path, help="Base de setores (shapefile ou GeoParquet).")
+    ap.add_argument("--out", default=output_dir, help="Pasta de saída.")
+    if cache_dir is not None:
+        ap.add_argument("--cache-dir", default=cache_dir, help=f"Pasta de cache (padrão: {cache_dir}).")
+    if force:
+        ap.add_argument("--force", action="store_true",
+                        help="Re-renderiza todas as figuras, ignorando o manifesto de cache.")
+    return add_profile_argument(ap)
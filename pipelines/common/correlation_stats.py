@@ -0,0 +1,231 @@
+"""
+Motor vetorizado de estatísticas de correlação/regressão (scripts 04, 05 e 11).
+
+Calcula, de uma só vez, para todas as variáveis (raças, infraestrutura) × todos os grupos de
+todas as escalas (nacional, região, UF, município):
+    - n (pares válidos), Pearson r, Spearman rho;
+    - OLS y = intercepto + inclinação·x;
+    - intervalos de confiança bootstrap (percentis) para r e para a inclinação.
+
+Implementação:
+    - Os grupos de todas as escalas são empilhados numa única matriz indicadora esparsa
+      G (grupos × setores), um bloco de linhas por escala; somas por grupo são produtos G @ A.
+    - Em cada escala, os dados são centrados uma única vez pela média do grupo (um array
+      centrado n × k); momentos de 2ª ordem saem de G @ (dx·dy), G @ dx², G @ dy².
+    - Pares com NaN são descartados par a par (mesmo critério de `Series.corr`/`dropna`).
+    - Spearman = Pearson sobre postos médios calculados dentro de cada grupo.
+    - Bootstrap de Poisson (pesos ~ Poisson(1) por setor), em lotes de réplicas, o que
+      equivale ao bootstrap multinomial para n grande e permite processar todos os grupos
+      e variáveis com as mesmas multiplicações esparsas.
+
+Saída: tabela "tidy" com uma linha por (escala, grupo, variável).
+"""
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+RACES = ['Brancos', 'Pretos', 'Amarelos', 'Pardos', 'Indigena']
+INFRA = ['P_Agua', 'P_Esgo', 'P_Lixo']
+
+# Escala → colunas de agrupamento (None = conjunto inteiro)
+LEVELS = {
+    'nacional': None,
+    'regiao': ['NM_REGIAO'],
+    'uf': ['NM_UF'],
+    'municipio': ['NM_MUN', 'NM_UF'],
+}
+
+# Limite de elementos (setores × réplicas × variáveis) por lote de bootstrap
+BOOT_CHUNK_ELEMENTS = 5_000_000
+
+
+def race_percentages(df, races=RACES):
+    """
+    Percentual de cada raça no total das raças do setor (cópia; não altera `df`).
+    Mesmo cálculo usado historicamente nos scripts 04/05.
+    """
+    counts = df[races].astype('float64')
+    total = counts.sum(axis=1)
+    return counts.div(total, axis=0) * 100
+
+
+def group_labels(df, cols):
+    """Rótulo do grupo por setor ('Alfa - SP'); None → 'Brasil'; NaN em qualquer coluna → NaN."""
+    if cols is None:
+        return pd.Series('Brasil', index=df.index)
+    labels = df[cols[0]].astype(str)
+    for c in cols[1:]:
+        labels = labels + ' - ' + df[c].astype(str)
+    return labels.where(df[cols].notna().all(axis=1))
+
+
+def _stack_groups(df, levels):
+    """Códigos de grupo por escala + matriz indicadora esparsa empilhada (todas as escalas)."""
+    n = len(df)
+    blocks, meta, codes_by_level = [], [], {}
+    offset = 0
+    for level, cols in levels.items():
+        codes, uniques = pd.factorize(group_labels(df, cols), sort=True)
+        valid = codes >= 0
+        g = len(uniques)
+        rows = np.arange(n)[valid]
+        blocks.append(sparse.csr_matrix(
+            (np.ones(valid.sum()), (codes[valid], rows)), shape=(g, n)
+        ))
+        meta.append(pd.DataFrame({'level': level, 'group': np.asarray(uniques, dtype=object)}))
+        codes_by_level[level] = (codes, offset)
+        offset += g
+    G = sparse.vstack(blocks).tocsr()
+    return G, pd.concat(meta, ignore_index=True), codes_by_level
+
+
+def _moments(G, W, X, Y, M):
+    """
+    Somas ponderadas por grupo para X, Y (n × k), máscara M e pesos W (n × b).
+    Retorna r e inclinação/intercepto com forma (grupos, b, k).
+    """
+    n, k = X.shape
+    b = W.shape[1]
+
+    def gsum(A):
+        # (n, k) ponderado por (n, b) → (grupos, b, k)
+        P = (W[:, :, None] * A[:, None, :]).reshape(n, b * k)
+        return np.asarray(G @ P).reshape(-1, b, k)
+
+    Mf = M.astype(float)
+    cnt = gsum(Mf)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mx = gsum(np.where(M, X, 0.0)) / cnt
+        my = gsum(np.where(M, Y, 0.0)) / cnt
+        sxx = gsum(np.where(M, X * X, 0.0)) - cnt * mx * mx
+        syy = gsum(np.where(M, Y * Y, 0.0)) - cnt * my * my
+        sxy = gsum(np.where(M, X * Y, 0.0)) - cnt * mx * my
+        r = sxy / np.sqrt(sxx * syy)
+        slope = sxy / sxx
+        intercept = my - slope * mx
+    return cnt, r, slope, intercept
+
+
+def _grouped_ranks(codes, X, Y, M):
+    """Postos médios dentro do grupo, par a par (valores fora da máscara → NaN)."""
+    k = X.shape[1]
+    frame = pd.DataFrame(np.hstack([np.where(M, X, np.nan), np.where(M, Y, np.nan)]))
+    ranks = frame.groupby(codes).rank(method='average').to_numpy()
+    return ranks[:, :k], ranks[:, k:]
+
+
+def correlation_table(df, x='RpC_2010', variables=RACES, levels=None,
+                      n_boot=0, ci=0.95, seed=0):
+    """
+    Tabela tidy de correlação/regressão `x` × cada coluna de `variables`, por grupo.
+
+    Parâmetros:
+        df        : DataFrame com `x`, `variables` e as colunas de agrupamento.
+        levels    : dict {escala: colunas | None}; padrão = LEVELS presentes em `df`.
+        n_boot    : nº de réplicas bootstrap (0 = sem intervalos de confiança).
+        ci        : nível de confiança dos intervalos percentis.
+
+    Colunas: level, group, variable, n, pearson, spearman, slope, intercept, x_min, x_max
+             (+ pearson_ci_low/high, slope_ci_low/high se n_boot > 0).
+    """
+    if levels is None:
+        levels = {lv: cols for lv, cols in LEVELS.items()
+                  if cols is None or all(c in df.columns for c in cols)}
+    variables = list(variables)
+    k = len(variables)
+
+    xv = pd.to_numeric(df[x], errors='coerce').astype('float64').to_numpy()
+    Y = df[variables].apply(pd.to_numeric, errors='coerce').astype('float64').to_numpy()
+    X = np.repeat(xv[:, None], k, axis=1)
+    M = np.isfinite(X) & np.isfinite(Y)
+
+    G, meta, codes_by_level = _stack_groups(df, levels)
+    n, n_groups = len(df), G.shape[0]
+
+    out_r = np.full((n_groups, k), np.nan)
+    out_slope = np.full((n_groups, k), np.nan)
+    out_icpt = np.full((n_groups, k), np.nan)
+    out_n = np.zeros((n_groups, k))
+    out_rho = np.full((n_groups, k), np.nan)
+    out_xmin = np.full((n_groups, k), np.nan)
+    out_xmax = np.full((n_groups, k), np.nan)
+    boot_r = boot_s = None
+    if n_boot > 0:
+        boot_r = np.full((n_groups, n_boot, k), np.nan)
+        boot_s = np.full((n_groups, n_boot, k), np.nan)
+    rng = np.random.default_rng(seed)
+    ones = np.ones((n, 1))
+
+    for level, (codes, offset) in codes_by_level.items():
+        valid = codes >= 0
+        g = int(codes.max()) + 1 if valid.any() else 0
+        if g == 0:
+            continue
+        rows = slice(offset, offset + g)
+        Gl = G[rows]
+
+        # Médias por grupo (pares válidos) e centragem: array único centrado da escala
+        cnt = np.asarray(Gl @ M.astype(float))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mx = np.asarray(Gl @ np.where(M, X, 0.0)) / cnt
+            my = np.asarray(Gl @ np.where(M, Y, 0.0)) / cnt
+        safe = np.where(valid, codes, 0)
+        Xc = np.where(M & valid[:, None], X - mx[safe], 0.0)
+        Yc = np.where(M & valid[:, None], Y - my[safe], 0.0)
+        Ml = M & valid[:, None]
+
+        c, r, s, _ = _moments(Gl, ones, Xc, Yc, Ml)
+        out_n[rows] = c[:, 0, :]
+        out_r[rows] = r[:, 0, :]
+        out_slope[rows] = s[:, 0, :]
+        with np.errstate(invalid='ignore'):
+            out_icpt[rows] = my - s[:, 0, :] * mx
+
+        # Spearman: Pearson sobre postos intra-grupo
+        RX, RY = _grouped_ranks(np.where(valid, codes, -1), X, Y, Ml)
+        Mr = np.isfinite(RX) & np.isfinite(RY)
+        _, rho, _, _ = _moments(Gl, ones, np.nan_to_num(RX), np.nan_to_num(RY), Mr)
+        out_rho[rows] = rho[:, 0, :]
+
+        # Extensão de x por grupo/variável (para a reta de tendência nos gráficos)
+        xm = pd.DataFrame(np.where(Ml, X, np.nan)).groupby(codes)
+        out_xmin[rows] = xm.min().reindex(range(g)).to_numpy()
+        out_xmax[rows] = xm.max().reindex(range(g)).to_numpy()
+
+        # Bootstrap de Poisson em lotes de réplicas
+        if n_boot > 0:
+            step = max(1, BOOT_CHUNK_ELEMENTS // max(1, n * k))
+            for start in range(0, n_boot, step):
+                b = min(step, n_boot - start)
+                W = rng.poisson(1.0, size=(n, b)).astype(float)
+                _, rb, sb, _ = _moments(Gl, W, Xc, Yc, Ml)
+                boot_r[rows, start:start + b] = rb
+                boot_s[rows, start:start + b] = sb
+
+    table = pd.concat(
+        [meta.assign(variable=v, n=out_n[:, j].astype(int), pearson=out_r[:, j],
+                     spearman=out_rho[:, j], slope=out_slope[:, j], intercept=out_icpt[:, j],
+                     x_min=out_xmin[:, j], x_max=out_xmax[:, j])
+         for j, v in enumerate(variables)],
+        ignore_index=True,
+    )
+    if n_boot > 0:
+        alpha = (1 - ci) / 2
+        with np.errstate(invalid='ignore'):
+            q = [100 * alpha, 100 * (1 - alpha)]
+            r_ci = np.nanpercentile(boot_r, q, axis=1)      # (2, grupos, k)
+            s_ci = np.nanpercentile(boot_s, q, axis=1)
+        table['pearson_ci_low'] = np.concatenate([r_ci[0][:, j] for j in range(k)])
+        table['pearson_ci_high'] = np.concatenate([r_ci[1][:, j] for j in range(k)])
+        table['slope_ci_low'] = np.concatenate([s_ci[0][:, j] for j in range(k)])
+        table['slope_ci_high'] = np.concatenate([s_ci[1][:, j] for j in range(k)])
+    return table
+
+
+def fit_line(row, num=100):
+    """Pontos (x, y) da reta OLS de uma linha da tabela; None se não houver ajuste (n < 2)."""
+    if row['n'] < 2 or not np.isfinite(row['slope']):
+        return None
+    x_vals = np.linspace(row['x_min'], row['x_max'], num)
+    return x_vals, row['intercept'] + row['slope'] * x_vals
@@ -0,0 +1,301 @@
+"""
+Crosswalks entre malhas de setores de censos diferentes (2000 → 2010 → 2022 …) como matrizes
+esparsas de pesos, com um registro em disco das malhas e dos crosswalks já calculados.
+
+Crosswalk origem → destino = matriz W (n_origem × n_destino) de `common.areal_weights` (mesmo
+overlay — ou rasterização — e mesmos métodos de ponderação do script 02) + os identificadores
+das duas malhas, na ordem das linhas e das colunas. Uma variável da origem é levada ao destino
+com `W.T @ valores`; crosswalks encadeados se compõem por produto esparso, sem novo overlay:
+
+    W(2000 → 2022) = W(2000 → 2010) @ W(2010 → 2022)
+
+(a composição supõe que a parcela de um setor 2000 dentro de um setor 2010 se reparte entre
+os setores 2022 como o setor 2010 inteiro).
+
+Registro (`CrosswalkRegistry`, uma pasta com `registry.json`):
+    - malhas: nome → arquivo, coluna de ID, ano, coluna de população e assinatura do arquivo
+      (tamanho + mtime, `common.figure_cache.file_signature`);
+    - crosswalks: `<origem>__<destino>__<método>.npz` (IDs + CSR), válidos enquanto as
+      assinaturas das malhas envolvidas não mudam.
+
+`registry.get(origem, destino)` devolve o crosswalk direto do cache; na falta dele, a
+composição do caminho mais curto entre crosswalks em cache (ex.: 2000 → 2010 → 2022, gravada
+no cache); só sem nenhum caminho calcula o overlay das duas malhas. Depois dos overlays de
+cada par, harmonizar uma variável nova de qualquer ano é ler a coluna e um produto esparso.
+
+Uso:
+    registry = CrosswalkRegistry("outputs/crosswalks")
+    registry.register_mesh("2010", "data/raw/Pessoa_Renda_Resultado.shp", id_col="CD_GEOCODI", year=2010)
+    registry.register_mesh("2022", "outputs/00_build_base/Setores_Indicadores_Censo_22.shp", year=2022)
+    table = registry.harmonize("2010", "2022", ["RpC"])     # DataFrame indexado pelos IDs 2022
+"""
+
+import json
+import os
+from collections import deque
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from common.areal_weights import (ALBERS_BR, METHODS, intersection_areas, interpolate,
+                                  raster_intersection_areas, target_density, urban_mask, weight_matrix)
+from common.figure_cache import file_signature
+from common.profiling import span
+
+REGISTRY_NAME = "registry.json"
+
+
+def sector_ids(values):
+    """IDs como texto; códigos lidos como número (ex.: 1.10002e+14) voltam a ser só dígitos."""
+    s = pd.Series(values)
+    if pd.api.types.is_float_dtype(s):
+        return s.map(lambda v: f"{v:.0f}").to_numpy(dtype=str)
+    return s.astype(str).str.strip().to_numpy(dtype=str)
+
+
+class Crosswalk:
+    """Pesos origem → destino (CSR n_origem × n_destino) e os IDs das duas malhas."""
+
+    def __init__(self, source, target, source_ids, target_ids, weights, method='area'):
+        self.source, self.target, self.method = str(source), str(target), method
+        self.source_ids = np.asarray(source_ids).astype(str)
+        self.target_ids = np.asarray(target_ids).astype(str)
+        self.weights = sparse.csr_matrix(weights)
+        if self.weights.shape != (len(self.source_ids), len(self.target_ids)):
+            raise ValueError(f"Crosswalk {source} → {target}: matriz {self.weights.shape} não corresponde aos IDs "
+                             f"({len(self.source_ids)} × {len(self.target_ids)}).")
+
+    def __repr__(self):
+        return (f"Crosswalk({self.source} → {self.target}, {self.method}, "
+                f"{len(self.source_ids)} × {len(self.target_ids)}, {self.weights.nnz} pesos)")
+
+    def then(self, other):
+        """Composição self (A → B) seguida de `other` (B → C): crosswalk A → C por produto esparso."""
+        if self.target != other.source or not np.array_equal(self.target_ids, other.source_ids):
+            raise ValueError(f"Crosswalks não encadeáveis: {self.source} → {self.target} e "
+                             f"{other.source} → {other.target}.")
+        method = self.method if self.method == other.method else f"{self.method}+{other.method}"
+        return Crosswalk(self.source, other.target, self.source_ids, other.target_ids,
+                         self.weights @ other.weights, method)
+
+    def apply(self, values):
+        """
+        Leva variáveis da origem ao destino. `values`: Series/DataFrame indexado pelos IDs da
+        origem (IDs ausentes = sem valor) ou array na ordem de `source_ids`. Retorna
+        Series/DataFrame indexado pelos IDs do destino.
+        """
+        if isinstance(values, pd.Series):
+            aligned = pd.to_numeric(values, errors='coerce').set_axis(sector_ids(values.index))
+            out = interpolate(self.weights, aligned.reindex(self.source_ids).to_numpy(dtype=float))
+            return pd.Series(out, index=self.target_ids, name=values.name)
+        if isinstance(values, pd.DataFrame):
+            aligned = values.apply(pd.to_numeric, errors='coerce').set_axis(sector_ids(values.index))
+            out = interpolate(self.weights, aligned.reindex(self.source_ids).to_numpy(dtype=float))
+            return pd.DataFrame(out, index=self.target_ids, columns=values.columns)
+        return pd.Series(interpolate(self.weights, values), index=self.target_ids)
+
+    # Persistência -----------------------------------------------------------
+    def save(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        W = self.weights
+        tmp = path.with_suffix(".tmp.npz")
+        np.savez_compressed(tmp, source=self.source, target=self.target, method=self.method,
+                            source_ids=self.source_ids, target_ids=self.target_ids,
+                            data=W.data, indices=W.indices, indptr=W.indptr)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as z:
+            n_s, n_t = len(z["source_ids"]), len(z["target_ids"])
+            W = sparse.csr_matrix((z["data"], z["indices"], z["indptr"]), shape=(n_s, n_t))
+            return cls(str(z["source"]), str(z["target"]), z["source_ids"], z["target_ids"], W, str(z["method"]))
+
+
+def build_crosswalk(source, target, source_gdf, target_gdf, source_id, target_id, method='area',
+                    population_col=None, approx_cell=None):
+    """
+    Overlay (ou rasterização, com `approx_cell` em metros) das duas malhas em Brazil Albers e
+    pesos do `method`. 'population' usa `population_col` do destino; 'urban', a situação.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Método de ponderação desconhecido: {method!r} (disponíveis: {METHODS})")
+    with span('reproject', rows_in=len(source_gdf) + len(target_gdf)):
+        src = source_gdf.to_crs(ALBERS_BR)
+        tgt = target_gdf.to_crs(ALBERS_BR)
+    with span('repair', rows_in=len(src) + len(tgt)):
+        g_s, g_t = src.geometry.copy(), tgt.geometry.copy()
+        for g in (g_s, g_t):
+            invalid = ~g.is_valid
+            g[invalid] = g[invalid].buffer(0)
+    with span('overlay', source=source, target=target, cell=approx_cell) as step:
+        if approx_cell:
+            areas = raster_intersection_areas(g_s.values, g_t.values, approx_cell)
+        else:
+            areas = intersection_areas(g_s.values, g_t.values)
+        step.count(rows_out=areas.nnz)
+    population = urban = None
+    if method == 'population':
+        if not population_col:
+            raise ValueError(f"Método 'population' exige a coluna de população da malha {target}.")
+        population = pd.to_numeric(tgt[population_col], errors='coerce').to_numpy(dtype=float)
+    elif method == 'urban':
+        urban = urban_mask(tgt)
+    density = target_density(method, g_t.area.to_numpy(), population, urban)
+    W = weight_matrix(areas, g_s.area.to_numpy(), density)
+    return Crosswalk(source, target, sector_ids(src[source_id]), sector_ids(tgt[target_id]), W, method)
+
+
+class CrosswalkRegistry:
+    """
+    Malhas registradas e crosswalks em cache numa pasta (ver docstring do módulo).
+
+    O manifesto é regravado de forma atômica a cada alteração, como o de `FigureCache`.
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.manifest_path = self.root / REGISTRY_NAME
+        self.entries = {'meshes': {}, 'crosswalks': {}}
+        if self.manifest_path.exists():
+            try:
+                self.entries = json.loads(self.manifest_path.read_text(encoding='utf-8'))
+            except (OSError, ValueError):
+                print(f"[!] Registro ilegível, será recriado: {self.manifest_path}")
+
+    def _save(self):
+        tmp = self.manifest_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.entries, indent=2, ensure_ascii=False, sort_keys=True), encoding='utf-8')
+        os.replace(tmp, self.manifest_path)
+
+    @property
+    def meshes(self):
+        return self.entries['meshes']
+
+    @property
+    def crosswalks(self):
+        return self.entries['crosswalks']
+
+    # Malhas -----------------------------------------------------------------
+    def register_mesh(self, name, path, id_col='CD_SETOR', year=None, population_col=None):
+        """Registra (ou atualiza) a malha `name`; crosswalks de versões anteriores do arquivo deixam de valer."""
+        path = Path(path)
+        if not path.exists():
+            raise FileNotFoundError(f"Malha não encontrada: {path}")
+        self.meshes[str(name)] = {
+            'path': str(path.resolve()), 'id_col': id_col, 'year': year,
+            'population_col': population_col, 'signature': file_signature(path),
+        }
+        self._save()
+
+    def mesh(self, name):
+        try:
+            return self.meshes[str(name)]
+        except KeyError:
+            raise KeyError(f"Malha não registrada: {name!r} (registradas: {sorted(self.meshes)})") from None
+
+    def _current_signature(self, name):
+        return file_signature(self.mesh(name)['path'])
+
+    def read_mesh(self, name, columns=None, ignore_geometry=False):
+        """Malha registrada com a coluna de ID e as `columns` que existirem no arquivo (None = todas)."""
+        from common.schema import read_sectors, sector_columns
+
+        info = self.mesh(name)
+        cols = None
+        if columns is not None:
+            available = set(sector_columns(info['path']))
+            missing = [c for c in [info['id_col'], *columns] if c not in available]
+            if info['id_col'] in missing:
+                raise KeyError(f"Coluna de ID {info['id_col']!r} não encontrada em {info['path']}")
+            cols = [c for c in dict.fromkeys([info['id_col'], *columns]) if c in available]
+        return read_sectors(info['path'], columns=cols, ignore_geometry=ignore_geometry)
+
+    # Crosswalks -------------------------------------------------------------
+    @staticmethod
+    def key(source, target, method='area'):
+        return f"{source}__{target}__{method}"
+
+    def is_fresh(self, key):
+        """Crosswalk em cache com o arquivo presente e as malhas inalteradas desde o cálculo."""
+        entry = self.crosswalks.get(key)
+        if not entry or not (self.root / entry['file']).exists():
+            return False
+        return all(name in self.meshes and self._current_signature(name) == sig
+                   for name, sig in entry['meshes'].items())
+
+    def _store(self, cw, meshes, composed_of=None):
+        key = self.key(cw.source, cw.target, cw.method)
+        cw.save(self.root / f"{key}.npz")
+        self.crosswalks[key] = {
+            'file': f"{key}.npz", 'source': cw.source, 'target': cw.target, 'method': cw.method,
+            'meshes': {name: self._current_signature(name) for name in meshes},
+            'composed_of': composed_of, 'nnz': int(cw.weights.nnz),
+        }
+        self._save()
+
+    def build(self, source, target, method='area', approx_cell=None):
+        """Calcula o crosswalk direto (overlay) e grava no cache."""
+        s_info, t_info = self.mesh(source), self.mesh(target)
+        print(f"🔀 Crosswalk {source} → {target} ({method}): overlay das malhas…")
+        extra = {'population': [t_info['population_col'] or ''], 'urban': ['CD_SITU', 'CD_SIT', 'SITUACAO']}
+        cw = build_crosswalk(source, target, self.read_mesh(source, columns=[]),
+                             self.read_mesh(target, columns=extra.get(method, [])),
+                             s_info['id_col'], t_info['id_col'], method,
+                             t_info['population_col'], approx_cell)
+        self._store(cw, [source, target])
+        return cw
+
+    def chain(self, source, target, method='area'):
+        """Caminho mais curto source → … → target entre crosswalks válidos do cache, ou None."""
+        edges = {}
+        for key, entry in self.crosswalks.items():
+            if entry['method'] == method and not entry.get('composed_of') and self.is_fresh(key):
+                edges.setdefault(entry['source'], []).append(entry['target'])
+        previous, queue = {str(source): None}, deque([str(source)])
+        while queue:
+            node = queue.popleft()
+            if node == str(target):
+                path = [node]
+                while previous[path[-1]] is not None:
+                    path.append(previous[path[-1]])
+                return path[::-1]
+            for nxt in edges.get(node, []):
+                if nxt not in previous:
+                    previous[nxt] = node
+                    queue.append(nxt)
+        return None
+
+    def get(self, source, target, method='area', build=True, approx_cell=None):
+        """Crosswalk source → target: cache direto, composição de crosswalks em cache ou overlay."""
+        key = self.key(source, target, method)
+        if self.is_fresh(key):
+            return Crosswalk.load(self.root / self.crosswalks[key]['file'])
+        path = self.chain(source, target, method)
+        if path and len(path) > 2:
+            print(f"🔗 Crosswalk {source} → {target} ({method}) por composição: {' → '.join(path)}")
+            with span('aggregate', chain=' → '.join(path)):
+                cw = Crosswalk.load(self.root / self.crosswalks[self.key(path[0], path[1], method)]['file'])
+                for a, b in zip(path[1:-1], path[2:]):
+                    cw = cw.then(Crosswalk.load(self.root / self.crosswalks[self.key(a, b, method)]['file']))
+            self._store(cw, path, composed_of=path)
+            return cw
+        if not build:
+            raise KeyError(f"Sem crosswalk {source} → {target} ({method}) em cache.")
+        return self.build(source, target, method, approx_cell)
+
+    def harmonize(self, source, target, columns, method='area', values=None):
+        """
+        Variáveis `columns` da malha `source` (lidas do arquivo registrado, ou de `values`,
+        indexado pelos IDs da origem) levadas à malha `target`: DataFrame indexado pelos IDs.
+        """
+        cw = self.get(source, target, method)
+        if values is None:
+            table = self.read_mesh(source, columns=columns, ignore_geometry=True)
+            values = table.set_index(self.mesh(source)['id_col'])[list(columns)]
+        with span('aggregate', source=source, target=target, rows_in=len(values)):
+            return cw.apply(values[list(columns)])
@@ -0,0 +1,129 @@
+"""
+Cache incremental de figuras com saídas endereçadas por conteúdo.
+
+Cada figura recebe uma chave = hash(recorte de dados usado no gráfico + parâmetros de plotagem
++ versão do código). As chaves ficam num manifesto JSON (`.figure_manifest.json`) salvo na
+mesma pasta dos PNGs. Numa nova execução, figuras cuja chave não mudou (e cujo arquivo ainda
+existe) são mantidas; apenas as regiões/municípios afetados são re-renderizados.
+
+Uso típico:
+    cache = FigureCache(save_path, code_files=[__file__])
+    key = cache.key(region_data[cols], params={"region": region})
+    if cache.is_fresh(filename, key):
+        return
+    ... plotagem e savefig ...
+    cache.record(filename, key)
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+MANIFEST_NAME = ".figure_manifest.json"
+
+
+def _update_with_frame(h, df):
+    """Acrescenta ao hash o conteúdo de um DataFrame/GeoDataFrame (valores, colunas e índice)."""
+    geom_cols = [c for c in df.columns if str(df[c].dtype) == "geometry"]
+    if geom_cols:
+        import shapely
+
+        for col in geom_cols:
+            h.update(col.encode("utf-8"))
+            wkb = shapely.to_wkb(df[col].values)
+            h.update(b"".join(b if b is not None else b"\x00" for b in wkb))
+        df = df.drop(columns=geom_cols)
+
+    import pandas as pd
+
+    h.update(json.dumps([str(c) for c in df.columns]).encode("utf-8"))
+    h.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+
+
+def hash_data(*frames):
+    """Hash (sha256, hex) do recorte de dados de uma figura. Aceita DataFrames, Series ou None."""
+    import pandas as pd
+
+    h = hashlib.sha256()
+    for obj in frames:
+        if obj is None:
+            h.update(b"<none>")
+        elif isinstance(obj, pd.Series):
+            _update_with_frame(h, obj.to_frame())
+        else:
+            _update_with_frame(h, obj)
+    return h.hexdigest()
+
+
+def file_signature(*paths):
+    """
+    Assinatura barata de arquivos auxiliares grandes (tamanho + mtime), usada no lugar do
+    hash do conteúdo (ex.: camadas de oceano e massas d'água do script 10).
+    Para shapefiles, considera também os arquivos-irmãos (.dbf, .shx, .prj).
+    """
+    sig = []
+    for p in paths:
+        p = Path(p)
+        siblings = sorted(p.parent.glob(p.stem + ".*")) if p.suffix.lower() == ".shp" else [p]
+        for s in siblings:
+            if s.exists():
+                st = s.stat()
+                sig.append([s.name, st.st_size, st.st_mtime_ns])
+    return sig
+
+
+def code_version(*paths):
+    """Hash do código-fonte que gera a figura (script + módulos auxiliares)."""
+    h = hashlib.sha256()
+    for p in paths:
+        h.update(Path(p).read_bytes())
+    return h.hexdigest()
+
+
+class FigureCache:
+    """
+    Manifesto {arquivo_relativo: chave} de uma pasta de saída de figuras.
+
+    - `force=True` ignora o manifesto (re-renderiza tudo), mas continua registrando as chaves.
+    - O manifesto é regravado a cada `record`, de forma atômica, para sobreviver a execuções
+      interrompidas.
+    """
+
+    def __init__(self, out_dir, code_files=(), force=False):
+        self.out_dir = Path(out_dir)
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self.manifest_path = self.out_dir / MANIFEST_NAME
+        self.force = force
+        self.code = code_version(__file__, *code_files)
+        self.entries = {}
+        if self.manifest_path.exists():
+            try:
+                self.entries = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                print(f"[!] Manifesto ilegível, será recriado: {self.manifest_path}")
+                self.entries = {}
+
+    def _rel(self, filename):
+        return os.path.relpath(Path(filename).resolve(), self.out_dir.resolve())
+
+    def key(self, *frames, params=None):
+        """Chave da figura: dados + parâmetros (serializáveis em JSON) + versão do código."""
+        h = hashlib.sha256()
+        h.update(hash_data(*frames).encode("ascii"))
+        h.update(json.dumps(params or {}, sort_keys=True, default=str).encode("utf-8"))
+        h.update(self.code.encode("ascii"))
+        return h.hexdigest()
+
+    def is_fresh(self, filename, key):
+        """True se a figura existe e foi gerada com a mesma chave (pode ser pulada)."""
+        if self.force:
+            return False
+        return self.entries.get(self._rel(filename)) == key and Path(filename).exists()
+
+    def record(self, filename, key):
+        """Registra a chave de uma figura recém-salva e regrava o manifesto."""
+        self.entries[self._rel(filename)] = key
+        tmp = self.manifest_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.entries, indent=2, sort_keys=True), encoding="utf-8")
+        os.replace(tmp, self.manifest_path)
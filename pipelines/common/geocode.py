@@ -0,0 +1,199 @@
+"""
+Localização de pontos nos setores das cidades médias: coordenadas (lon, lat) → setor →
+indicadores (CD_SETOR, RpC_2010, P_Agua, P_Esgo, participação por raça, Quintil).
+
+O índice (`SectorIndex`) guarda as geometrias em EPSG:4326, o código de cada setor e a
+tabela de atributos. É persistido em GeoParquet (com um manifesto JSON ao lado) e só é
+refeito quando a base de origem muda (tamanho + mtime, `common.figure_cache.file_signature`)
+ou quando faltam colunas pedidas; a leitura do shapefile, a reprojeção e o cálculo dos
+quintis (mesma regra do script 09, se a base não trouxer `Quintil`) ficam no cache. O
+STRtree é montado na carga, o que leva uma fração de segundo mesmo para todo o país.
+
+A consulta é vetorizada: `STRtree.query(pontos, predicate="within")` por lotes de `chunk`
+pontos, de modo que a memória depende do lote e não do total de pontos. Um ponto exatamente
+sobre a divisa entre dois setores não está "within" de nenhum deles; para esses (poucos),
+uma 2ª consulta com "intersects" atribui o primeiro setor encontrado. Pontos fora de todos
+os setores, ou sem coordenadas, ficam com posição −1 e atributos ausentes.
+
+Com `workers > 1`, os lotes vão para um pool de processos: cada processo recebe as
+geometrias (WKB) uma única vez (`init_worker`) e monta o seu STRtree, como no script 14.
+"""
+
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import shapely
+
+from common.figure_cache import file_signature
+from common.profiling import span
+
+ID_COL = 'CD_SETOR'
+
+# Atributos copiados para cada ponto (os ausentes na base são ignorados)
+ATTRIBUTES = [
+    'NM_MUN', 'NM_UF', 'NM_REGIAO', 'RpC_2010', 'P_Agua', 'P_Esgo', 'P_Lixo',
+    'P_Branca', 'P_Preta', 'P_Amarela', 'P_Parda', 'P_Indigena', 'Quintil',
+]
+
+# Pontos por lote de consulta
+CHUNK = 200_000
+
+# Estado de cada processo de trabalho (preenchido uma vez por `init_worker`)
+_WORKER = {}
+
+
+# -----------------------------------------------------------------------------
+# Consulta
+# -----------------------------------------------------------------------------
+def locate(tree, lon, lat):
+    """
+    Posição (no array de geometrias do `tree`) do setor que contém cada ponto; −1 se nenhum.
+    Com sobreposição (não esperada numa malha censitária), vale o primeiro setor.
+    """
+    lon = np.asarray(lon, dtype='float64')
+    lat = np.asarray(lat, dtype='float64')
+    out = np.full(len(lon), -1, dtype='int64')
+    valid = np.flatnonzero(np.isfinite(lon) & np.isfinite(lat))
+    if not len(valid):
+        return out
+    points = shapely.points(lon[valid], lat[valid])
+    ip, ig = tree.query(points, predicate="within")
+    # atribuição em ordem inversa: em pares repetidos do mesmo ponto, fica o primeiro
+    out[valid[ip[::-1]]] = ig[::-1]
+
+    # pontos sobre a divisa entre setores
+    edge = np.flatnonzero(out[valid] < 0)
+    if len(edge):
+        ip, ig = tree.query(points[edge], predicate="intersects")
+        out[valid[edge[ip[::-1]]]] = ig[::-1]
+    return out
+
+
+def init_worker(wkb):
+    """Recebe a malha (WKB, EPSG:4326) uma única vez por processo e monta o STRtree."""
+    _WORKER['tree'] = shapely.STRtree(shapely.from_wkb(wkb))
+
+
+def locate_chunk(start, lon, lat):
+    """Tarefa dos processos de trabalho: (início do lote, posições dos setores)."""
+    return start, locate(_WORKER['tree'], lon, lat)
+
+
+# -----------------------------------------------------------------------------
+# Índice persistido
+# -----------------------------------------------------------------------------
+class SectorIndex:
+    """
+    Índice ponto → setor sobre a base das cidades médias.
+
+    Uso:
+        index = SectorIndex.load_or_build("outputs/00_build_base/cidades_medias/Cidades_Medias_Variaveis.parquet",
+                                          "outputs/cache/geocode/setores.parquet")
+        df = index.lookup(lon, lat)                 # CD_SETOR + ATTRIBUTES, uma linha por ponto
+        pos = index.locate(lon, lat, workers=4)     # só as posições (−1 = fora dos setores)
+    """
+
+    def __init__(self, gdf):
+        gdf = gdf.reset_index(drop=True)
+        self.geoms = np.asarray(gdf.geometry.values)
+        self.table = pd.DataFrame(gdf.drop(columns='geometry'))
+        self.tree = shapely.STRtree(self.geoms)
+
+    def __len__(self):
+        return len(self.geoms)
+
+    @property
+    def columns(self):
+        return [c for c in self.table.columns if c != ID_COL]
+
+    @staticmethod
+    def build(source, columns=ATTRIBUTES):
+        """GeoDataFrame do índice (EPSG:4326, CD_SETOR + `columns`) a partir da base de setores."""
+        from common.schema import read_sectors, sector_columns
+
+        available = sector_columns(source)
+        wanted = [ID_COL] + [c for c in columns if c != ID_COL]
+        gdf = read_sectors(source, columns=[c for c in wanted + ['RpC_2010', 'CD_MUN', 'NM_MUN', 'NM_UF']
+                                            if c in available])
+        if 'Quintil' in wanted and 'Quintil' not in gdf.columns and 'RpC_2010' in gdf.columns:
+            from common.classify import classify
+
+            with span('aggregate', step='quintis', rows_in=len(gdf)):
+                gdf['RpC_2010'] = pd.to_numeric(gdf['RpC_2010'], errors='coerce')
+                gdf['Quintil'] = classify(gdf, 'RpC_2010', k=5, method='quantiles', group_by='municipio')
+        if gdf.crs is not None and not gdf.crs.equals("EPSG:4326"):
+            gdf = gdf.to_crs(epsg=4326)
+        invalid = ~shapely.is_valid(np.asarray(gdf.geometry.values))
+        if invalid.any():
+            gdf.loc[invalid, 'geometry'] = gdf.geometry[invalid].buffer(0)
+        return gdf[[c for c in wanted if c in gdf.columns] + ['geometry']]
+
+    @classmethod
+    def load_or_build(cls, source, path, columns=ATTRIBUTES):
+        """
+        Lê o índice de `path` se ele foi gerado a partir da versão atual de `source` e tem as
+        colunas pedidas; caso contrário, refaz e grava (arquivo temporário + `os.replace`).
+        """
+        import geopandas as gpd
+
+        path = Path(path)
+        manifest_path = path.with_suffix('.json')
+        manifest = {'source': str(source), 'signature': file_signature(source), 'columns': list(columns)}
+        if path.exists() and manifest_path.exists():
+            saved = json.loads(manifest_path.read_text(encoding='utf-8'))
+            if saved['source'] == manifest['source'] and saved['signature'] == manifest['signature'] \
+                    and set(columns) <= set(saved['columns']):
+                with span('read', path=path) as step:
+                    gdf = gpd.read_parquet(path)
+                    step.count(rows_out=len(gdf))
+                return cls(gdf)
+
+        gdf = cls.build(source, columns)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with span('write', path=path, rows_in=len(gdf)):
+            tmp = path.with_suffix('.tmp')
+            gdf.to_parquet(tmp, index=False)
+            os.replace(tmp, path)
+            manifest_path.write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding='utf-8')
+        return cls(gdf)
+
+    def locate(self, lon, lat, chunk=CHUNK, workers=1):
+        """Posições dos setores que contêm cada ponto (−1 = fora), por lotes de `chunk` pontos."""
+        lon = np.asarray(lon, dtype='float64')
+        lat = np.asarray(lat, dtype='float64')
+        n = len(lon)
+        starts = range(0, n, chunk)
+        with span('overlay', step='geocode', points=n, chunk=chunk, workers=workers) as step:
+            if workers > 1 and n > chunk:
+                from concurrent.futures import ProcessPoolExecutor
+
+                out = np.empty(n, dtype='int64')
+                with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                         initargs=(shapely.to_wkb(self.geoms),)) as pool:
+                    futures = [pool.submit(locate_chunk, s, lon[s:s + chunk], lat[s:s + chunk])
+                               for s in starts]
+                    for f in futures:
+                        s, pos = f.result()
+                        out[s:s + len(pos)] = pos
+            else:
+                out = np.concatenate([locate(self.tree, lon[s:s + chunk], lat[s:s + chunk])
+                                      for s in starts]) if n else np.empty(0, dtype='int64')
+            step.count(rows_out=int((out >= 0).sum()))
+        return out
+
+    def lookup(self, lon, lat, columns=None, chunk=CHUNK, workers=1):
+        """
+        DataFrame com uma linha por ponto (na ordem da entrada): CD_SETOR e os atributos
+        `columns` (padrão: todos os do índice). Pontos fora dos setores ficam com valores ausentes.
+        """
+        pos = self.locate(lon, lat, chunk=chunk, workers=workers)
+        columns = self.columns if columns is None else list(columns)
+        missing = [c for c in columns if c not in self.table.columns]
+        if missing:
+            raise KeyError(f"Colunas ausentes no índice: {', '.join(missing)}")
+        # `take` com allow_fill: posição −1 → ausente, preservando category/Int8 (inteiros → float)
+        return pd.DataFrame({c: pd.api.extensions.take(self.table[c].array, pos, allow_fill=True)
+                             for c in [ID_COL] + [c for c in columns if c != ID_COL]})
@@ -0,0 +1,257 @@
+"""
+Reagregação dos indicadores dos setores numa grade hexagonal regular (script 17).
+
+Os setores censitários variam muito de tamanho (de um quarteirão a dezenas de km² na
+periferia), o que distorce comparações setor a setor entre cidades e encarece os mapas.
+A grade tem hexágonos de lado `size` (m) na projeção Albers do Brasil
+(`common.areal_weights.ALBERS_BR`), ancorada na origem da projeção: a célula de coordenadas
+axiais (q, r) é a mesma em qualquer execução e em qualquer cidade. Cada célula pertence a
+um município (a chave é município + q + r): hexágonos na divisa entre dois municípios viram
+duas células, uma com a parte de cada um, e nenhuma célula mistura cidades.
+
+Mesma abordagem esparsa do script 02 (`common.areal_weights`):
+    1. por cidade, os hexágonos que cobrem a bbox dos setores e a matriz de áreas de
+       interseção setor × hexágono (STRtree + `shapely.intersection`), em lotes de cidades
+       de até `CHUNK` setores nos processos de trabalho (`hex_areas`);
+    2. a matriz A (setores × células) fica em cache (npz, chave = hash da malha + lado),
+       de modo que reagregar outras variáveis não refaz nenhuma interseção;
+    3. W = diag(1 / área do setor) · A; contagens das células = Wᵀ · contagens dos setores.
+Taxas são refeitas a partir das contagens reagregadas: P_Agua/P_Esgo/P_Lixo sobre os
+domicílios (v0007), P_Branca…P_Indigena sobre a população (v0001), como no script 01, e
+RpC_2010 é a média ponderada pela população.
+
+A camada resultante tem o esquema da base de setores (CD_SETOR = id da célula, NM_MUN,
+NM_UF, NM_REGIAO, CD_MUN…, contagens e percentuais) e pode substituir
+`Cidades_Medias_Variaveis` como entrada dos scripts 04–16.
+"""
+
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import shapely
+from scipy import sparse
+
+from common.areal_weights import ALBERS_BR, intersection_areas, interpolate, weight_matrix
+from common.correlation_stats import group_labels
+from common.profiling import span
+from common.schema import COUNT_COLS
+from common.spatial_weights import mesh_key
+
+# Lado do hexágono (m; = raio do círculo circunscrito). 500 m → 0,65 km² por célula
+HEX_SIZE = 500
+
+# Setores por tarefa dos processos de trabalho
+CHUNK = 20_000
+
+# Colunas do município copiadas para as células
+MUNICIPALITY_COLS = ['CD_REGIAO', 'NM_REGIAO', 'CD_UF', 'NM_UF', 'SIGLA_UF', 'CD_MUN', 'NM_MUN']
+
+# Percentual → contagem-base (denominador no script 01)
+RATES = {
+    'P_Agua': 'v0007', 'P_Esgo': 'v0007', 'P_Lixo': 'v0007',
+    'P_Branca': 'v0001', 'P_Preta': 'v0001', 'P_Amarela': 'v0001', 'P_Parda': 'v0001',
+    'P_Indigena': 'v0001',
+}
+
+SQRT3 = np.sqrt(3.0)
+
+
+# -----------------------------------------------------------------------------
+# Geometria da grade (hexágonos "pointy-top", coordenadas axiais)
+# -----------------------------------------------------------------------------
+def hex_centers(q, r, size):
+    return size * SQRT3 * (q + r / 2), size * 1.5 * r
+
+
+def hex_polygons(q, r, size):
+    """Polígonos das células (q, r) em Albers (vetorizado)."""
+    x, y = hex_centers(np.asarray(q, dtype=float), np.asarray(r, dtype=float), size)
+    angles = np.deg2rad(30 + 60 * np.arange(7))           # 7º vértice = 1º (anel fechado)
+    coords = np.stack([x[:, None] + size * np.cos(angles), y[:, None] + size * np.sin(angles)], axis=-1)
+    return shapely.polygons(coords)
+
+
+def hex_cover(bounds, size):
+    """Coordenadas axiais (q, r) de todas as células que tocam a bbox (minx, miny, maxx, maxy)."""
+    minx, miny, maxx, maxy = bounds
+    rows = np.arange(np.floor((miny - size) / (1.5 * size)), np.ceil((maxy + size) / (1.5 * size)) + 1)
+    width = size * SQRT3
+    q0 = np.floor((minx - width) / width - rows / 2)
+    n_q = int(np.ceil((maxx - minx) / width)) + 3
+    q = (q0[:, None] + np.arange(n_q)[None, :]).ravel()
+    r = np.repeat(rows, n_q)
+    return q.astype(np.int64), r.astype(np.int64)
+
+
+def hex_areas(wkb, city, size):
+    """
+    Tarefa dos processos de trabalho: setores (WKB em Albers) e o código da cidade de cada
+    um → (posição local do setor, q, r, área da interseção), cidade a cidade.
+    """
+    geoms = shapely.from_wkb(wkb)
+    parts = []
+    for c in np.unique(city):
+        idx = np.flatnonzero(city == c)
+        q, r = hex_cover(shapely.total_bounds(geoms[idx]), size)
+        A = intersection_areas(geoms[idx], hex_polygons(q, r, size)).tocoo()
+        parts.append((idx[A.row], q[A.col], r[A.col], A.data))
+    return tuple(np.concatenate(a) for a in zip(*parts))
+
+
+# -----------------------------------------------------------------------------
+# Grade + matriz de áreas (em cache)
+# -----------------------------------------------------------------------------
+class HexGrid:
+    """
+    Células hexagonais de uma malha de setores e a matriz de áreas setor × célula.
+
+    Uso:
+        grid = HexGrid.load_or_build(base_gdf, "outputs/cache/hexgrid", size=500)
+        hexes = grid.aggregate(base_gdf)          # GeoDataFrame com o esquema da base
+    """
+
+    def __init__(self, cells, areas, size, key=""):
+        self.cells = cells          # DataFrame: CD_SETOR (id da célula), municipio, q, r
+        self.areas = areas          # CSR n_setores × n_células (m²)
+        self.size = size
+        self.key = key
+
+    def __len__(self):
+        return len(self.cells)
+
+    @staticmethod
+    def cache_path(cache_dir, size):
+        return Path(cache_dir) / f"hexgrid_{size:g}m.npz"
+
+    @classmethod
+    def build(cls, gdf, size=HEX_SIZE, workers=None, chunk=CHUNK, key=""):
+        """Interseções setor × hexágono de cada cidade, em lotes nos processos de trabalho."""
+        from concurrent.futures import ProcessPoolExecutor
+
+        with span('reproject', rows_in=len(gdf)):
+            geoms = np.asarray(gdf.to_crs(ALBERS_BR).geometry.values)
+            invalid = ~shapely.is_valid(geoms)
+            if invalid.any():
+                geoms[invalid] = shapely.make_valid(geoms[invalid])
+        labels = group_labels(gdf, [c for c in ('NM_MUN', 'NM_UF') if c in gdf.columns])
+        city, municipalities = pd.factorize(labels.fillna(''), sort=True)
+
+        # Lotes contíguos na ordem das cidades: cada tarefa cobre cidades inteiras ou parte de uma
+        order = np.argsort(city, kind='stable')
+        tasks = [order[i:i + chunk] for i in range(0, len(order), chunk)]
+        wkb = shapely.to_wkb(geoms)
+        with span('overlay', step='hexgrid', rows_in=len(gdf), size=size, tasks=len(tasks)) as step:
+            if len(tasks) > 1 and workers != 1:
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    futures = [pool.submit(hex_areas, wkb[t], city[t], size) for t in tasks]
+                    results = [(t, f.result()) for t, f in zip(tasks, futures)]
+            else:
+                results = [(t, hex_areas(wkb[t], city[t], size)) for t in tasks]
+            s = np.concatenate([t[res[0]] for t, res in results])
+            q = np.concatenate([res[1] for _, res in results])
+            r = np.concatenate([res[2] for _, res in results])
+            area = np.concatenate([res[3] for _, res in results])
+
+            # Célula = (município, q, r)
+            cell_keys, cell = np.unique(np.stack([city[s], q, r], axis=1), axis=0, return_inverse=True)
+            areas = sparse.csr_matrix((area, (s, cell.ravel())), shape=(len(gdf), len(cell_keys)))
+            areas.sum_duplicates()
+            step.count(rows_out=len(cell_keys))
+
+        # Id da célula: código IBGE do município (ou a posição dele, sem CD_MUN) + q + r
+        mun = cell_keys[:, 0]
+        prefix = np.arange(len(municipalities)).astype(str)
+        if 'CD_MUN' in gdf.columns:
+            prefix = pd.Series(gdf['CD_MUN'].astype(str).to_numpy()).groupby(city).first().to_numpy()
+        cells = pd.DataFrame({
+            'CD_SETOR': [f"{prefix[m]}_{a}_{b}" for m, a, b in cell_keys],
+            'municipio': np.asarray(municipalities)[mun], 'q': cell_keys[:, 1], 'r': cell_keys[:, 2],
+        })
+        return cls(cells, areas, size, key)
+
+    @classmethod
+    def load_or_build(cls, gdf, cache_dir, size=HEX_SIZE, workers=None):
+        """Lê a grade do cache se a malha (ids + geometrias) e o lado não mudaram; senão, refaz e grava."""
+        ids = gdf['CD_SETOR'].astype(str) if 'CD_SETOR' in gdf.columns else gdf.index.astype(str)
+        key = f"{mesh_key(ids, gdf.geometry.values)}:{size:g}"
+        path = cls.cache_path(cache_dir, size)
+        if path.exists():
+            grid = cls.load(path)
+            if grid.key == key:
+                return grid
+        grid = cls.build(gdf, size, workers, key=key)
+        grid.save(path)
+        return grid
+
+    def save(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        A = self.areas
+        tmp = path.with_suffix(".tmp.npz")
+        np.savez_compressed(tmp, key=self.key, size=self.size, cell_ids=self.cells['CD_SETOR'].to_numpy(str),
+                            municipio=self.cells['municipio'].to_numpy(str), q=self.cells['q'].to_numpy(),
+                            r=self.cells['r'].to_numpy(), n_sectors=A.shape[0],
+                            data=A.data, indices=A.indices, indptr=A.indptr)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as z:
+            cells = pd.DataFrame({'CD_SETOR': z["cell_ids"], 'municipio': z["municipio"], 'q': z["q"], 'r': z["r"]})
+            A = sparse.csr_matrix((z["data"], z["indices"], z["indptr"]), shape=(int(z["n_sectors"]), len(cells)))
+            return cls(cells, A, float(z["size"]), str(z["key"]))
+
+    def geometry(self, crs=None):
+        """Hexágonos das células (GeoSeries; em `crs`, se informado, senão em Albers)."""
+        import geopandas as gpd
+
+        hexes = gpd.GeoSeries(hex_polygons(self.cells['q'].to_numpy(), self.cells['r'].to_numpy(), self.size),
+                              crs=ALBERS_BR)
+        return hexes.to_crs(crs) if crs is not None else hexes
+
+    def aggregate(self, gdf):
+        """
+        Camada de células com o esquema da base: contagens reagregadas por área, percentuais
+        refeitos sobre as contagens-base e RpC_2010 ponderada pela população. `gdf` deve ser
+        a mesma malha (mesma ordem) usada para construir a grade.
+        """
+        import geopandas as gpd
+
+        if len(gdf) != self.areas.shape[0]:
+            raise ValueError(f"A grade foi construída com {self.areas.shape[0]} setores; a base tem {len(gdf)}.")
+        with span('aggregate', step='hexgrid', rows_in=len(gdf)) as step:
+            W = weight_matrix(self.areas, np.asarray(self.areas.sum(axis=1)).ravel())
+            counts = [c for c in COUNT_COLS if c in gdf.columns]
+            values = {c: pd.to_numeric(gdf[c], errors='coerce').to_numpy(dtype=float) for c in counts}
+            rates = {p: base for p, base in RATES.items() if p in gdf.columns and base in gdf.columns}
+            for p, base in rates.items():
+                values[f'_{p}'] = values[base] * pd.to_numeric(gdf[p], errors='coerce').to_numpy(dtype=float) / 100
+            if 'RpC_2010' in gdf.columns and 'v0001' in gdf.columns:
+                rpc = pd.to_numeric(gdf['RpC_2010'], errors='coerce').to_numpy(dtype=float)
+                values['_RpC_2010'] = values['v0001'] * rpc
+                values['_v0001_renda'] = np.where(np.isfinite(rpc), values['v0001'], np.nan)
+            names = list(values)
+            agg = pd.DataFrame(interpolate(W, np.column_stack([values[c] for c in names])), columns=names)
+
+            with np.errstate(invalid='ignore', divide='ignore'):
+                for p, base in rates.items():
+                    agg[p] = np.where(agg[base] > 0, agg[f'_{p}'] / agg[base] * 100, np.nan)
+                if '_RpC_2010' in agg.columns:
+                    agg['RpC_2010'] = np.where(agg['_v0001_renda'] > 0, agg['_RpC_2010'] / agg['_v0001_renda'], np.nan)
+            agg = agg.drop(columns=[c for c in agg.columns if c.startswith('_')])
+
+            # Atributos do município de cada célula
+            mun_cols = [c for c in MUNICIPALITY_COLS if c in gdf.columns]
+            labels = group_labels(gdf, [c for c in ('NM_MUN', 'NM_UF') if c in gdf.columns]).fillna('')
+            mun_attrs = gdf[mun_cols].assign(municipio=labels.to_numpy()).drop_duplicates('municipio')
+            cells = self.cells[['CD_SETOR', 'municipio']].merge(mun_attrs, on='municipio', how='left')
+            cells = cells.drop(columns='municipio')
+            cells['n_setores'] = np.diff(self.areas.tocsc().indptr)
+            cells['area_setores_km2'] = np.asarray(self.areas.sum(axis=0)).ravel() / 1e6
+
+            out = gpd.GeoDataFrame(pd.concat([cells, agg], axis=1), geometry=self.geometry(gdf.crs).values,
+                                   crs=gdf.crs)
+            step.count(rows_out=len(out))
+        return out
@@ -0,0 +1,100 @@
+"""
+Cache de níveis de detalhe (LOD) da malha de setores para renderização de mapas (script 10).
+
+A malha é simplificada em poucas tolerâncias fixas (`LOD_LEVELS`, progressão ×4). Cada
+renderizador calcula a tolerância útil do painel (meio pixel na extensão e DPI de saída,
+ver `common.basemap.pixel_size`) e usa o nível mais grosso que ainda fica abaixo dela:
+vértices menores que o pixel deixam de ser construídos como paths do matplotlib.
+
+A simplificação é de cobertura (`shapely.coverage_simplify`, por município): fronteiras
+compartilhadas entre setores vizinhos são simplificadas uma única vez e continuam
+coincidentes, sem frestas nem sobreposições. Com shapely < 2.1 cai para a simplificação
+por feição com preservação de topologia.
+
+Os níveis são gravados em disco (`lod_<hash da malha>_<nível>.parquet`, WKB na ordem da
+malha) e reaproveitados entre execuções enquanto a malha não mudar.
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import shapely
+
+from common.correlation_stats import group_labels
+from common.spatial_weights import mesh_key
+
+# Tolerâncias dos níveis, em unidades do CRS da malha (graus em EPSG:4326: ~1 m, 4 m, 18 m, 70 m)
+LOD_LEVELS = (1e-5, 4e-5, 1.6e-4, 6.4e-4)
+
+
+def pick_level(tolerance, levels=LOD_LEVELS):
+    """Maior nível ≤ `tolerance` (None se nem o mais fino cabe: usar a geometria original)."""
+    usable = [lv for lv in levels if lv <= tolerance]
+    return max(usable) if usable else None
+
+
+def simplify_coverage(geoms, tolerance, groups=None):
+    """Simplificação de cobertura por grupo (ex.: município); array na mesma ordem de `geoms`."""
+    geoms = np.asarray(geoms)
+    if not hasattr(shapely, 'coverage_simplify'):
+        return shapely.simplify(geoms, tolerance, preserve_topology=True)
+    out = np.empty(len(geoms), dtype=object)
+    if groups is None:
+        groups = np.zeros(len(geoms), dtype=int)
+    for idx in pd.Series(np.arange(len(geoms))).groupby(np.asarray(groups), dropna=False).indices.values():
+        out[idx] = shapely.coverage_simplify(geoms[idx], tolerance)
+    return out
+
+
+class LODMesh:
+    """
+    Malha com níveis de detalhe sob demanda (memória + disco).
+
+    Uso:
+        lod = LODMesh(region_gdf, "outputs/cache/lod")
+        gdf = lod.for_tolerance(pixel / 2)      # GeoDataFrame com a geometria do nível
+    """
+
+    def __init__(self, gdf, cache_dir, group_cols=('NM_MUN', 'NM_UF'), levels=LOD_LEVELS):
+        self.gdf = gdf
+        self.levels = tuple(levels)
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        cols = [c for c in group_cols if c in gdf.columns]
+        self.groups = pd.factorize(group_labels(gdf, cols))[0] if cols else None
+        ids = gdf['CD_SETOR'].astype(str) if 'CD_SETOR' in gdf.columns else gdf.index.astype(str)
+        self.key = mesh_key(ids, gdf.geometry.values)
+        self._layers = {}
+        self._frames = {}
+
+    def path_for(self, level):
+        return self.cache_dir / f"lod_{self.key}_{level:g}.parquet"
+
+    def geometry(self, level):
+        """Geometrias simplificadas no nível `level` (array na ordem da malha)."""
+        if level not in self._layers:
+            path = self.path_for(level)
+            if path.exists():
+                wkb = pd.read_parquet(path)['wkb'].to_numpy()
+                geoms = shapely.from_wkb(wkb)
+            else:
+                geoms = simplify_coverage(self.gdf.geometry.values, level, self.groups)
+                tmp = path.with_suffix('.tmp')
+                pd.DataFrame({'wkb': shapely.to_wkb(geoms)}).to_parquet(tmp, index=False)
+                tmp.replace(path)
+            self._layers[level] = geoms
+        return self._layers[level]
+
+    def for_tolerance(self, tolerance):
+        """Cópia rasa da malha com a geometria do nível adequado a `tolerance`."""
+        level = pick_level(tolerance, self.levels)
+        if level is None:
+            return self.gdf
+        if level not in self._frames:
+            import geopandas as gpd
+
+            out = self.gdf.copy(deep=False)
+            out[out.geometry.name] = gpd.GeoSeries(self.geometry(level), index=out.index, crs=out.crs)
+            self._frames[level] = out
+        return self._frames[level]
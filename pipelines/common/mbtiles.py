@@ -0,0 +1,92 @@
+"""
+Leitura e escrita de arquivos MBTiles 1.3 (SQLite) com vector tiles gzip (script 14).
+
+Esquema: tabela `metadata (name, value)` e tabela `tiles (zoom_level, tile_column, tile_row,
+tile_data)` com linhas no esquema TMS (y invertido em relação ao XYZ usado pelos mapas web).
+"""
+
+import json
+import sqlite3
+import threading
+from pathlib import Path
+
+
+def _tms_row(z, y):
+    return (1 << z) - 1 - y
+
+
+class MBTilesWriter:
+    """
+    Escrita em lote (uma transação por `write_many`) num arquivo novo.
+
+    Uso:
+        with MBTilesWriter("setores.mbtiles") as out:
+            out.write_many([(z, x, y, data), ...])
+            out.set_metadata(name="...", minzoom=8, maxzoom=14, ...)
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.path.exists():
+            self.path.unlink()
+        self.conn = sqlite3.connect(self.path)
+        self.conn.executescript("""
+            PRAGMA journal_mode = OFF;
+            PRAGMA synchronous = OFF;
+            CREATE TABLE metadata (name TEXT, value TEXT);
+            CREATE TABLE tiles (zoom_level INTEGER, tile_column INTEGER,
+                                tile_row INTEGER, tile_data BLOB);
+            CREATE UNIQUE INDEX tile_index ON tiles (zoom_level, tile_column, tile_row);
+        """)
+
+    def write_many(self, tiles):
+        """Grava tiles (z, x, y_xyz, dados) — dados já comprimidos."""
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO tiles VALUES (?, ?, ?, ?)",
+                ((z, x, _tms_row(z, y), data) for z, x, y, data in tiles),
+            )
+
+    def set_metadata(self, **values):
+        with self.conn:
+            self.conn.execute("DELETE FROM metadata")
+            self.conn.executemany(
+                "INSERT INTO metadata VALUES (?, ?)",
+                ((k, v if isinstance(v, str) else json.dumps(v) if isinstance(v, (dict, list))
+                  else str(v)) for k, v in values.items()),
+            )
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class MBTilesReader:
+    """Acesso somente-leitura; uma conexão compartilhada entre threads, protegida por lock."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+        self.lock = threading.Lock()
+
+    def metadata(self):
+        with self.lock:
+            return dict(self.conn.execute("SELECT name, value FROM metadata").fetchall())
+
+    def tile(self, z, x, y):
+        """Dados do tile (z, x, y) no esquema XYZ, ou None."""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT tile_data FROM tiles WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?",
+                (z, x, _tms_row(z, y)),
+            ).fetchone()
+        return row[0] if row else None
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,104 @@
+"""
+Distância dos setores de baixa renda às oportunidades da cidade (script 16).
+
+Para cada setor do 1º quintil de renda (Q1) de cada cidade:
+    - distância ao setor do 5º quintil (Q5) mais próximo, na mesma cidade;
+    - distância ao centroide da mancha urbana principal do município
+      (`common.urban_extents`, mesma regra da mancha usada nos mapas do script 10).
+As distâncias são entre centroides dos setores, em metros na projeção Albers do Brasil
+(`common.areal_weights.ALBERS_BR`), e saem em km. Os setores Q5 também recebem
+a distância ao centro, como referência para comparar Q1 × Q5 na mesma cidade.
+
+Implementação: os centroides são projetados uma única vez para todo o país; por cidade, um
+cKDTree (scipy) sobre os centroides Q5 responde a todos os Q1 numa só consulta. As cidades
+são agrupadas em lotes de até `BATCH_SECTORS` setores e os lotes vão para um pool de
+processos (`distances_batch`), de modo que milhares de municípios pequenos não viram
+milhares de tarefas.
+
+`distances_batch` fica aqui (e não no script) para que os processos o importem pelo nome do módulo.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Setores por lote enviado aos processos de trabalho
+BATCH_SECTORS = 200_000
+
+# Percentis da tabela por cidade
+PERCENTILES = [10, 25, 50, 75, 90]
+
+
+def city_distances(ids, xy, quintile, center):
+    """
+    Distâncias (m) de uma cidade. `xy` (n × 2) são os centroides projetados, `quintile` o
+    quintil de cada setor e `center` (x, y) o centroide da mancha principal (NaN se ausente).
+    Retorna (posições Q1/Q5, quintil, distância ao Q5 mais próximo, setor Q5 mais próximo,
+    distância ao centro); a distância ao Q5 só é preenchida para os Q1.
+    """
+    from scipy.spatial import cKDTree
+
+    rows = np.flatnonzero((quintile == 1) | (quintile == 5))
+    q1 = quintile[rows] == 1
+    d_q5 = np.full(len(rows), np.nan)
+    nearest = np.full(len(rows), None, dtype=object)
+    q5 = np.flatnonzero(quintile == 5)
+    if len(q5) and q1.any():
+        d, j = cKDTree(xy[q5]).query(xy[rows[q1]])
+        d_q5[q1] = d
+        nearest[q1] = ids[q5[j]]
+    d_center = np.hypot(xy[rows, 0] - center[0], xy[rows, 1] - center[1])
+    return rows, quintile[rows], d_q5, nearest, d_center
+
+
+def distances_batch(cities):
+    """
+    Tarefa dos processos de trabalho: `cities` = [(cidade, ids, xy, quintil, centro)].
+    Retorna a tabela por setor (Q1 e Q5) do lote.
+    """
+    cols = {c: [] for c in ('city', 'CD_SETOR', 'Quintil', 'dist_q5_km', 'setor_q5', 'dist_centro_km')}
+    for city, ids, xy, quintile, center in cities:
+        rows, q, d_q5, nearest, d_center = city_distances(ids, xy, quintile, center)
+        cols['city'].append(np.full(len(rows), city, dtype=object))
+        cols['CD_SETOR'].append(ids[rows])
+        cols['Quintil'].append(q)
+        cols['dist_q5_km'].append(d_q5 / 1000)
+        cols['setor_q5'].append(nearest)
+        cols['dist_centro_km'].append(d_center / 1000)
+    return pd.DataFrame({c: np.concatenate(v) if v else [] for c, v in cols.items()})
+
+
+def batches(sizes, limit=BATCH_SECTORS):
+    """Agrupa posições consecutivas de `sizes` em lotes com até `limit` setores (ao menos 1 cidade)."""
+    out, current, total = [], [], 0
+    for i, n in enumerate(sizes):
+        if current and total + n > limit:
+            out.append(current)
+            current, total = [], 0
+        current.append(i)
+        total += n
+    if current:
+        out.append(current)
+    return out
+
+
+def city_summary(sectors):
+    """
+    Distribuição por cidade: nº de setores Q1/Q5, média e percentis da distância Q1 → Q5 e
+    da distância ao centro (Q1 e, para comparação, Q5).
+    """
+    q1 = sectors[sectors['Quintil'] == 1]
+    q5 = sectors[sectors['Quintil'] == 5]
+    out = pd.DataFrame({
+        'n_q1': q1.groupby('city').size(),
+        'n_q5': q5.groupby('city').size(),
+    }).fillna(0).astype(int)
+    for label, frame, col in (('q1_q5', q1, 'dist_q5_km'), ('q1_centro', q1, 'dist_centro_km'),
+                              ('q5_centro', q5, 'dist_centro_km')):
+        grouped = frame.groupby('city')[col]
+        out[f'{label}_media_km'] = grouped.mean()
+        for p in PERCENTILES:
+            out[f'{label}_p{p}_km'] = grouped.quantile(p / 100)
+        out[f'{label}_max_km'] = grouped.max()
+    # > 1: os setores pobres ficam, na mediana, mais longe do centro que os ricos
+    out['razao_centro_q1_q5'] = out['q1_centro_p50_km'] / out['q5_centro_p50_km']
+    return out.rename_axis('city').reset_index()
@@ -0,0 +1,418 @@
+"""
+Orquestração dos scripts do pipeline como um grafo de etapas com cache por etapa
+(`pipelines/pipeline.py`).
+
+Cada etapa (`Stage`) declara o script, seus argumentos de linha de comando e os caminhos
+de entrada e saída. As dependências saem dos caminhos: uma etapa depende das que produzem
+algum dos seus `inputs`.
+
+Impressão digital da etapa = assinatura das entradas (tamanho + mtime, arquivos-irmãos de
+shapefiles e todos os arquivos de pastas, ver `common.figure_cache.file_signature`) +
+parâmetros + código (script e módulos de `common` importados por ele, transitivamente,
+lidos da árvore sintática: `from common.x import …`, `from common import x`, `import common.x`,
+também dentro de funções e em várias linhas).
+Etapas com a mesma impressão digital da última execução bem-sucedida e saídas presentes
+são puladas. A impressão digital é calculada quando a etapa fica pronta, depois das
+dependências, de modo que saídas regravadas propagam a re-execução.
+
+Cada etapa roda como script num subprocesso (`python <script> <argumentos>`, como na
+execução manual), com a saída em `<raiz>/logs/<etapa>.log`; etapas independentes rodam em
+paralelo (`jobs`).
+
+`Pipeline.chain` é a alternativa num só processo: os scripts são importados (`load_script`)
+e cada etapa recebe o resultado da anterior em memória (GeoDataFrame), sem gravar e reler
+os shapefiles intermediários; só as etapas pedidas como checkpoint gravam suas saídas.
+"""
+
+import ast
+import hashlib
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+from common import profiling
+from common.figure_cache import file_signature
+
+COMMON_DIR = Path(__file__).resolve().parent
+
+
+class Stage:
+    """Etapa do pipeline: script, argumentos e caminhos de entrada/saída."""
+
+    def __init__(self, name, script, argv=(), inputs=(), outputs=()):
+        self.name = name
+        self.script = Path(script)
+        self.argv = [str(a) for a in argv]
+        self.inputs = [str(p) for p in inputs]
+        self.outputs = [str(p) for p in outputs]
+
+    def command(self):
+        return [sys.executable, str(self.script)] + self.argv
+
+
+def common_imports(path):
+    """Nomes dos módulos de `common` importados em qualquer ponto de um arquivo."""
+    modules = set()
+    for node in ast.walk(ast.parse(Path(path).read_text(encoding='utf-8'), filename=str(path))):
+        if isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            if node.module == 'common':
+                modules.update(alias.name for alias in node.names)
+            elif node.module.startswith('common.'):
+                modules.add(node.module.split('.')[1])
+        elif isinstance(node, ast.Import):
+            modules.update(alias.name.split('.')[1] for alias in node.names
+                           if alias.name.startswith('common.'))
+    return modules
+
+
+def code_dependencies(script):
+    """Script + módulos de `common` que ele importa (transitivamente), em ordem estável."""
+    seen, pending = [], [Path(script).resolve()]
+    while pending:
+        path = pending.pop()
+        if path in seen or not path.exists():
+            continue
+        seen.append(path)
+        pending.extend(COMMON_DIR / f"{m}.py" for m in common_imports(path))
+    return [seen[0]] + sorted(seen[1:])
+
+
+def imported_common_modules(script):
+    """
+    Módulos de `common` efetivamente carregados ao importar o script (num subprocesso, sem
+    executar o bloco `__main__`). Serve de conferência para `code_dependencies`: todo módulo
+    carregado tem de estar entre as dependências declaradas na impressão digital.
+    """
+    probe = (
+        "import importlib.util, sys; sys.path.insert(0, sys.argv[2]); "
+        "spec = importlib.util.spec_from_file_location('stage_probe', sys.argv[1]); "
+        "spec.loader.exec_module(importlib.util.module_from_spec(spec)); "
+        "print('\\n'.join(m.split('.')[1] for m in sys.modules if m.startswith('common.')))"
+    )
+    env = dict(os.environ, MPLBACKEND='Agg', PYTHONIOENCODING='utf-8')
+    out = subprocess.run([sys.executable, "-c", probe, str(script), str(COMMON_DIR.parent)],
+                         capture_output=True, text=True, env=env, check=True).stdout
+    return {m for m in out.split() if (COMMON_DIR / f"{m}.py").exists()}
+
+
+def check_code_dependencies(script):
+    """Módulos de `common` carregados pelo script e ausentes de `code_dependencies` (vazio = ok)."""
+    declared = {p.stem for p in code_dependencies(script)[1:]}
+    return sorted(imported_common_modules(script) - declared)
+
+
+def path_signature(paths):
+    """Assinatura barata de arquivos e pastas (pastas: todos os arquivos, recursivamente)."""
+    sig = []
+    for p in map(Path, paths):
+        if p.is_dir():
+            files = sorted(f for f in p.rglob('*') if f.is_file())
+            sig.append([str(p), [[str(f.relative_to(p)), f.stat().st_size, f.stat().st_mtime_ns] for f in files]])
+        else:
+            sig.append([str(p), file_signature(p)])
+    return sig
+
+
+def load_script(script):
+    """
+    Importa um script numerado (ex.: `09_select_quintiles_q1_q5.py`) como módulo, sem executar
+    o bloco `__main__`. O módulo fica em `sys.modules` como `stage_<arquivo>`.
+    """
+    import importlib.util
+
+    path = Path(script).resolve()
+    name = 'stage_' + re.sub(r'\W', '_', path.stem)
+    if name not in sys.modules:
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        try:
+            spec.loader.exec_module(module)
+        except BaseException:
+            del sys.modules[name]
+            raise
+    return sys.modules[name]
+
+
+def fingerprint(stage):
+    h = hashlib.sha256()
+    h.update(json.dumps(path_signature(stage.inputs), default=str).encode('utf-8'))
+    h.update(json.dumps(stage.argv).encode('utf-8'))
+    for path in code_dependencies(stage.script):
+        h.update(path.read_bytes())
+    return h.hexdigest()
+
+
+class Pipeline:
+    """
+    Grafo de etapas com estado persistido em `<root>/.pipeline_state.json`.
+
+    Uso:
+        pipe = Pipeline(stages, root="outputs")
+        pipe.run(["10_maps"], jobs=4)       # etapa 10 e tudo de que ela depende
+    """
+
+    def __init__(self, stages, root):
+        self.stages = {s.name: s for s in stages}
+        self.root = Path(root)
+        self.state_path = self.root / ".pipeline_state.json"
+        self.log_dir = self.root / "logs"
+        self.producers = {}
+        for s in stages:
+            for out in s.outputs:
+                self.producers[os.path.normpath(out)] = s.name
+        self.deps = {
+            s.name: sorted({self.producers[os.path.normpath(i)] for i in s.inputs
+                            if os.path.normpath(i) in self.producers} - {s.name})
+            for s in stages
+        }
+
+    def state(self):
+        if self.state_path.exists():
+            try:
+                return json.loads(self.state_path.read_text(encoding='utf-8'))
+            except (OSError, ValueError):
+                print(f"[!] Estado do pipeline ilegível, será recriado: {self.state_path}")
+        return {}
+
+    def _save_state(self, state):
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.state_path.with_suffix('.tmp')
+        tmp.write_text(json.dumps(state, indent=2, sort_keys=True), encoding='utf-8')
+        os.replace(tmp, self.state_path)
+
+    def closure(self, targets=None):
+        """
+        Etapas necessárias para `targets` em ordem topológica. Sem `targets`: todas as que
+        podem ser executadas ou já têm saídas (sem os dados brutos, 01–02 ficam de fora).
+        """
+        wanted = set(targets or [n for n in self.stages if self.is_buildable(n) or self.is_provided(n)])
+        unknown = wanted - set(self.stages)
+        if unknown:
+            raise KeyError(f"Etapas desconhecidas: {sorted(unknown)} (disponíveis: {list(self.stages)})")
+        pending = list(wanted)
+        while pending:
+            name = pending.pop()
+            if self.is_provided(name):
+                continue
+            for d in self.deps[name]:
+                if d not in wanted:
+                    wanted.add(d)
+                    pending.append(d)
+        order, done = [], set()
+        while len(order) < len(wanted):
+            ready = [n for n in self.stages if n in wanted and n not in done
+                     and all(d in done or d not in wanted for d in self.deps[n])]
+            if not ready:
+                raise ValueError("Ciclo entre as etapas: " + ", ".join(sorted(wanted - done)))
+            order += ready
+            done.update(ready)
+        return order
+
+    def is_fresh(self, name, state, fp=None):
+        stage = self.stages[name]
+        if not all(Path(p).exists() for p in stage.outputs):
+            return False
+        if self.is_provided(name):
+            return True
+        return state.get(name, {}).get('fingerprint') == (fp or fingerprint(stage))
+
+    def is_buildable(self, name):
+        """Todas as entradas existem ou podem ser produzidas por etapas executáveis."""
+        for p in self.stages[name].inputs:
+            if Path(p).exists():
+                continue
+            producer = self.producers.get(os.path.normpath(p))
+            if producer is None or producer == name or not self.is_buildable(producer):
+                return False
+        return True
+
+    def is_provided(self, name):
+        """
+        Etapa que não pode ser executada (faltam dados brutos) mas cujas saídas existem (ex.:
+        só a base consolidada das cidades médias, sem os insumos de 01–03): as saídas são usadas
+        como estão e as dependências da etapa não são consultadas.
+        """
+        return (all(Path(p).exists() for p in self.stages[name].outputs)
+                and not self.is_buildable(name))
+
+    def status(self, targets=None):
+        """[(etapa, situação)] sem executar: 'ok', 'fornecida', 'desatualizada' ou 'dependência'."""
+        state, stale, out = self.state(), set(), []
+        for name in self.closure(targets):
+            if self.is_provided(name):
+                out.append((name, 'fornecida'))
+            elif any(d in stale for d in self.deps[name]):
+                stale.add(name)
+                out.append((name, 'dependência'))
+            elif self.is_fresh(name, state):
+                out.append((name, 'ok'))
+            else:
+                stale.add(name)
+                out.append((name, 'desatualizada'))
+        return out
+
+    def _launch(self, name, profile=None):
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        log_path = self.log_dir / f"{name}.log"
+        env = dict(os.environ, MPLBACKEND='Agg', PYTHONIOENCODING='utf-8')
+        if profile:
+            env[profiling.ENV_VAR] = str(profile)
+        t0 = time.perf_counter()
+        with open(log_path, 'w', encoding='utf-8') as log:
+            code = subprocess.run(self.stages[name].command(), stdout=log, stderr=subprocess.STDOUT, env=env).returncode
+        return code, time.perf_counter() - t0
+
+    def run(self, targets=None, jobs=1, force=False, profile=None):
+        """
+        Executa as etapas desatualizadas de `targets` (e dependências). `force=True` refaz as
+        etapas pedidas (as dependências continuam sujeitas ao cache). Com `profile` (pasta),
+        cada etapa executada grava lá seu relatório de passos (`common.profiling`). Retorna
+        {etapa: (situação, segundos)} e imprime o resumo de tempos.
+        """
+        order = self.closure(targets)
+        forced = set(targets or self.stages) if force else set()
+        state = self.state()
+        result, running, pending = {}, {}, {}
+        t_start = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+            while len(result) < len(order):
+                for name in order:
+                    if name in result or name in running.values():
+                        continue
+                    deps = [d for d in self.deps[name] if d in order]
+                    if self.is_provided(name):
+                        result[name] = ('fornecida', 0.0)
+                        print(f"✔ {name}: entradas ausentes, usando as saídas existentes")
+                        continue
+                    if any(result.get(d, ('',))[0] in ('falhou', 'bloqueada') for d in deps):
+                        result[name] = ('bloqueada', 0.0)
+                        print(f"⏭️  {name}: bloqueada (dependência falhou)")
+                        continue
+                    if not all(d in result for d in deps):
+                        continue
+                    if not self.is_buildable(name):
+                        missing = [p for p in self.stages[name].inputs if not Path(p).exists()]
+                        result[name] = ('falhou', 0.0)
+                        print(f"❌ {name}: entradas ausentes: {', '.join(missing)}")
+                        continue
+                    fp = fingerprint(self.stages[name])
+                    if name not in forced and self.is_fresh(name, state, fp):
+                        result[name] = ('em cache', 0.0)
+                        print(f"✔ {name}: atualizada (cache)")
+                        continue
+                    print(f"▶️  {name}: executando…")
+                    running[pool.submit(self._launch, name, profile)] = name
+                    pending[name] = fp
+
+                if not running:
+                    continue
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for fut in done:
+                    name = running.pop(fut)
+                    code, seconds = fut.result()
+                    entry = state.setdefault(name, {})
+                    if code == 0:
+                        entry.update(fingerprint=pending.pop(name), seconds=round(seconds, 2),
+                                     finished=time.strftime('%Y-%m-%d %H:%M:%S'))
+                        result[name] = ('executada', seconds)
+                        print(f"✅ {name}: concluída em {seconds:.1f} s")
+                    else:
+                        entry.pop('fingerprint', None)
+                        result[name] = ('falhou', seconds)
+                        print(f"❌ {name}: falhou (código {code}) — log: {self.log_dir / (name + '.log')}")
+                        _print_tail(self.log_dir / f"{name}.log")
+                    self._save_state(state)
+
+        _print_timings(order, result, time.perf_counter() - t_start)
+        return result
+
+    def chain(self, calls, targets=None, checkpoints=()):
+        """
+        Executa as etapas de `targets` (e dependências) em sequência neste processo, passando
+        os resultados em memória. `calls[etapa] = (função, gravar)`: `função(resultados)` recebe
+        {etapa: resultado} das etapas anteriores; `gravar(resultado)` grava as saídas da etapa
+        e só é chamada para as etapas em `checkpoints` (None = a própria função já grava, como
+        nas etapas de gráficos e tabelas). Etapas fornecidas são lidas do disco uma única vez.
+
+        Sem cache: todas as etapas rodam. As que só leram dados em disco têm a impressão
+        digital registrada, como em `run`; as que receberam dados não gravados perdem a sua.
+        Resultados são descartados assim que nenhuma etapa seguinte precisa deles. Com a
+        instrumentação ativa, cada etapa é um passo e os passos internos ficam sob ele
+        (ex.: `03_select/dissolve`).
+        """
+        from common.schema import read_sectors
+
+        order = self.closure(targets)
+        unknown = set(checkpoints) - set(self.stages)
+        if unknown:
+            raise KeyError(f"Etapas desconhecidas: {sorted(unknown)} (disponíveis: {list(self.stages)})")
+        deps = {n: [d for d in self.deps[n] if d in order] for n in order}
+        consumers = {n: sum(n in deps[m] for m in order) for n in order}
+        state = self.state()
+        values, result, on_disk = {}, {}, set()
+        t_start = time.perf_counter()
+
+        for name in order:
+            stage = self.stages[name]
+            t0 = time.perf_counter()
+            if self.is_provided(name):
+                print(f"✔ {name}: entradas ausentes, lendo as saídas existentes")
+                values[name] = read_sectors(stage.outputs[0])
+                on_disk.add(name)
+                result[name] = ('fornecida', time.perf_counter() - t0)
+                continue
+            if not self.is_buildable(name):
+                missing = [p for p in stage.inputs if not Path(p).exists()]
+                raise FileNotFoundError(f"{name}: entradas ausentes: {', '.join(missing)}")
+
+            fp = fingerprint(stage) if all(d in on_disk for d in deps[name]) else None
+            call, save = calls[name]
+            print(f"▶️  {name}: executando (em memória)…")
+            with profiling.span(name):
+                values[name] = call(values)
+            if save is None or name in checkpoints:
+                if save is not None:
+                    save(values[name])
+                    print(f"💾 {name}: checkpoint gravado em {', '.join(stage.outputs)}")
+                on_disk.add(name)
+            seconds = time.perf_counter() - t0
+            if fp is not None and name in on_disk:
+                state[name] = {'fingerprint': fp, 'seconds': round(seconds, 2),
+                               'finished': time.strftime('%Y-%m-%d %H:%M:%S')}
+            elif name in on_disk:
+                state.pop(name, None)
+            self._save_state(state)
+            result[name] = ('executada', seconds)
+            print(f"✅ {name}: concluída em {seconds:.1f} s")
+
+            for d in deps[name]:
+                consumers[d] -= 1
+            for d in deps[name] + [name]:
+                if consumers[d] == 0:
+                    values.pop(d, None)
+
+        _print_timings(order, result, time.perf_counter() - t_start)
+        return result
+
+
+def _print_timings(order, result, total):
+    print(f"\n⏱️ Tempos por etapa (total {total:.1f} s):")
+    for name in order:
+        status, seconds = result[name]
+        print(f"   {name:<28} {status:<12} {seconds:8.1f} s")
+
+
+def _print_tail(path, n=15):
+    try:
+        lines = Path(path).read_text(encoding='utf-8', errors='replace').splitlines()
+    except OSError:
+        return
+    for line in lines[-n:]:
+        print(f"      {line}")
@@ -0,0 +1,325 @@
+"""
+Instrumentação das etapas do pipeline: tempo, memória (RSS) e contagens de linhas por passo.
+
+Uso nos scripts:
+    from common import profiling
+    from common.profiling import span
+
+    with span('read', path=input_shp) as s:
+        data = read_sectors(input_shp)
+        s.count(rows_out=len(data))
+
+Passos com os nomes padronizados (`STEPS`: read, repair, reproject, overlay, dissolve,
+contiguity, aggregate, render, write) podem ser aninhados; o relatório guarda o caminho
+completo (ex.: `render/region`).
+
+Ativação:
+    - variável de ambiente `PIPELINE_PROFILE=<pasta>` (ou `1` → `DEFAULT_DIR`), herdada
+      pelas etapas lançadas por `pipeline.py run`;
+    - opção `--profile [PASTA]` dos scripts (`add_profile_argument` + `setup`).
+Ao final do processo são gravados, na pasta, `<script>_<data-hora>.json` (metadados + passos),
+`.csv` (um passo por linha) e `.trace.json` (formato Chrome trace: chrome://tracing ou
+https://ui.perfetto.dev).
+
+Desativado, `span` devolve sempre o mesmo objeto nulo (sem relógio, sem leitura de memória):
+o custo é o de uma chamada de função por passo.
+
+Memória: RSS do processo no início e no fim de cada passo e o pico durante o passo, medido
+por uma thread que amostra o RSS a cada `SAMPLE_INTERVAL` s enquanto há passos abertos e
+complementado pelo máximo histórico do SO (`ru_maxrss`) quando ele cresce dentro do passo.
+O RSS vem de `psutil` (se instalado), de `/proc/self/statm` (Linux) ou, sem nenhum dos dois,
+só do máximo histórico.
+"""
+
+import atexit
+import csv
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+ENV_VAR = 'PIPELINE_PROFILE'
+DEFAULT_DIR = 'outputs/profile'
+
+STEPS = ('read', 'repair', 'reproject', 'overlay', 'dissolve', 'contiguity', 'aggregate', 'render', 'write')
+
+SAMPLE_INTERVAL = 0.02
+
+MB = 1024 * 1024
+
+
+# -----------------------------------------------------------------------------
+# Memória do processo
+# -----------------------------------------------------------------------------
+def _rss_reader():
+    try:
+        import psutil
+
+        proc = psutil.Process()
+        return lambda: proc.memory_info().rss
+    except ImportError:
+        pass
+    if os.path.exists('/proc/self/statm'):
+        page = os.sysconf('SC_PAGE_SIZE')
+
+        def statm():
+            with open('/proc/self/statm', 'rb') as f:
+                return int(f.read().split()[1]) * page
+        return statm
+    return None
+
+
+def _max_rss():
+    """Máximo histórico do RSS do processo (bytes) ou None sem o módulo `resource`."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+# -----------------------------------------------------------------------------
+# Passos
+# -----------------------------------------------------------------------------
+class _NullSpan:
+    """Passo com a instrumentação desativada: tudo é no-op."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def count(self, **counts):
+        pass
+
+
+_NULL = _NullSpan()
+
+
+class Span:
+    """Passo instrumentado (criado por `span` quando o profiler está ativo)."""
+
+    def __init__(self, profiler, name, attrs):
+        self.profiler = profiler
+        self.name = name
+        self.attrs = attrs
+        self.counts = {}
+        self.path = None
+        self.start = self.end = None
+        self.rss_start = self.rss_end = self.rss_peak = None
+
+    def count(self, **counts):
+        """Registra contagens do passo (ex.: `rows_in=`, `rows_out=`, `features=`)."""
+        self.counts.update({k: int(v) for k, v in counts.items()})
+
+    def __enter__(self):
+        self.profiler._open(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.profiler._close(self, failed=exc_type is not None)
+        return False
+
+    def record(self):
+        mb = lambda b: None if b is None else round(b / MB, 1)
+        return {
+            'step': self.path, 'name': self.name,
+            'start_s': round(self.start - self.profiler.t0, 4),
+            'duration_s': round(self.end - self.start, 4),
+            'rss_start_mb': mb(self.rss_start), 'rss_end_mb': mb(self.rss_end),
+            'rss_peak_mb': mb(self.rss_peak),
+            'rows_in': self.counts.get('rows_in'), 'rows_out': self.counts.get('rows_out'),
+            'counts': {k: v for k, v in self.counts.items() if k not in ('rows_in', 'rows_out')},
+            'attrs': self.attrs,
+            'thread': self._thread,
+        }
+
+
+class Profiler:
+    """Coleta os passos de um processo e grava o relatório em `output_dir`."""
+
+    def __init__(self, output_dir, name=None):
+        self.output_dir = Path(output_dir)
+        self.name = name or Path(sys.argv[0] or 'python').stem or 'python'
+        self.t0 = time.perf_counter()
+        self.started = time.strftime('%Y-%m-%dT%H:%M:%S')
+        self.spans = []
+        self._open_spans = {}          # thread → pilha de passos abertos
+        self._lock = threading.Lock()
+        self._read_rss = _rss_reader()
+        self._stop = threading.Event()
+        self._sampler = None
+
+    # Amostragem do RSS -----------------------------------------------------
+    def _rss(self):
+        return self._read_rss() if self._read_rss else None
+
+    def _sample(self):
+        while not self._stop.wait(SAMPLE_INTERVAL):
+            rss = self._rss()
+            if rss is None:
+                return
+            with self._lock:
+                for stack in self._open_spans.values():
+                    for s in stack:
+                        if s.rss_peak is None or rss > s.rss_peak:
+                            s.rss_peak = rss
+
+    def _ensure_sampler(self):
+        if self._sampler is None and self._read_rss is not None:
+            self._sampler = threading.Thread(target=self._sample, name='profiling-rss', daemon=True)
+            self._sampler.start()
+
+    # Abertura e fechamento de passos --------------------------------------
+    def _open(self, s):
+        tid = threading.get_ident()
+        s._thread = threading.current_thread().name
+        s._max_rss_start = _max_rss()
+        s.rss_start = s.rss_peak = self._rss()
+        with self._lock:
+            stack = self._open_spans.setdefault(tid, [])
+            s.path = '/'.join([p.name for p in stack] + [s.name])
+            stack.append(s)
+        self._ensure_sampler()
+        s.start = time.perf_counter()
+
+    def _close(self, s, failed=False):
+        s.end = time.perf_counter()
+        s.rss_end = self._rss()
+        max_end = _max_rss()
+        peaks = [v for v in (s.rss_peak, s.rss_end) if v is not None]
+        if max_end is not None and s._max_rss_start is not None and max_end > s._max_rss_start:
+            peaks.append(max_end)      # o máximo histórico subiu dentro do passo
+        s.rss_peak = max(peaks) if peaks else None
+        if failed:
+            s.attrs = dict(s.attrs, failed=True)
+        with self._lock:
+            stack = self._open_spans.get(threading.get_ident(), [])
+            if s in stack:
+                stack.remove(s)
+            self.spans.append(s)
+
+    # Relatório -------------------------------------------------------------
+    def report(self):
+        total = time.perf_counter() - self.t0
+        peak = _max_rss()
+        return {
+            'script': self.name, 'argv': sys.argv, 'python': sys.version.split()[0],
+            'pid': os.getpid(), 'started': self.started, 'total_s': round(total, 3),
+            'peak_rss_mb': None if peak is None else round(peak / MB, 1),
+            'steps': [s.record() for s in sorted(self.spans, key=lambda s: s.start)],
+        }
+
+    def write(self):
+        """Grava JSON, CSV e Chrome trace; retorna o caminho do JSON."""
+        report = self.report()
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        stem = self.output_dir / f"{self.name}_{self.started.replace(':', '').replace('-', '')}_{os.getpid()}"
+
+        json_path = stem.with_suffix('.json')
+        json_path.write_text(json.dumps(report, indent=2, ensure_ascii=False, default=str), encoding='utf-8')
+
+        fields = ['step', 'start_s', 'duration_s', 'rss_start_mb', 'rss_end_mb', 'rss_peak_mb',
+                  'rows_in', 'rows_out', 'counts', 'attrs']
+        with open(stem.with_suffix('.csv'), 'w', newline='', encoding='utf-8') as f:
+            w = csv.DictWriter(f, fieldnames=['script'] + fields)
+            w.writeheader()
+            for step in report['steps']:
+                row = {k: step[k] for k in fields}
+                row['counts'] = json.dumps(step['counts'], ensure_ascii=False) if step['counts'] else ''
+                row['attrs'] = json.dumps(step['attrs'], ensure_ascii=False, default=str) if step['attrs'] else ''
+                w.writerow(dict(row, script=self.name))
+
+        events = [{'name': 'process_name', 'ph': 'M', 'pid': report['pid'], 'args': {'name': self.name}}]
+        for step in report['steps']:
+            events.append({
+                'name': step['name'], 'cat': step['step'].split('/')[0], 'ph': 'X',
+                'ts': round(step['start_s'] * 1e6), 'dur': round(step['duration_s'] * 1e6),
+                'pid': report['pid'], 'tid': step['thread'],
+                'args': {k: step[k] for k in ('rss_peak_mb', 'rows_in', 'rows_out') if step[k] is not None}
+                        | step['counts'] | {k: str(v) for k, v in step['attrs'].items()},
+            })
+        stem.with_suffix('.trace.json').write_text(json.dumps({'traceEvents': events}), encoding='utf-8')
+        return json_path
+
+    def close(self):
+        self._stop.set()
+        if self.spans:
+            path = self.write()
+            print(f"⏱️ Relatório de desempenho: {path}")
+
+
+# -----------------------------------------------------------------------------
+# API do módulo
+# -----------------------------------------------------------------------------
+_PROFILER = None
+
+
+def enabled():
+    return _PROFILER is not None
+
+
+def enable(output_dir=DEFAULT_DIR, name=None):
+    """Ativa a instrumentação neste processo; o relatório é gravado na saída do processo."""
+    global _PROFILER
+    if _PROFILER is None:
+        _PROFILER = Profiler(output_dir, name)
+        atexit.register(_PROFILER.close)
+    return _PROFILER
+
+
+def span(name, **attrs):
+    """Context manager de um passo (`with span('overlay', rows_in=n) as s: …; s.count(rows_out=m)`)."""
+    if _PROFILER is None:
+        return _NULL
+    counts = {k: attrs.pop(k) for k in ('rows_in', 'rows_out') if k in attrs}
+    s = Span(_PROFILER, name, {k: str(v) if isinstance(v, Path) else v for k, v in attrs.items()})
+    if counts:
+        s.count(**counts)
+    return s
+
+
+def timed(name, **attrs):
+    """Decorador: cada chamada da função é um passo `name` (verificado na chamada, não na importação)."""
+    import functools
+
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _PROFILER is None:
+                return func(*args, **kwargs)
+            with span(name, function=func.__name__, **attrs):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def add_profile_argument(ap):
+    """Acrescenta `--profile [PASTA]` a um ArgumentParser."""
+    ap.add_argument("--profile", nargs="?", const=DEFAULT_DIR, default=None, metavar="PASTA",
+                    help=f"Grava relatório de tempos/memória por passo (padrão: {DEFAULT_DIR}; "
+                         f"ou variável {ENV_VAR}).")
+    return ap
+
+
+def setup(args=None):
+    """Ativa a instrumentação se `args.profile` foi informado (a variável de ambiente já foi lida)."""
+    if args is not None and getattr(args, 'profile', None):
+        enable(args.profile)
+    return enabled()
+
+
+def _from_environment():
+    value = os.environ.get(ENV_VAR, '').strip()
+    if value and value.lower() not in ('0', 'false', 'no'):
+        enable(DEFAULT_DIR if value.lower() in ('1', 'true', 'yes') else value)
+
+
+_from_environment()
+
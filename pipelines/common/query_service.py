@@ -0,0 +1,296 @@
+"""
+Serviço HTTP local, somente leitura, de consultas agregadas sobre a base de setores das
+cidades médias (participação por raça e quintil, acesso à infraestrutura, correlações).
+
+A base é lida uma única vez (sem geometria) para um `IndicatorStore`: um DataFrame colunar
+com as contagens por raça, a população com acesso a cada infraestrutura já multiplicada
+(v0001 · P/100, como no script 06) e índices valor → linhas para região, UF e município.
+Cada consulta filtra as linhas pelo índice e responde com um groupby vetorizado; a resposta
+(JSON já codificado) fica num cache LRU limitado, indexado pela rota e pelos parâmetros.
+
+Rotas (GET; parâmetros opcionais `level` = nacional | regiao | uf | municipio, padrão
+municipio, e os filtros `regiao`, `uf`, `municipio`, com os nomes como estão na base):
+    /                → lista das rotas
+    /summary         → setores, população, renda (média e mediana), % por raça, % com acesso
+    /participation   → participação (%) de cada raça em cada quintil, no total do grupo (script 08)
+    /infrastructure  → por quintil: população, composição racial (%) e % com acesso (script 06)
+    /correlation     → Pearson/Spearman e OLS RpC_2010 × (% raças, infraestrutura) (script 11)
+    /metrics         → latência por rota (média, p50, p95, máx.) e taxa de acerto do cache
+Exemplo: /participation?level=municipio&regiao=Nordeste
+
+Os quintis são os da base (`Quintil`) ou, na falta dela, calculados na carga com a mesma
+regra do script 09. Apenas para uso local (sem autenticação), como `common/tile_server.py`.
+"""
+
+import functools
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from common.correlation_stats import INFRA, LEVELS, RACES, correlation_table, race_percentages
+
+# Filtro da consulta → coluna da base
+FILTERS = {'regiao': 'NM_REGIAO', 'uf': 'NM_UF', 'municipio': 'NM_MUN'}
+
+DEFAULT_LEVEL = 'municipio'
+
+# Respostas mantidas no cache LRU
+CACHE_SIZE = 256
+
+# Latências recentes guardadas por rota (percentis do /metrics)
+LATENCY_WINDOW = 1000
+
+
+# -----------------------------------------------------------------------------
+# Base em memória
+# -----------------------------------------------------------------------------
+class IndicatorStore:
+    """
+    Base de setores em memória para consultas agregadas.
+
+    Uso:
+        store = IndicatorStore.load("outputs/00_build_base/cidades_medias/Cidades_Medias_Variaveis.parquet")
+        df = store.select(regiao='Nordeste', uf='Bahia')     # linhas filtradas pelo índice
+    """
+
+    def __init__(self, df):
+        df = df.reset_index(drop=True)
+        self.races = [c for c in RACES if c in df.columns]
+        self.infra = [c for c in INFRA if c in df.columns]
+        counts = df[self.races].astype('float64')
+        pop = df['v0001'].astype('float64') if 'v0001' in df.columns else counts.sum(axis=1)
+        frame = {c: df[c].astype('category') for c in FILTERS.values() if c in df.columns}
+        frame['RpC_2010'] = pd.to_numeric(df['RpC_2010'], errors='coerce').astype('float64')
+        frame['Quintil'] = df['Quintil'].astype('Int8')
+        frame['pop'] = pop
+        frame.update({c: counts[c] for c in self.races})
+        frame.update({c: df[c].astype('float64') for c in self.infra})
+        frame.update({f'acc_{c}': pop * df[c].astype('float64') / 100 for c in self.infra})
+        self.frame = pd.DataFrame(frame)
+        self._rows = {col: self.frame.groupby(col, observed=True).indices for col in FILTERS.values()
+                      if col in self.frame.columns}
+
+    def __len__(self):
+        return len(self.frame)
+
+    @classmethod
+    def load(cls, path):
+        """Lê a base (shapefile/GeoParquet ou em memória) só com as colunas usadas nas consultas."""
+        from common.schema import read_sectors, sector_columns
+
+        wanted = list(FILTERS.values()) + ['RpC_2010', 'Quintil', 'v0001', 'CD_MUN'] + RACES + INFRA
+        available = set(sector_columns(path))
+        df = read_sectors(path, columns=[c for c in wanted if c in available], ignore_geometry=True)
+        if 'Quintil' not in df.columns:
+            from common.classify import classify
+
+            df['RpC_2010'] = pd.to_numeric(df['RpC_2010'], errors='coerce')
+            df['Quintil'] = classify(df, 'RpC_2010', k=5, method='quantiles', group_by='municipio')
+        return cls(df)
+
+    def select(self, **filters):
+        """Linhas com os valores pedidos (`regiao`, `uf`, `municipio`; em conjunção)."""
+        rows = None
+        for key, value in filters.items():
+            if key not in FILTERS:
+                raise ValueError(f"Filtro desconhecido: {key!r} (use {', '.join(FILTERS)})")
+            index = self._rows.get(FILTERS[key], {})
+            found = index.get(value, np.empty(0, dtype='int64'))
+            rows = found if rows is None else np.intersect1d(rows, found, assume_unique=True)
+        return self.frame if rows is None else self.frame.take(rows)
+
+
+# -----------------------------------------------------------------------------
+# Consultas (um groupby por resposta)
+# -----------------------------------------------------------------------------
+def _by(df, level, quintile=False):
+    """Chaves do groupby da escala `level` (+ Quintil)."""
+    cols = LEVELS[level]
+    by = list(cols) if cols else [pd.Series('Brasil', index=df.index, name='nacional')]
+    return by + (['Quintil'] if quintile else [])
+
+
+def summary(store, df, level):
+    grouped = df.groupby(_by(df, level), observed=True, sort=True)
+    sums = grouped[['pop'] + store.races + [f'acc_{c}' for c in store.infra]].sum()
+    out = pd.DataFrame({
+        'setores': grouped.size(), 'populacao': sums['pop'],
+        'RpC_media': grouped['RpC_2010'].mean(), 'RpC_mediana': grouped['RpC_2010'].median(),
+    })
+    race_total = sums[store.races].sum(axis=1)
+    for c in store.races:
+        out[f'P_{c}'] = sums[c] / race_total * 100
+    for c in store.infra:
+        out[c] = sums[f'acc_{c}'] / sums['pop'] * 100
+    return out.reset_index()
+
+
+def participation(store, df, level):
+    by = _by(df, level, quintile=True)
+    sums = df.groupby(by, observed=True, sort=True)[store.races].sum()
+    # total de cada raça no grupo (todos os quintis)
+    totals = sums.groupby(level=list(range(len(by) - 1)), observed=True).transform('sum')
+    return (sums / totals * 100).reset_index()
+
+
+def infrastructure(store, df, level):
+    grouped = df.groupby(_by(df, level, quintile=True), observed=True, sort=True)
+    sums = grouped[['pop'] + store.races + [f'acc_{c}' for c in store.infra]].sum()
+    out = pd.DataFrame({'setores': grouped.size(), 'populacao': sums['pop']})
+    race_total = sums[store.races].sum(axis=1)
+    for c in store.races:
+        out[f'perc_{c}'] = sums[c] / race_total * 100
+    for c in store.infra:
+        out[c] = sums[f'acc_{c}'] / sums['pop'] * 100
+    return out.reset_index()
+
+
+def correlation(store, df, level):
+    cols = [c for c in (LEVELS[level] or []) if c in df.columns]
+    stats_input = pd.concat([df[['RpC_2010'] + cols + store.infra], race_percentages(df, store.races)], axis=1)
+    return correlation_table(stats_input, variables=store.races + store.infra, levels={level: LEVELS[level]})
+
+
+QUERIES = {
+    'summary': summary,
+    'participation': participation,
+    'infrastructure': infrastructure,
+    'correlation': correlation,
+}
+
+
+# -----------------------------------------------------------------------------
+# Métricas
+# -----------------------------------------------------------------------------
+class Metrics:
+    """Contagem, erros e latências recentes por rota (seguro entre threads)."""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.started = time.time()
+        self.window = window
+        self._lock = threading.Lock()
+        self._routes = {}
+
+    def record(self, route, seconds, ok=True):
+        with self._lock:
+            r = self._routes.setdefault(route, {'count': 0, 'errors': 0, 'total_s': 0.0,
+                                                'recent': deque(maxlen=self.window)})
+            r['count'] += 1
+            r['errors'] += not ok
+            r['total_s'] += seconds
+            r['recent'].append(seconds)
+
+    def snapshot(self):
+        with self._lock:
+            routes = {}
+            for route, r in sorted(self._routes.items()):
+                recent = np.asarray(r['recent']) * 1000
+                routes[route] = {
+                    'count': r['count'], 'errors': r['errors'],
+                    'mean_ms': round(r['total_s'] * 1000 / r['count'], 3),
+                    'p50_ms': round(float(np.percentile(recent, 50)), 3),
+                    'p95_ms': round(float(np.percentile(recent, 95)), 3),
+                    'max_ms': round(float(recent.max()), 3),
+                }
+        return {'uptime_s': round(time.time() - self.started, 1), 'routes': routes}
+
+
+# -----------------------------------------------------------------------------
+# Serviço
+# -----------------------------------------------------------------------------
+def _encode(obj):
+    return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+
+class QueryService:
+    """
+    Respostas das rotas de `QUERIES` com cache LRU (`functools.lru_cache`, chave = rota +
+    parâmetros ordenados). Consultas inválidas levantam ValueError e não entram no cache.
+    """
+
+    def __init__(self, store, cache_size=CACHE_SIZE):
+        self.store = store
+        self.metrics = Metrics()
+        self._answer = functools.lru_cache(maxsize=cache_size)(self._compute)
+
+    def _compute(self, route, params):
+        params = dict(params)
+        level = params.pop('level', DEFAULT_LEVEL)
+        if level not in LEVELS:
+            raise ValueError(f"level deve ser um de {', '.join(LEVELS)}: {level!r}")
+        table = QUERIES[route](self.store, self.store.select(**params), level)
+        rows = table.to_json(orient='records', force_ascii=False, double_precision=6)
+        head = _encode({'route': route, 'level': level, 'filters': params, 'n': len(table)})
+        return head[:-1] + b', "rows": ' + rows.encode('utf-8') + b'}'
+
+    def query(self, route, params):
+        """(status HTTP, corpo JSON) da rota com os parâmetros `params` (dict)."""
+        t0 = time.perf_counter()
+        ok = True
+        try:
+            return 200, self._answer(route, tuple(sorted(params.items())))
+        except ValueError as exc:
+            ok = False
+            return 400, _encode({'error': str(exc)})
+        finally:
+            self.metrics.record(route, time.perf_counter() - t0, ok)
+
+    def cache_stats(self):
+        info = self._answer.cache_info()
+        lookups = info.hits + info.misses
+        return {'hits': info.hits, 'misses': info.misses, 'size': info.currsize, 'maxsize': info.maxsize,
+                'hit_rate': round(info.hits / lookups, 4) if lookups else None}
+
+    def metrics_body(self):
+        return _encode({**self.metrics.snapshot(), 'cache': self.cache_stats(), 'rows': len(self.store)})
+
+
+def make_handler(service):
+    index = _encode({'routes': [f'/{r}' for r in QUERIES] + ['/metrics'],
+                     'params': {'level': list(LEVELS), 'filters': list(FILTERS)}})
+
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status, body):
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Access-Control-Allow-Origin", "*")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            route = url.path.strip("/")
+            if route in QUERIES:
+                return self._send(*service.query(route, dict(parse_qsl(url.query))))
+            if route == "metrics":
+                return self._send(200, service.metrics_body())
+            if route == "":
+                return self._send(200, index)
+            return self._send(404, _encode({'error': f"rota desconhecida: {url.path}"}))
+
+        def log_message(self, fmt, *args):
+            pass
+
+    return Handler
+
+
+def serve_indicators(source, host="127.0.0.1", port=8081, cache_size=CACHE_SIZE):
+    """Carrega a base e responde em http://host:port/ até Ctrl+C."""
+    t0 = time.perf_counter()
+    service = QueryService(IndicatorStore.load(source), cache_size)
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    print(f"🗂️ Base carregada: {len(service.store)} setores em {time.perf_counter() - t0:.1f}s")
+    print(f"🌐 Servindo consultas em http://{host}:{port}/  (Ctrl+C para encerrar)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
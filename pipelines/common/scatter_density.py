@@ -0,0 +1,78 @@
+"""
+Dispersão com modo de densidade para grandes quantidades de pontos (scripts 04 e 05).
+
+`axes.scatter` desenha um marcador (com transparência) por setor; com centenas de milhares
+de setores, a renderização fica lenta e o PNG, sobreposto e pesado. Aqui o painel pode ser
+desenhado como:
+    - 'scatter' : um marcador por ponto (comportamento original);
+    - 'density' : histograma 2D pré-calculado (`np.histogram2d`) desenhado como imagem;
+    - 'hexbin'  : agregação hexagonal do matplotlib;
+    - 'auto'    : 'density' acima de `threshold` pontos, senão 'scatter'.
+
+No modo de densidade o custo de desenho depende só do número de células (bins), não do
+número de setores. Anotações (Pearson) e reta de tendência continuam a cargo do script.
+
+O matplotlib só é importado ao desenhar (`resolve_mode` e as constantes não dependem dele).
+"""
+
+import numpy as np
+
+SCATTER_MODES = ('auto', 'scatter', 'density', 'hexbin')
+
+# Acima deste número de pontos, o modo 'auto' passa a desenhar densidade
+DENSITY_THRESHOLD = 50_000
+
+# Resolução do histograma 2D (células por eixo) e do hexbin
+DENSITY_BINS = 200
+HEXBIN_GRIDSIZE = 80
+
+
+def _color_ramp(color):
+    """Rampa de cor do tom claro ao tom cheio da cor da raça."""
+    from matplotlib.colors import LinearSegmentedColormap, to_rgba
+
+    return LinearSegmentedColormap.from_list(
+        f"ramp_{color}", [to_rgba(color, 0.15), to_rgba(color, 1.0)]
+    )
+
+
+def resolve_mode(n_points, mode='auto', threshold=DENSITY_THRESHOLD):
+    """Modo efetivo de desenho para `n_points` pontos."""
+    if mode not in SCATTER_MODES:
+        raise ValueError(f"Modo inválido: {mode!r}. Use um de {SCATTER_MODES}.")
+    if mode == 'auto':
+        return 'density' if n_points > threshold else 'scatter'
+    return mode
+
+
+def scatter_or_density(ax, x, y, color, mode='auto', threshold=DENSITY_THRESHOLD,
+                       bins=DENSITY_BINS, alpha=0.5):
+    """
+    Desenha x × y no eixo `ax` como dispersão ou densidade; retorna o modo usado.
+    Pares com NaN são ignorados (como em `scatter`).
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    ok = np.isfinite(x) & np.isfinite(y)
+    mode = resolve_mode(int(ok.sum()), mode, threshold)
+
+    if mode == 'scatter' or not ok.any():
+        ax.scatter(x, y, color=color, alpha=alpha)
+        return 'scatter'
+
+    x, y = x[ok], y[ok]
+    cmap = _color_ramp(color)
+    if mode == 'hexbin':
+        ax.hexbin(x, y, gridsize=HEXBIN_GRIDSIZE, cmap=cmap, mincnt=1, bins='log', linewidths=0)
+        return 'hexbin'
+
+    from matplotlib.colors import LogNorm
+
+    counts, x_edges, y_edges = np.histogram2d(x, y, bins=bins)
+    counts = np.ma.masked_equal(counts.T, 0)
+    ax.imshow(
+        counts, origin='lower', aspect='auto', interpolation='nearest', cmap=cmap,
+        norm=LogNorm(vmin=1, vmax=max(1, counts.max())),
+        extent=[x_edges[0], x_edges[-1], y_edges[0], y_edges[-1]],
+    )
+    return 'density'
@@ -0,0 +1,236 @@
+"""
+Esquema tipado da base de setores (Setores_Indicadores / Setores_raca_renda /
+Cidades_Medias_Variaveis), aplicado na leitura e preservado na saída colunar (GeoParquet).
+
+    - nomes (NM_MUN, NM_UF, NM_REGIAO, …)         → category
+    - contagens (v0001, Brancos, Pretos, …)        → uint32 (UInt32 se houver ausentes)
+    - códigos IBGE (CD_UF, CD_MUN, CD_REGIAO)      → int32  (Int32 se houver ausentes)
+    - percentuais (P_Agua, P_Branca, TX_Alf_15, …) → float32
+    - Quintil                                      → Int8
+
+Lido de shapefile, cada nome vira um objeto str por setor e cada contagem um float64/int64;
+com o esquema, a memória de uma execução nacional cai para bem menos da metade, e
+groupbys sobre os códigos das categorias ficam muito mais rápidos. Colunas fora do esquema
+não são alteradas.
+
+As funções de leitura aceitam também a base já em memória (GeoDataFrame/DataFrame ou tabela
+Arrow), de modo que as etapas encadeadas num só processo (`pipelines/pipeline.py chain`) recebem o
+resultado da anterior sem gravar e reler arquivos.
+"""
+
+import os
+from pathlib import Path
+from urllib.parse import quote, unquote
+
+import numpy as np
+import pandas as pd
+
+from common.profiling import span
+
+CATEGORY_COLS = [
+    'NM_MUN', 'NM_UF', 'NM_REGIAO', 'NM_DIST', 'NM_SUBDIST', 'NM_BAIRRO',
+    'SITUACAO', 'CD_SIT', 'CD_SITU', 'SIGLA_UF',
+]
+COUNT_COLS = [
+    'v0001', 'v0002', 'v0003', 'v0004', 'v0007', 'PR',
+    'Brancos', 'Pretos', 'Amarelos', 'Pardos', 'Indigena', 'V01322',
+]
+CODE_COLS = ['CD_REGIAO', 'CD_UF', 'CD_MUN', 'CD_TIPO']
+PERCENT_COLS = [
+    'P_Agua', 'P_Esgo', 'P_Lixo',
+    'P_Branca', 'P_Preta', 'P_Amarela', 'P_Parda', 'P_Indigena',
+    'TX_Alf_15', 'v0006',
+]
+QUINTILE_COLS = ['Quintil']
+
+COLUMNAR_SUFFIXES = ('.parquet', '.geoparquet')
+
+_FILTER_OPS = {
+    '==': lambda s, v: s == v, '=': lambda s, v: s == v, '!=': lambda s, v: s != v,
+    '<': lambda s, v: s < v, '<=': lambda s, v: s <= v,
+    '>': lambda s, v: s > v, '>=': lambda s, v: s >= v,
+    'in': lambda s, v: s.isin(list(v)), 'not in': lambda s, v: ~s.isin(list(v)),
+}
+
+
+def _to_unsigned(s):
+    v = pd.to_numeric(s, errors='coerce')
+    valid = v.dropna()
+    if not ((valid >= 0).all() and np.array_equal(valid, valid.round())):
+        # contagens fracionárias (ex.: reagregadas por área) não cabem em inteiro
+        return v.astype('float32')
+    return v.round().astype('UInt32' if v.isna().any() else 'uint32')
+
+
+def _to_code(s):
+    v = pd.to_numeric(s, errors='coerce')
+    return v.astype('Int32') if v.isna().any() else v.astype('int32')
+
+
+def apply_sector_schema(df):
+    """Converte (no próprio objeto) as colunas conhecidas para os tipos do esquema e retorna `df`."""
+    for col in df.columns:
+        if col in CATEGORY_COLS:
+            if not isinstance(df[col].dtype, pd.CategoricalDtype):
+                df[col] = df[col].astype('category')
+        elif col in COUNT_COLS:
+            df[col] = _to_unsigned(df[col])
+        elif col in CODE_COLS:
+            df[col] = _to_code(df[col])
+        elif col in PERCENT_COLS:
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype('float32')
+        elif col in QUINTILE_COLS:
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype('Int8')
+    return df
+
+
+def is_columnar(path):
+    """GeoParquet (arquivo .parquet ou pasta de partições .parquet)?"""
+    return Path(path).suffix.lower() in COLUMNAR_SUFFIXES
+
+
+def is_in_memory(source):
+    """Base já carregada (DataFrame/GeoDataFrame ou tabela Arrow) em vez de caminho?"""
+    return isinstance(source, pd.DataFrame) or (hasattr(source, 'schema') and hasattr(source, 'column_names'))
+
+
+def _from_arrow(table):
+    import geopandas as gpd
+
+    if 'geometry' in table.column_names:
+        return gpd.GeoDataFrame.from_arrow(table)
+    return table.to_pandas()
+
+
+def filter_frame(df, filters):
+    """Aplica `filters` no formato do pyarrow (lista de (coluna, op, valor), em conjunção)."""
+    if not filters:
+        return df
+    mask = np.ones(len(df), dtype=bool)
+    for col, op, value in filters:
+        mask &= np.asarray(_FILTER_OPS[op](df[col], value), dtype=bool)
+    return df[mask]
+
+
+def sector_columns(path):
+    """Nomes das colunas da base, sem ler os dados."""
+    if is_in_memory(path):
+        return list(path.column_names if not isinstance(path, pd.DataFrame) else path.columns)
+    if is_columnar(path):
+        import pyarrow.dataset as ds
+
+        return list(ds.dataset(path, format='parquet', partitioning='hive').schema.names)
+    import geopandas as gpd
+
+    return list(gpd.read_file(path, rows=1, ignore_geometry=True).columns)
+
+
+def read_sectors(path, columns=None, ignore_geometry=False, filters=None):
+    """
+    Lê a base de setores (shapefile/GeoPackage ou GeoParquet) e aplica o esquema tipado.
+
+    `columns` limita as colunas lidas; `ignore_geometry=True` devolve um DataFrame sem
+    geometria (bem mais rápido para tabelas); `filters` (GeoParquet ou base em memória) é
+    repassado ao pyarrow para leitura por predicado/partição.
+
+    `path` pode ser a própria base em memória: o resultado é uma cópia rasa (as colunas não
+    são duplicadas; alterações no resultado não afetam a original).
+    """
+    import geopandas as gpd
+
+    source = 'memória' if is_in_memory(path) else str(path)
+    with span('read', path=source, filtered=bool(filters)) as step:
+        if is_in_memory(path):
+            df = path if isinstance(path, pd.DataFrame) else _from_arrow(path)
+            if filters:
+                df = filter_frame(df, filters).reset_index(drop=True)   # como na leitura do GeoParquet
+            if columns is not None:
+                keep = list(dict.fromkeys(list(columns) + ([] if ignore_geometry else ['geometry'])))
+                df = df[[c for c in keep if c in df.columns]]
+            if ignore_geometry and 'geometry' in df.columns:
+                df = pd.DataFrame(df.drop(columns='geometry'))
+            df = df.copy(deep=False)
+        elif is_columnar(path):
+            if ignore_geometry:
+                df = pd.read_parquet(path, columns=columns, filters=filters)
+                df = df.drop(columns=[c for c in ('geometry',) if c in df.columns])
+            else:
+                cols = None if columns is None else list(dict.fromkeys(list(columns) + ['geometry']))
+                df = gpd.read_parquet(path, columns=cols, filters=filters)
+        else:
+            df = gpd.read_file(path, columns=columns, ignore_geometry=ignore_geometry)
+        df = apply_sector_schema(df)
+        step.count(rows_out=len(df))
+    return df
+
+
+def write_sectors(gdf, path):
+    """Grava a base preservando os tipos (GeoParquet) ou, para outras extensões, via OGR."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with span('write', path=path, rows_in=len(gdf)):
+        if is_columnar(path):
+            gdf.to_parquet(path, index=False)
+        else:
+            gdf.to_file(path)
+
+
+def is_partitioned_dataset(path, by):
+    """True se `path` é uma pasta (possivelmente vazia) só com partições `<by>=…`."""
+    path = Path(path)
+    return path.is_dir() and all(d.is_dir() and d.name.startswith(f"{by}=") for d in path.iterdir())
+
+
+def write_partitioned(gdf, path, by):
+    """
+    Grava a base como GeoParquet particionado no estilo Hive (`<path>/<by>=<valor>/part-0.parquet`),
+    um arquivo por valor de `by`. A leitura com `read_sectors(path, filters=[(by, '==', v)])`
+    só abre a partição pedida. Setores sem `by` não têm partição e ficam de fora (com aviso):
+    uma partição de nulos (`__HIVE_DEFAULT_PARTITION__`) impediria o pyarrow de ler a base inteira
+    com `by` como categoria.
+
+    A base é gravada numa pasta temporária ao lado de `path` e só então substitui a anterior.
+    Uma pasta existente só é substituída se contiver apenas partições `<by>=…`; qualquer outro
+    conteúdo (ou um arquivo em `path`) interrompe a gravação, sem apagar nada.
+    """
+    import shutil
+
+    path = Path(path)
+    if path.exists() and not is_partitioned_dataset(path, by):
+        raise FileExistsError(f"{path} existe e não é uma base particionada por {by} "
+                              f"(pastas '{by}=…'); escolha outro destino ou remova-o.")
+    missing = gdf[by].isna().to_numpy()
+    if missing.any():
+        print(f"⚠️ {int(missing.sum())} setores sem {by} ficaram fora da base particionada {path}")
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.tmp-{os.getpid()}")
+    old = path.with_name(f".{path.name}.old-{os.getpid()}")
+    with span('write', path=path, partitioned_by=by, rows_in=len(gdf)) as step:
+        try:
+            n_parts = 0
+            for value, part in gdf.groupby(by, observed=True, sort=True):
+                part_dir = tmp / f"{by}={quote(str(value), safe='')}"
+                part_dir.mkdir(parents=True, exist_ok=True)
+                part.drop(columns=[by]).to_parquet(part_dir / "part-0.parquet", index=False)
+                n_parts += 1
+            tmp.mkdir(parents=True, exist_ok=True)           # base vazia: pasta vazia
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        # os.replace não sobrescreve pasta não vazia: a anterior sai primeiro e só é apagada no fim
+        if path.exists():
+            os.replace(path, old)
+        os.replace(tmp, path)
+        shutil.rmtree(old, ignore_errors=True)
+        step.count(partitions=n_parts)
+
+
+def partition_values(path, by):
+    """Valores de partição `by` presentes numa pasta Hive (sem ler os dados) ou na base em memória."""
+    if is_in_memory(path):
+        df = path if isinstance(path, pd.DataFrame) else _from_arrow(path)
+        return sorted(str(v) for v in pd.unique(df[by].dropna()))
+    prefix = f"{by}="
+    return sorted(unquote(d.name[len(prefix):]) for d in Path(path).iterdir()
+                  if d.is_dir() and d.name.startswith(prefix))
@@ -0,0 +1,142 @@
+"""
+Índices de segregação ponderados por população, por cidade/UF/região (script 12).
+
+Para cada grupo (município, UF, região, nacional) calcula:
+    Raça/cor (contagens Brancos, Pretos, Amarelos, Pardos, Indigena):
+        - D_<raça>   : índice de dissimilaridade da raça × demais
+                       D = ½ Σ_i | m_i/M − (t_i − m_i)/(T − M) |
+        - ISO_<raça> : isolamento  xPx = Σ_i (m_i/M)·(m_i/t_i)
+        - EXP_<raça> : exposição às demais raças  xPy = Σ_i (m_i/M)·((t_i − m_i)/t_i) = 1 − xPx
+        - H_raca     : índice de entropia multigrupo de Theil
+                       H = Σ_i t_i (E − E_i) / (T·E),  E = −Σ_r π_r ln π_r
+    Infraestrutura (P_Agua, P_Esgo, P_Lixo, com população com acesso = v0001 · P/100):
+        - ACC_<var>     : taxa de acesso do grupo (%)
+        - D_<var>       : dissimilaridade com × sem acesso
+        - ISO_SEM_<var> : isolamento da população sem acesso
+        - H_<var>       : Theil H binário (com/sem acesso)
+
+Implementação: uma ordenação por código de grupo e somas por segmento (`np.add.reduceat`)
+sobre os índices ordenados — duas passadas vetorizadas (totais do grupo → termos por setor →
+somas), sem laços Python por cidade. Escala para todos os municípios do Brasil.
+"""
+
+import numpy as np
+import pandas as pd
+
+from common.correlation_stats import INFRA, LEVELS, RACES, group_labels
+
+
+class SortedSegments:
+    """Índices de ordenação e inícios de segmento para um vetor de rótulos de grupo."""
+
+    def __init__(self, labels):
+        codes, uniques = pd.factorize(labels, sort=True)
+        valid = np.flatnonzero(codes >= 0)
+        self.order = valid[np.argsort(codes[valid], kind='stable')]
+        sorted_codes = codes[self.order]
+        self.starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]]) \
+            if len(sorted_codes) else np.array([], dtype=int)
+        self.segment = np.cumsum(np.r_[0, sorted_codes[1:] != sorted_codes[:-1]]) \
+            if len(sorted_codes) else np.array([], dtype=int)
+        self.labels = np.asarray(uniques, dtype=object)
+
+    def take(self, values):
+        """Valores (n,) ou (n, k) na ordem dos segmentos."""
+        return np.asarray(values)[self.order]
+
+    def sum(self, sorted_values):
+        """Soma por segmento de valores já ordenados → (grupos,) ou (grupos, k)."""
+        if len(self.starts) == 0:
+            return np.zeros((0,) + np.shape(sorted_values)[1:])
+        return np.add.reduceat(sorted_values, self.starts, axis=0)
+
+    def broadcast(self, group_values):
+        """Valor do grupo repetido para cada setor (na ordem dos segmentos)."""
+        return np.asarray(group_values)[self.segment]
+
+
+def _xlogx(p):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(p > 0, p * np.log(p), 0.0)
+
+
+def _binary_indices(seg, m, t):
+    """D, isolamento de m e exposição, para contagens ordenadas m ⊂ t (n, k)."""
+    M = seg.sum(m)
+    T = seg.sum(t)
+    Mi, Ti = seg.broadcast(M), seg.broadcast(T)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        d_terms = np.abs(m / Mi - (t - m) / (Ti - Mi))
+        share = np.where(t > 0, m / t, 0.0)
+        iso_terms = (m / Mi) * share
+        D = 0.5 * seg.sum(np.nan_to_num(d_terms))
+        ISO = seg.sum(np.nan_to_num(iso_terms))
+    D = np.where((M > 0) & (T - M > 0), D, np.nan)
+    ISO = np.where(M > 0, ISO, np.nan)
+    return M, T, D, ISO
+
+
+def _theil_h(seg, counts, total):
+    """Theil H multigrupo para contagens ordenadas (n, g) e total (n,)."""
+    T = seg.sum(total)
+    G = seg.sum(counts)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        E = -_xlogx(G / T[:, None]).sum(axis=1)
+        Ei = -_xlogx(np.where(total[:, None] > 0, counts / total[:, None], 0.0)).sum(axis=1)
+        Eg = seg.broadcast(E)
+        H = seg.sum(total * (Eg - Ei)) / (T * E)
+    return np.where((T > 0) & (E > 0), H, np.nan)
+
+
+def segregation_table(df, levels=None, races=RACES, infra=INFRA, pop_col='v0001'):
+    """
+    Tabela com uma linha por (escala, grupo) e os índices descritos no módulo.
+    Colunas ausentes (raças, infraestrutura, população) são simplesmente ignoradas.
+    """
+    if levels is None:
+        levels = {lv: cols for lv, cols in LEVELS.items()
+                  if cols is None or all(c in df.columns for c in cols)}
+    races = [r for r in races if r in df.columns]
+    infra = [c for c in infra if c in df.columns] if pop_col in df.columns else []
+
+    C = df[races].apply(pd.to_numeric, errors='coerce').astype('float64').fillna(0).to_numpy()
+    if infra:
+        pop = pd.to_numeric(df[pop_col], errors='coerce').astype('float64').fillna(0).to_numpy()
+        P = df[infra].apply(pd.to_numeric, errors='coerce').astype('float64').fillna(0).to_numpy()
+        access = pop[:, None] * np.clip(P, 0, 100) / 100
+
+    frames = []
+    for level, cols in levels.items():
+        seg = SortedSegments(group_labels(df, cols))
+        out = pd.DataFrame({'level': level, 'group': seg.labels})
+        out['n_setores'] = np.diff(np.r_[seg.starts, len(seg.order)]) if len(seg.order) else 0
+
+        if races:
+            c = seg.take(C)
+            t = c.sum(axis=1)
+            t_k = np.repeat(t[:, None], len(races), axis=1)
+            M, T, D, ISO = _binary_indices(seg, c, t_k)
+            out['pop_racas'] = T[:, 0]
+            for j, race in enumerate(races):
+                out[f'pop_{race}'] = M[:, j]
+                out[f'D_{race}'] = D[:, j]
+                out[f'ISO_{race}'] = ISO[:, j]
+                out[f'EXP_{race}'] = 1 - ISO[:, j]
+            out['H_raca'] = _theil_h(seg, c, t)
+
+        if infra:
+            p = seg.take(pop)
+            a = seg.take(access)
+            p_k = np.repeat(p[:, None], len(infra), axis=1)
+            without = p_k - a
+            A, T, _, _ = _binary_indices(seg, a, p_k)
+            _, _, D, ISO_SEM = _binary_indices(seg, without, p_k)
+            out[pop_col] = T[:, 0]
+            for j, col in enumerate(infra):
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    out[f'ACC_{col}'] = np.where(T[:, j] > 0, A[:, j] / T[:, j] * 100, np.nan)
+                out[f'D_{col}'] = D[:, j]
+                out[f'ISO_SEM_{col}'] = ISO_SEM[:, j]
+                out[f'H_{col}'] = _theil_h(seg, np.column_stack([a[:, j], without[:, j]]), p)
+        frames.append(out)
+    return pd.concat(frames, ignore_index=True)
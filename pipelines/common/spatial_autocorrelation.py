@@ -0,0 +1,174 @@
+"""
+Autocorrelação espacial por cidade: I de Moran global e LISA (Moran local), com inferência
+por permutação vetorizada e em lote para várias variáveis (script 13).
+
+Convenções (as mesmas do esda/PySAL):
+    - W padronizada por linha; z = x − média; m2 = Σ z² / (n − 1).
+    - I global = (n / S0) · zᵀWz / zᵀz.
+    - I local  = z_i · (Wz)_i / m2.
+    - Permutação global: embaralha z entre setores; todas as réplicas e variáveis são
+      avaliadas com um único produto esparso W @ Z (n × réplicas·variáveis), em lotes.
+    - Permutação local condicional: para cada setor i com k_i vizinhos, sorteia k_i valores
+      entre os demais n − 1 setores. Os setores são agrupados por k_i, e os mesmos índices
+      sorteados servem a todas as variáveis (um gather n × réplicas × k × variáveis por lote).
+    - Pseudo p-valor "folded": (min(maiores, P − maiores) + 1) / (P + 1).
+Valores ausentes são imputados pela média (z = 0) e contados em `n_missing`; o LISA desses
+setores fica NaN. Setores sem vizinhos (ilhas) também recebem LISA NaN.
+
+`analyze_city` é a tarefa por cidade executada nos processos de trabalho do script 13.
+"""
+
+import numpy as np
+import pandas as pd
+import shapely
+
+from common.spatial_weights import AdjacencyCache, row_standardize
+
+# Limite de elementos por lote nas permutações (controla memória)
+PERM_CHUNK_ELEMENTS = 20_000_000
+
+# Rótulos dos quadrantes do LISA (z, lag)
+QUADRANTS = {1: 'HH', 2: 'LH', 3: 'LL', 4: 'HL'}
+
+
+def _standardize(X):
+    X = np.asarray(X, dtype=float)
+    missing = ~np.isfinite(X)
+    means = np.nanmean(np.where(missing, np.nan, X), axis=0)
+    Z = np.where(missing, 0.0, X - means)
+    return Z, missing
+
+
+def _folded_p(larger, permutations):
+    larger = np.where(permutations - larger < larger, permutations - larger, larger)
+    return (larger + 1.0) / (permutations + 1.0)
+
+
+def moran_global(A, X, permutations=999, rng=None):
+    """
+    I de Moran global para as colunas de X (n × k) dada a matriz binária de contiguidade A.
+    Retorna dict de arrays (k,): I, EI, p_sim, z_sim, n_missing.
+    """
+    rng = np.random.default_rng(rng)
+    W = row_standardize(A).tocsr()
+    Z, missing = _standardize(X)
+    n, k = Z.shape
+    S0 = W.sum()
+    zz = (Z * Z).sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        I = (n / S0) * (Z * (W @ Z)).sum(axis=0) / zz
+
+    out = {'I': I, 'EI': np.full(k, -1.0 / (n - 1)), 'n_missing': missing.sum(axis=0)}
+    if permutations <= 0 or n < 3:
+        out.update(p_sim=np.full(k, np.nan), z_sim=np.full(k, np.nan))
+        return out
+
+    sims = np.empty((permutations, k))
+    step = max(1, PERM_CHUNK_ELEMENTS // max(1, n * k))
+    for start in range(0, permutations, step):
+        b = min(step, permutations - start)
+        perm = np.argsort(rng.random((b, n)), axis=1)          # b permutações de 0..n-1
+        Zp = Z[perm.T]                                         # (n, b, k)
+        Zp2 = Zp.reshape(n, b * k)
+        lag = (W @ Zp2).reshape(n, b, k)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            sims[start:start + b] = (n / S0) * (Zp * lag).sum(axis=0) / zz
+    larger = (sims >= I).sum(axis=0)
+    out['p_sim'] = _folded_p(larger, permutations)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        out['z_sim'] = (I - sims.mean(axis=0)) / sims.std(axis=0)
+    return out
+
+
+def moran_local(A, X, permutations=999, alpha=0.05, rng=None):
+    """
+    LISA para as colunas de X (n × k) dada a matriz binária de contiguidade A.
+    Retorna dict de arrays (n, k): Is, q (quadrante 1–4), p_sim e cluster
+    (HH/LH/LL/HL se p ≤ alpha; 'ns' = não significativo; 'nd' = ilha ou valor ausente).
+    """
+    rng = np.random.default_rng(rng)
+    W = row_standardize(A).tocsr()
+    Z, missing = _standardize(X)
+    n, k = Z.shape
+    m2 = (Z * Z).sum(axis=0) / (n - 1)
+    lag = W @ Z
+    with np.errstate(invalid='ignore', divide='ignore'):
+        Is = Z * lag / m2
+
+    card = np.diff(A.tocsr().indptr)
+    q = np.where(Z >= 0, np.where(lag >= 0, 1, 4), np.where(lag >= 0, 2, 3))
+    p = np.full((n, k), np.nan)
+
+    if permutations > 0 and n > 2:
+        for kc in np.unique(card[card > 0]):
+            kc = int(min(kc, n - 1))
+            obs = np.flatnonzero(np.minimum(card, n - 1) == kc)
+            # Rejeição só enquanto kc² ≤ n − 1: uma réplica sem repetição sai com probabilidade
+            # ≈ exp(−kc²/2n) ≥ 0,6. Acima disso (ex.: setor rural cercado de muitos pequenos),
+            # kc menores chaves aleatórias de n − 1 (argpartition), em tempo O(n) por réplica
+            dense = kc * kc > n - 1
+            per_obs = permutations * max(n - 1 if dense else kc, kc * k)
+            step = max(1, PERM_CHUNK_ELEMENTS // max(1, per_obs))
+            for start in range(0, len(obs), step):
+                idx = obs[start:start + step]
+                # kc vizinhos sorteados sem reposição entre os n − 1 demais setores
+                if dense:
+                    keys = rng.random((len(idx), permutations, n - 1))
+                    draws = np.argpartition(keys, kc - 1, axis=2)[:, :, :kc]
+                else:
+                    draws = _sample_without_replacement(rng, len(idx), permutations, n - 1, kc)
+                draws = draws + (draws >= idx[:, None, None])          # pula o próprio i
+                lag_p = Z[draws].mean(axis=2)                          # (m, P, k)
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    Ip = Z[idx][:, None, :] * lag_p / m2
+                larger = (Ip >= Is[idx][:, None, :]).sum(axis=1)
+                p[idx] = _folded_p(larger, permutations)
+
+    island = card == 0
+    Is[missing | island[:, None]] = np.nan
+    p[missing | island[:, None]] = np.nan
+    cluster = np.where(p <= alpha, np.vectorize(QUADRANTS.get)(q), 'ns')
+    cluster = np.where(np.isnan(p), 'nd', cluster)
+    return {'Is': Is, 'q': q, 'p_sim': p, 'cluster': cluster}
+
+
+def _sample_without_replacement(rng, m, permutations, population, kc):
+    """
+    Sorteio de kc índices distintos em [0, population) para m × permutations réplicas.
+    Rejeição vetorizada (só para kc² ≤ population, ver `moran_local`): re-sorteia apenas as
+    linhas com repetição.
+    """
+    draws = rng.integers(0, population, size=(m, permutations, kc))
+    if kc == 1:
+        return draws
+    while True:
+        s = np.sort(draws, axis=2)
+        dup = (s[:, :, 1:] == s[:, :, :-1]).any(axis=2)
+        if not dup.any():
+            return draws
+        draws[dup] = rng.integers(0, population, size=(int(dup.sum()), kc))
+
+
+def analyze_city(city, ids, wkb, X, variables, cache_dir, permutations, alpha, seed):
+    """Moran global + LISA de todas as variáveis de uma cidade (executado em subprocesso)."""
+    geoms = shapely.from_wkb(wkb)
+    A = AdjacencyCache(cache_dir).get(ids, geoms)
+
+    g = moran_global(A, X, permutations=permutations, rng=seed)
+    global_df = pd.DataFrame({
+        'city': city, 'variable': variables, 'n': len(ids),
+        'n_missing': g['n_missing'], 'I': g['I'], 'EI': g['EI'],
+        'z_sim': g['z_sim'], 'p_sim': g['p_sim'],
+    })
+
+    loc = moran_local(A, X, permutations=permutations, alpha=alpha, rng=seed)
+    k = len(variables)
+    local_df = pd.DataFrame({
+        'CD_SETOR': np.repeat(ids, k),
+        'city': city,
+        'variable': np.tile(variables, len(ids)),
+        'Is': loc['Is'].ravel(),
+        'p_sim': loc['p_sim'].ravel(),
+        'cluster': loc['cluster'].ravel(),
+    })
+    return global_df, local_df
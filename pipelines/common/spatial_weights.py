@@ -0,0 +1,82 @@
+"""
+Matriz de contiguidade (Queen) entre setores, construída com STRtree e cacheada em disco.
+
+A contiguidade Queen (setores que compartilham ao menos um ponto da fronteira) é obtida com
+uma única consulta em lote `STRtree.query(geoms, predicate="intersects")`, sem laços Python,
+e guardada como matriz esparsa CSR simétrica. O cache é um `.npz` por cidade, nomeado pelo
+hash dos CD_SETOR e das geometrias: se a malha da cidade muda, a matriz é reconstruída.
+"""
+
+import hashlib
+from pathlib import Path
+
+import numpy as np
+import shapely
+from scipy import sparse
+
+
+def queen_adjacency(geoms):
+    """Matriz binária n × n (CSR, simétrica, diagonal nula) de contiguidade Queen."""
+    geoms = np.asarray(geoms)
+    n = len(geoms)
+    tree = shapely.STRtree(geoms)
+    i, j = tree.query(geoms, predicate="intersects")
+    keep = i != j
+    i, j = i[keep], j[keep]
+    A = sparse.csr_matrix((np.ones(len(i)), (i, j)), shape=(n, n))
+    A = ((A + A.T) > 0).astype(float)
+    A.setdiag(0)
+    A.eliminate_zeros()
+    return A.tocsr()
+
+
+def row_standardize(A):
+    """Pesos padronizados por linha (cada linha soma 1; setores ilhados ficam com linha nula)."""
+    deg = np.asarray(A.sum(axis=1)).ravel()
+    with np.errstate(divide="ignore"):
+        inv = np.where(deg > 0, 1.0 / deg, 0.0)
+    return sparse.diags(inv) @ A
+
+
+def mesh_key(ids, geoms):
+    """Hash dos identificadores e das geometrias de uma malha (chave do cache)."""
+    h = hashlib.sha256()
+    h.update("\n".join(map(str, ids)).encode("utf-8"))
+    for wkb in shapely.to_wkb(np.asarray(geoms)):
+        h.update(wkb if wkb is not None else b"\x00")
+    return h.hexdigest()[:32]
+
+
+class AdjacencyCache:
+    """
+    Cache em disco das matrizes de contiguidade (uma por cidade).
+
+    Uso:
+        cache = AdjacencyCache("cache/adjacency")
+        A = cache.get(city_gdf["CD_SETOR"], city_gdf.geometry.values)
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def path_for(self, key):
+        return self.cache_dir / f"queen_{key}.npz"
+
+    def get(self, ids, geoms):
+        """Matriz da malha (lida do cache ou construída e gravada)."""
+        ids = np.asarray(ids).astype(str)
+        key = mesh_key(ids, geoms)
+        path = self.path_for(key)
+        if path.exists():
+            with np.load(path, allow_pickle=False) as z:
+                if np.array_equal(z["ids"], ids):
+                    return sparse.csr_matrix(
+                        (np.ones(len(z["indices"])), z["indices"], z["indptr"]),
+                        shape=(len(ids), len(ids)),
+                    )
+        A = queen_adjacency(geoms)
+        tmp = path.with_suffix(".tmp.npz")
+        np.savez_compressed(tmp, ids=ids, indptr=A.indptr, indices=A.indices)
+        tmp.replace(path)
+        return A
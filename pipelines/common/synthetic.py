@@ -0,0 +1,463 @@
+"""
+Malha censitária sintética para benchmarks e execuções offline (`pipelines/benchmark.py`).
+
+Gera, em escala configurável (de um município ao Brasil inteiro), os mesmos insumos brutos
+do pipeline, sem os arquivos do IBGE:
+    - setores 2022 (`BR_setores_CD2022.shp`): cobertura sem sobreposição, com CD_SETOR,
+      NM_MUN/CD_MUN, NM_UF/CD_UF, NM_REGIAO/CD_REGIAO, CD_SITU/SITUACAO, v0001…v0007 e
+      contagens por raça/cor (scripts 01 e 03);
+    - setores 2010 (`Pessoa_Renda_Resultado.shp`): malha mais grossa, deslocada e girada em
+      relação à de 2022 (interseções parciais no overlay do script 02), com `RpC`;
+    - setores 2000 (`Setores_2000.shp`): outra malha do mesmo tipo, com outro deslocamento,
+      para os crosswalks encadeados 2000 → 2010 → 2022 (`common/crosswalk.py`);
+    - agregados do IBGE (`Agregados_por_setores_caracteristicas_domicilio2_BR` e
+      `Agregados_por_setores_cor_ou_raca_BR`): CD_setor, colunas V e supressão 'X' nos
+      setores com poucos moradores/domicílios; XLSX com openpyxl, CSV (';') sem ele;
+    - oceano e massas d'água (camadas auxiliares dos scripts 10 e 15).
+
+Geometria: cada município é um bloco de células de um reticulado com vértices perturbados
+(polígonos irregulares com vértices compartilhados, como na malha real), com o núcleo urbano
+(CD_SITU 1) no centro e o anel rural (5/8) em volta. Municípios conurbados ficam lado a lado
+no mesmo reticulado, com franja urbana (CD_SITU 2) até a divisa, de modo que as manchas se
+tocam (contiguidade Queen do script 03). As aglomerações são empacotadas em faixas,
+ordenadas por região e UF.
+
+Atributos: população municipal log-normal, com 1/60 dos municípios entre 100 e 500 mil hab.
+na área urbana (proporção das 92 cidades médias); renda de 2010 como campo espacial (centro
+e um quadrante mais ricos que a periferia); composição racial e acesso à infraestrutura
+correlacionados à renda, a partir das proporções regionais aproximadas do Censo 2022.
+O resultado é determinado por (`n_municipalities`, `seed`).
+"""
+
+import json
+import math
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Escalas prontas → nº de municípios
+SCALES = {'cidade': 1, 'pequena': 60, 'regiao': 600, 'nacional': 5570}
+
+CRS = 'EPSG:4674'               # SIRGAS 2000 (malhas do IBGE)
+ORIGIN = (-60.0, -5.0)          # canto superior esquerdo do mosaico (lon, lat)
+CELL_DEG = 0.006                # lado da célula de 2022 (~650 m)
+CELL_2010 = 1.35                # lado da célula de 2010, em células de 2022
+ROTATION_2010 = 4.0             # rotação da malha de 2010 (graus)
+JITTER = 0.3                    # perturbação dos vértices (fração da célula)
+GAP = 2                         # células vazias entre aglomerações
+
+PEOPLE_PER_URBAN_SECTOR = 650
+PEOPLE_PER_RURAL_SECTOR = 350
+MID_SIZED_SHARE = 1 / 60
+CONURBATION_RATE = 0.08
+EMPTY_SECTOR_RATE = 0.03
+SUPPRESSION_MIN = 5             # agregados com menos moradores/domicílios → 'X'
+
+# (CD_UF, NM_UF, nº de municípios) — peso de cada UF no sorteio
+UFS = [
+    (11, 'Rondônia', 52), (12, 'Acre', 22), (13, 'Amazonas', 62), (14, 'Roraima', 15),
+    (15, 'Pará', 144), (16, 'Amapá', 16), (17, 'Tocantins', 139),
+    (21, 'Maranhão', 217), (22, 'Piauí', 224), (23, 'Ceará', 184), (24, 'Rio Grande do Norte', 167),
+    (25, 'Paraíba', 223), (26, 'Pernambuco', 185), (27, 'Alagoas', 102), (28, 'Sergipe', 75),
+    (29, 'Bahia', 417),
+    (31, 'Minas Gerais', 853), (32, 'Espírito Santo', 78), (33, 'Rio de Janeiro', 92), (35, 'São Paulo', 645),
+    (41, 'Paraná', 399), (42, 'Santa Catarina', 295), (43, 'Rio Grande do Sul', 497),
+    (50, 'Mato Grosso do Sul', 79), (51, 'Mato Grosso', 141), (52, 'Goiás', 246), (53, 'Distrito Federal', 1),
+]
+
+# CD_REGIAO → (NM_REGIAO, desvio da log-renda, proporções Brancos/Pretos/Amarelos/Pardos/Indígenas)
+REGIONS = {
+    1: ('Norte', -0.25, (0.20, 0.08, 0.004, 0.68, 0.036)),
+    2: ('Nordeste', -0.35, (0.26, 0.13, 0.004, 0.595, 0.011)),
+    3: ('Sudeste', 0.10, (0.49, 0.12, 0.005, 0.383, 0.002)),
+    4: ('Sul', 0.10, (0.73, 0.05, 0.004, 0.21, 0.006)),
+    5: ('Centro-Oeste', 0.05, (0.37, 0.10, 0.005, 0.515, 0.01)),
+}
+
+# Sensibilidade de cada raça/cor à renda local (log-proporção por desvio-padrão de renda)
+RACE_INCOME_SLOPE = np.array([0.9, -0.4, 0.5, -0.5, -0.3])
+RACE_COLS = ['Brancos', 'Pretos', 'Amarelos', 'Pardos', 'Indigena']
+RACE_CODES = ['V01317', 'V01318', 'V01319', 'V01320', 'V01321']
+
+DOMICILE_TABLE = 'Agregados_por_setores_caracteristicas_domicilio2_BR'
+RACE_TABLE = 'Agregados_por_setores_cor_ou_raca_BR'
+
+
+def _sigmoid(x):
+    return 1 / (1 + np.exp(-x))
+
+
+# -----------------------------------------------------------------------------
+# Municípios e aglomerações
+# -----------------------------------------------------------------------------
+def municipalities(n, rng):
+    """Tabela de municípios (UF, população urbana/rural, parâmetros de renda, aglomeração)."""
+    uf_codes = np.array([u[0] for u in UFS])
+    weights = np.array([u[2] for u in UFS], dtype=float)
+    uf = np.sort(rng.choice(uf_codes, size=n, p=weights / weights.sum()))   # ordem região → UF
+
+    pop = np.clip(rng.lognormal(9.4, 1.25, n), 800, 12e6)
+    urban_share = np.clip(0.55 + 0.1 * np.log10(pop / 5000), 0.3, 0.98)
+    urban = pop * urban_share
+    mid = rng.choice(n, size=max(1, round(n * MID_SIZED_SHARE)), replace=False)
+    urban[mid] = rng.uniform(120_000, 450_000, len(mid))
+    rural = np.where(np.isin(np.arange(n), mid), urban * rng.uniform(0.03, 0.15, n), pop - urban)
+
+    region = uf // 10
+    mun = pd.DataFrame({
+        'CD_UF': uf,
+        'CD_REGIAO': region,
+        'urban_pop': urban.round().astype(np.int64),
+        'rural_pop': rural.round().astype(np.int64),
+        'log_income': 6.3 + 0.15 * np.log10(pop / 1e4) + np.array([REGIONS[r][1] for r in region])
+                      + rng.normal(0, 0.12, n),
+        'rich_angle': rng.uniform(0, 2 * np.pi, n),
+    })
+    seq = mun.groupby('CD_UF').cumcount().to_numpy() + 1
+    mun['CD_MUN'] = mun['CD_UF'] * 100_000 + seq * 10 + seq % 10
+    mun['NM_MUN'] = [f"Município {s:04d} ({u})" for u, s in zip(mun['CD_UF'], seq)]
+
+    # Conurbação: mesmo UF que o anterior, até 3 municípios por aglomeração
+    joins = rng.random(n) < CONURBATION_RATE
+    agglo, size = np.zeros(n, dtype=np.int64), 1
+    for i in range(1, n):
+        if joins[i] and uf[i] == uf[i - 1] and size < 3:
+            agglo[i], size = agglo[i - 1], size + 1
+        else:
+            agglo[i], size = agglo[i - 1] + 1, 1
+    mun['agglomeration'] = agglo
+    return mun
+
+
+def _block(urban_pop, rural_pop):
+    """Lado do núcleo urbano (a) e do anel rural (r), em células."""
+    n_urban = max(1, math.ceil(urban_pop / PEOPLE_PER_URBAN_SECTOR))
+    n_rural = max(4, math.ceil(rural_pop / PEOPLE_PER_RURAL_SECTOR))
+    a = math.ceil(math.sqrt(n_urban))
+    r = max(1, math.ceil((math.sqrt(a * a + n_rural) - a) / 2))
+    return a, r
+
+
+def layout(mun):
+    """
+    Células de 2022 de cada município no reticulado da sua aglomeração e posição de cada
+    aglomeração no mosaico. Retorna (células, aglomerações): células com município, linha,
+    coluna e situação; aglomerações com origem (células) e dimensões.
+    """
+    cells, agglos = [], []
+    for agg_id, group in mun.groupby('agglomeration', sort=True):
+        blocks = [_block(u, r) for u, r in zip(group['urban_pop'], group['rural_pop'])]
+        sides = [a + 2 * r for a, r in blocks]
+        height = max(sides)
+        col0 = 0
+        for k, (i, (a, r), side) in enumerate(zip(group.index, blocks, sides)):
+            row0 = (height - side) // 2
+            rr, cc = np.divmod(np.arange(side * side), side)
+            core_rows = (rr >= r) & (rr < r + a)
+            core = core_rows & (cc >= r) & (cc < r + a)
+            fringe = np.zeros_like(core)
+            if k > 0:
+                fringe |= core_rows & (cc < r)                     # divisa com o anterior
+            if k < len(blocks) - 1:
+                fringe |= core_rows & (cc >= r + a)                # divisa com o seguinte
+            situ = np.where(core, 1, np.where(fringe, 2, 8))
+            cells.append(pd.DataFrame({
+                'mun': i, 'agglomeration': agg_id, 'row': row0 + rr, 'col': col0 + cc, 'situ': situ,
+                # posição relativa ao centro do núcleo, em metades do núcleo
+                'dx': (cc - r - a / 2 + 0.5) / (a / 2), 'dy': (rr - r - a / 2 + 0.5) / (a / 2),
+            }))
+            col0 += side
+        agglos.append((agg_id, height, col0))
+
+    # Empacotamento em faixas (largura ~ raiz da área total)
+    agglos = pd.DataFrame(agglos, columns=['agglomeration', 'height', 'width'])
+    total = ((agglos['height'] + GAP) * (agglos['width'] + GAP)).sum()
+    shelf_width = max(int(agglos['width'].max()), int(math.sqrt(total) * 1.2))
+    x = y = shelf = 0
+    origins = []
+    for h, w in zip(agglos['height'], agglos['width']):
+        if x and x + w > shelf_width:
+            x, y, shelf = 0, y + shelf + GAP, 0
+        origins.append((y, x))
+        x += w + GAP
+        shelf = max(shelf, h)
+    agglos[['row0', 'col0']] = np.array(origins)
+    return pd.concat(cells, ignore_index=True), agglos.set_index('agglomeration', drop=False)
+
+
+# -----------------------------------------------------------------------------
+# Geometrias
+# -----------------------------------------------------------------------------
+def _lattice_polygons(cells, agglos, rng):
+    """Quadriláteros das células com vértices perturbados (compartilhados entre vizinhas)."""
+    import shapely
+
+    coords = np.empty((len(cells), 5, 2))
+    for agg, rows in cells.groupby('agglomeration', sort=False).indices.items():
+        a = agglos.loc[agg]
+        nodes = rng.uniform(-JITTER, JITTER, (a['height'] + 1, a['width'] + 1, 2))
+        r = cells['row'].to_numpy()[rows]
+        c = cells['col'].to_numpy()[rows]
+        for k, (dr, dc) in enumerate(((0, 0), (0, 1), (1, 1), (1, 0), (0, 0))):
+            jitter = nodes[r + dr, c + dc]
+            coords[rows, k, 0] = ORIGIN[0] + (a['col0'] + c + dc + jitter[:, 0]) * CELL_DEG
+            coords[rows, k, 1] = ORIGIN[1] - (a['row0'] + r + dr + jitter[:, 1]) * CELL_DEG
+    return shapely.polygons(coords)
+
+
+def _income_field(mun, mun_idx, dx, dy):
+    """Log-renda esperada: nível do município + gradiente centro → periferia + quadrante rico."""
+    m = mun.iloc[mun_idx]
+    d = np.hypot(dx, dy)
+    angle = np.arctan2(dy, dx)
+    return (m['log_income'].to_numpy() + 0.6 * np.exp(-d ** 2)
+            + 0.3 * np.cos(angle - m['rich_angle'].to_numpy()) * np.minimum(d, 1))
+
+
+def sectors_2010(mun, cells, agglos, rng):
+    """Malha de 2010: células maiores, deslocadas e giradas sobre cada aglomeração, com `RpC`."""
+    import geopandas as gpd
+    import shapely
+
+    theta = np.deg2rad(ROTATION_2010)
+    rot = np.array([[np.cos(theta), -np.sin(theta)], [np.sin(theta), np.cos(theta)]])
+    frames = []
+    centers = cells.groupby('mun')[['row', 'col']].mean() + 0.5       # centro do bloco
+    core = np.array([_block(u, r)[0] for u, r in zip(mun['urban_pop'], mun['rural_pop'])])
+    for agg in agglos.itertuples():
+        # reticulado em coordenadas de células da aglomeração, girado em torno do centro
+        cy, cx = agg.height / 2, agg.width / 2
+        half = math.hypot(agg.height, agg.width) / 2 + CELL_2010
+        ticks = np.arange(-half, half, CELL_2010) + rng.uniform(0, CELL_2010, 2)[:, None]
+        u, v = np.meshgrid(ticks[0], ticks[1])
+        u, v = u.ravel(), v.ravel()
+        corners = np.stack([np.stack([u + du, v + dv], axis=-1)
+                            for du, dv in ((0, 0), (CELL_2010, 0), (CELL_2010, CELL_2010),
+                                           (0, CELL_2010), (0, 0))], axis=1) @ rot.T
+        mid = corners[:, :4].mean(axis=1)
+        inside = ((mid[:, 0] > -cx - 1) & (mid[:, 0] < cx + 1) & (mid[:, 1] > -cy - 1) & (mid[:, 1] < cy + 1))
+        corners, mid = corners[inside], mid[inside]
+        col, row = mid[:, 0] + cx, mid[:, 1] + cy
+
+        # município mais próximo (centro do bloco) e posição relativa ao seu núcleo
+        muns = cells.loc[cells['agglomeration'] == agg.agglomeration, 'mun'].unique()
+        c = centers.loc[muns]
+        dist = np.hypot(row[:, None] - c['row'].to_numpy(), col[:, None] - c['col'].to_numpy())
+        nearest = muns[dist.argmin(axis=1)]
+        a = core[nearest]
+        dx = (col - centers.loc[nearest, 'col'].to_numpy()) / (a / 2)
+        dy = (row - centers.loc[nearest, 'row'].to_numpy()) / (a / 2)
+        rpc = np.exp(_income_field(mun, nearest, dx, dy) + rng.normal(0, 0.25, len(nearest)))
+        rpc[rng.random(len(rpc)) < 0.02] = 0.0                 # setores sem renda declarada
+
+        xy = np.empty_like(corners)
+        xy[..., 0] = ORIGIN[0] + (agg.col0 + corners[..., 0] + cx) * CELL_DEG
+        xy[..., 1] = ORIGIN[1] - (agg.row0 + corners[..., 1] + cy) * CELL_DEG
+        frames.append(pd.DataFrame({'mun': nearest, 'RpC': rpc.round(2), 'geometry': shapely.polygons(xy)}))
+
+    out = pd.concat(frames, ignore_index=True)
+    seq = out.groupby('mun').cumcount().to_numpy()
+    codes = mun.loc[out['mun'], 'CD_MUN'].to_numpy()
+    out.insert(0, 'CD_GEOCODI', [f"{m:07d}05{s // 10000:02d}{s % 10000:04d}" for m, s in zip(codes, seq)])
+    return gpd.GeoDataFrame(out.drop(columns='mun'), geometry='geometry', crs=CRS)
+
+
+# -----------------------------------------------------------------------------
+# Atributos dos setores de 2022 e agregados
+# -----------------------------------------------------------------------------
+def _allocate(total, weights, groups, rng):
+    """Distribui `total[g]` pessoas entre as linhas de cada grupo proporcionalmente a `weights`."""
+    out = np.zeros(len(weights), dtype=np.int64)
+    for g, rows in pd.Series(groups).groupby(groups).indices.items():
+        w = weights[rows]
+        if w.sum() > 0:
+            out[rows] = rng.multinomial(int(total[g]), w / w.sum())
+    return out
+
+
+def sectors_2022(mun, cells, agglos, rng):
+    """
+    Setores de 2022 com identificação, população, domicílios e raça/cor, e as variáveis dos
+    agregados (água, esgoto, lixo) em colunas V auxiliares (ver `aggregate_tables`).
+    """
+    import geopandas as gpd
+
+    n = len(cells)
+    mun_idx = cells['mun'].to_numpy()
+    urban = cells['situ'].to_numpy() < 3
+    weights = rng.gamma(4.0, 1.0, n) * (rng.random(n) >= EMPTY_SECTOR_RATE)
+    pop = (_allocate(mun['urban_pop'].to_numpy(), np.where(urban, weights, 0), mun_idx, rng)
+           + _allocate(mun['rural_pop'].to_numpy(), np.where(urban, 0, weights), mun_idx, rng))
+
+    log_income = _income_field(mun, mun_idx, cells['dx'].to_numpy(), cells['dy'].to_numpy())
+    z = (log_income - mun['log_income'].to_numpy()[mun_idx]) / 0.35
+
+    # Raça/cor: proporções regionais deslocadas pela renda local
+    region = mun['CD_REGIAO'].to_numpy()[mun_idx]
+    base = np.array([REGIONS[r][2] for r in region])
+    shares = base * np.exp(RACE_INCOME_SLOPE[None, :] * z[:, None])
+    shares /= shares.sum(axis=1, keepdims=True)
+    shares = np.column_stack([shares * 0.998, np.full(n, 0.002)])       # + não declarados
+    shares = rng.gamma(shares * 60)                                     # Dirichlet por setor
+    shares /= shares.sum(axis=1, keepdims=True)
+    race = rng.multinomial(pop, shares)
+
+    # Domicílios
+    v0007 = np.rint(pop / rng.uniform(2.5, 3.3, n)).astype(np.int64)
+    v0003 = v0007 + rng.binomial(v0007, 0.12)
+    v0004 = (rng.random(n) < 0.02).astype(np.int64)
+    region_gap = np.where(region <= 2, -0.8, 0.0)
+    water = rng.binomial(v0007, _sigmoid(1.5 + 1.2 * z + 1.5 * urban + region_gap))
+    sewer = rng.binomial(v0007, _sigmoid(-0.5 + 1.4 * z + 1.2 * urban + 2 * region_gap))
+    sewer_rain = rng.binomial(v0007 - sewer, 0.08)
+    garbage = rng.binomial(v0007, _sigmoid(2.0 + z + 2.0 * urban + region_gap))
+
+    m = mun.iloc[mun_idx]
+    seq = cells.groupby('mun').cumcount().to_numpy()
+    cd_setor = [f"{c:07d}05{s // 10000:02d}{s % 10000:04d}" for c, s in zip(m['CD_MUN'], seq)]
+    situ = np.where(urban, cells['situ'].astype(str), np.where(rng.random(n) < 0.05, '5', '8'))
+
+    gdf = gpd.GeoDataFrame({
+        'CD_SETOR': cd_setor,
+        'SITUACAO': np.where(urban, 'Urbana', 'Rural'),
+        'CD_SITU': situ,
+        'CD_TIPO': 0,
+        'CD_REGIAO': region,
+        'NM_REGIAO': [REGIONS[r][0] for r in region],
+        'CD_UF': m['CD_UF'].to_numpy(),
+        'NM_UF': m['CD_UF'].map({u[0]: u[1] for u in UFS}).to_numpy(),
+        'CD_MUN': m['CD_MUN'].to_numpy(),
+        'NM_MUN': m['NM_MUN'].to_numpy(),
+        'v0001': pop,
+        'v0002': v0003 + v0004,
+        'v0003': v0003,
+        'v0004': v0004,
+        'v0005': np.round(np.divide(pop, v0007, out=np.zeros(n), where=v0007 > 0), 2),
+        'v0006': np.round(rng.uniform(0, 8, n), 2),
+        'v0007': v0007,
+        **{col: race[:, k] for k, col in enumerate(RACE_COLS)},
+        'V01322': race[:, 5],
+        # colunas dos agregados de domicílio (removidas da malha em `generate`)
+        'V00111': water, 'V00112': rng.binomial(v0007 - water, 0.5),
+        'V00309': sewer, 'V00310': sewer_rain, 'V00311': rng.binomial(v0007 - sewer - sewer_rain, 0.4),
+        'V00397': garbage, 'V00398': rng.binomial(v0007 - garbage, 0.3),
+    }, geometry=_lattice_polygons(cells, agglos, rng), crs=CRS)
+    gdf['AREA_KM2'] = gdf.geometry.to_crs(
+        "+proj=aea +lat_1=-5 +lat_2=-42 +lat_0=-25 +lon_0=-55 +x_0=0 +y_0=0 +ellps=GRS80 +units=m +no_defs"
+    ).area.to_numpy() / 1e6
+    return gdf
+
+
+DOMICILE_COLS = ['V0007', 'V00111', 'V00112', 'V00309', 'V00310', 'V00311', 'V00397', 'V00398']
+
+
+def aggregate_tables(sectors, rng):
+    """
+    Tabelas dos agregados por setor, como publicadas pelo IBGE: CD_setor numérico, colunas V
+    e 'X' nos setores com menos de `SUPPRESSION_MIN` domicílios/moradores (e em 0,5% dos
+    demais, ao acaso).
+    """
+    cd = sectors['CD_SETOR'].astype('int64').to_numpy()
+
+    def suppress(table, base):
+        hide = (base < SUPPRESSION_MIN) | (rng.random(len(table)) < 0.005)
+        cols = [c for c in table.columns if c != 'CD_setor']
+        table[cols] = table[cols].astype(object)
+        table.loc[hide, cols] = 'X'
+        return table
+
+    dom = pd.DataFrame({'CD_setor': cd, 'V0007': sectors['v0007'].to_numpy()})
+    for col in DOMICILE_COLS[1:]:
+        dom[col] = sectors[col].to_numpy()
+    race = pd.DataFrame({'CD_setor': cd, 'V0001': sectors['v0001'].to_numpy()})
+    for col, code in zip(RACE_COLS + ['V01322'], RACE_CODES + ['V01322']):
+        race[code] = sectors[col].to_numpy()
+    return {
+        DOMICILE_TABLE: suppress(dom, sectors['v0007'].to_numpy()),
+        RACE_TABLE: suppress(race, sectors['v0001'].to_numpy()),
+    }
+
+
+def auxiliary_layers(sectors, rng, n_lakes=None):
+    """Oceano (faixa a leste do mosaico) e lagos sobre algumas aglomerações."""
+    import geopandas as gpd
+    import shapely
+    from shapely.geometry import box
+
+    xmin, ymin, xmax, ymax = sectors.total_bounds
+    ocean = gpd.GeoDataFrame(geometry=[box(xmax - 0.05, ymin - 1, xmax + 3, ymax + 1)], crs='EPSG:4326')
+    n_lakes = n_lakes or max(1, len(sectors) // 2000)
+    centers = shapely.centroid(sectors.geometry.to_numpy()[rng.choice(len(sectors), n_lakes, replace=False)])
+    lakes = [p.buffer(CELL_DEG * rng.uniform(0.5, 2.5)) for p in centers]
+    water = gpd.GeoDataFrame({'nome': [f"Lago {i + 1}" for i in range(n_lakes)]}, geometry=lakes, crs='EPSG:4326')
+    return ocean, water
+
+
+# -----------------------------------------------------------------------------
+# Geração em disco
+# -----------------------------------------------------------------------------
+def _excel_available():
+    try:
+        import openpyxl  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def generate(out_dir, scale='pequena', n_municipalities=None, seed=0, aggregates_format='auto'):
+    """
+    Grava os insumos sintéticos em `out_dir` e retorna {nome: caminho}:
+    'sectors_2022', 'sectors_2010', 'excel_dir', 'ocean', 'water' (mesmos papéis de
+    SECTORS_2022_SHP, SECTORS_2010_SHP, EXCEL_DIR, OCEAN_SHP e WATER_BODIES_SHP em
+    `pipelines/pipeline.py`) e 'sectors_2000'. `n_municipalities` tem precedência sobre `scale`;
+    `aggregates_format` é 'xlsx', 'csv' ou 'auto' (xlsx se o openpyxl estiver instalado).
+    """
+    n = n_municipalities or SCALES[scale]
+    if aggregates_format == 'auto':
+        aggregates_format = 'xlsx' if _excel_available() else 'csv'
+        if aggregates_format == 'csv':
+            print("⚠️ openpyxl não instalado: agregados gravados em CSV (';'), também lidos pelo script 01.")
+
+    out = Path(out_dir)
+    paths = {
+        'sectors_2022': out / "BR_setores_CD2022.shp",
+        'sectors_2010': out / "Pessoa_Renda_Resultado.shp",
+        'sectors_2000': out / "Setores_2000.shp",
+        'excel_dir': out / "agregados_setores_2022",
+        'ocean': out / "auxiliary" / "ocean.shp",
+        'water': out / "auxiliary" / "water_bodies.shp",
+    }
+    for p in (paths['excel_dir'], paths['ocean'].parent):
+        p.mkdir(parents=True, exist_ok=True)
+
+    rng = np.random.default_rng(seed)
+    print(f"🧪 Gerando malha sintética: {n} municípios (seed={seed})…")
+    mun = municipalities(n, rng)
+    cells, agglos = layout(mun)
+    s22 = sectors_2022(mun, cells, agglos, rng)
+    s10 = sectors_2010(mun, cells, agglos, rng)
+    tables = aggregate_tables(s22, rng)
+    ocean, water = auxiliary_layers(s22, rng)
+    s00 = sectors_2010(mun, cells, agglos, rng)         # por último: não altera as demais malhas
+
+    s22.drop(columns=DOMICILE_COLS[1:]).to_file(paths['sectors_2022'])
+    s10.to_file(paths['sectors_2010'])
+    s00.to_file(paths['sectors_2000'])
+    for name, table in tables.items():
+        if aggregates_format == 'xlsx':
+            table.to_excel(paths['excel_dir'] / f"{name}.xlsx", index=False)
+        else:
+            table.to_csv(paths['excel_dir'] / f"{name}.csv", sep=';', index=False)
+    ocean.to_file(paths['ocean'])
+    water.to_file(paths['water'])
+
+    summary = {
+        'n_municipalities': n, 'seed': seed, 'aggregates_format': aggregates_format,
+        'sectors_2022': len(s22), 'sectors_2010': len(s10), 'sectors_2000': len(s00),
+        'agglomerations': len(agglos),
+        'population': int(s22['v0001'].sum()),
+    }
+    (out / "synthetic.json").write_text(json.dumps(summary, indent=2), encoding='utf-8')
+    print(f"✅ Setores 2022: {len(s22)} | setores 2010: {len(s10)} | população: {summary['population']:,}")
+    return paths
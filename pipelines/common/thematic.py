@@ -0,0 +1,213 @@
+"""
+Motor de mapas temáticos por município (scripts 10 e 15).
+
+Estado reaproveitado entre figuras e variáveis:
+    - `BaseMap`    → oceano e massas d'água indexados uma vez; o recorte de cada
+                     enquadramento (já convertido em paths) fica em memória, de modo que
+                     várias variáveis no mesmo município não recortam de novo;
+    - `RegionMaps` → partição da região com manchas urbanas (`common.urban_extents`),
+                     níveis de detalhe (`common.lod`) e buffers de vértices por nível
+                     (`common.batch_render`), todos independentes da variável mapeada;
+    - `PanelFigure` → figura 2 × 3 criada uma vez e limpa entre grupos de municípios.
+
+Cada painel recebe a classe de cada setor (0 = fundo) e uma paleta; os setores são
+desenhados numa única coleção, com as classes de maior índice por cima.
+
+O matplotlib só é importado quando há figura a desenhar (`PanelFigure.start`) ou paleta a
+calcular: execuções em que todos os painéis estão no cache não o carregam.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from common.basemap import ClippedLayer, expand_bounds, pixel_size
+from common.batch_render import MeshPaths, draw_paths, set_geographic_aspect
+from common.figure_cache import file_signature
+from common.lod import LODMesh, pick_level
+from common.profiling import span
+from common.correlation_stats import group_labels
+from common.urban_extents import UrbanExtents, key_columns
+
+# Paleta (mesmas cores dos mapas Q1 × Q5)
+BASE_COLOR = '#D6E6F2'
+LOWER_COLOR = '#EF7C80'    # vermelho (classe inferior)
+UPPER_COLOR = '#156E7A'    # verde petróleo (classe superior)
+OCEAN_COLOR = '#4e76b7'
+WATER_BODY_COLOR = '#4cc4d9'
+
+# Figura 18 × 12 com 2 × 3 painéis de 6 polegadas, 300 dpi
+PANEL_WIDTH_IN = 6
+PANELS_PER_FIGURE = 6
+DPI = 300
+
+
+def class_palette(k, highlight=None):
+    """
+    Cores [fundo, classe 1, …, classe k]: gradiente vermelho → azul claro → verde petróleo.
+    Classes fora de `highlight` (quando informado) ficam com a cor de fundo.
+    """
+    from matplotlib.colors import LinearSegmentedColormap, to_hex
+
+    cmap = LinearSegmentedColormap.from_list('classes', [LOWER_COLOR, BASE_COLOR, UPPER_COLOR])
+    colors = [to_hex(cmap(t)) for t in np.linspace(0, 1, k)] if k > 1 else [UPPER_COLOR]
+    if highlight is not None:
+        colors = [c if i + 1 in set(highlight) else BASE_COLOR for i, c in enumerate(colors)]
+    return np.array([BASE_COLOR] + colors)
+
+
+def sector_layers(classes, highlight=None):
+    """Classe de cada setor para desenho (0 = fundo: sem classe ou não destacada)."""
+    layers = pd.Series(classes).fillna(0).to_numpy(dtype=np.int64)
+    if highlight is not None:
+        layers = np.where(np.isin(layers, list(highlight)), layers, 0)
+    return layers
+
+
+class BaseMap:
+    """Oceano e massas d'água: índices únicos e recortes por enquadramento em memória."""
+
+    def __init__(self, ocean_shp, water_bodies_shp):
+        import geopandas as gpd
+
+        self.signature = file_signature(ocean_shp, water_bodies_shp)
+        self.layers = [
+            (ClippedLayer(gpd.read_file(path).to_crs(epsg=4326)), color)
+            for path, color in ((ocean_shp, OCEAN_COLOR), (water_bodies_shp, WATER_BODY_COLOR))
+        ]
+        self._views = {}
+
+    def clear(self):
+        """Descarta os recortes em memória (ex.: ao trocar de região)."""
+        self._views.clear()
+
+    def draw(self, ax, view, tolerance=None):
+        key = (tuple(view), tolerance)
+        if key not in self._views:
+            drawn = []
+            for layer, color in self.layers:
+                visible = layer.clip(view, tolerance=tolerance)
+                if not visible.empty:
+                    drawn.append((MeshPaths(visible.values).take(np.arange(len(visible))), color))
+            self._views[key] = drawn
+        for paths, color in self._views[key]:
+            draw_paths(ax, paths, color)
+
+
+class RegionMaps:
+    """
+    Setores de uma região prontos para desenho por município.
+
+    Uso:
+        maps = RegionMaps(region_data, region_path, lod_cache_dir, buffer_km=1)
+        maps.draw_panel(ax, basemap, 'Alfa - SP', layers, palette, title='(01) Alfa - SP')
+
+    Os municípios são identificados por NM_MUN + NM_UF (rótulo 'Alfa - SP'; só NM_MUN se a
+    base não tiver NM_UF), como em `common.classify` e `common.urban_extents`: homônimos de
+    UFs diferentes na mesma região viram painéis distintos.
+    """
+
+    def __init__(self, region_data, extents_dir, lod_cache_dir, buffer_km=1):
+        self.data = region_data
+        self.lod = LODMesh(region_data, lod_cache_dir)
+        self.extents = UrbanExtents.load_or_build(
+            region_data, os.path.join(extents_dir, "urban_extents.csv"), buffer_km=buffer_km
+        )
+        self.key_cols = key_columns(region_data)
+        self.labels = group_labels(region_data, self.key_cols)
+        self.rows = self.labels.groupby(self.labels).indices
+        self.municipalities = sorted(self.rows)
+        self._paths = {}
+
+    def name(self, municipality):
+        return self.data['NM_MUN'].iloc[self.rows[municipality][0]]
+
+    def uf(self, municipality):
+        return self.data['NM_UF'].iloc[self.rows[municipality][0]] if 'NM_UF' in self.data.columns else ''
+
+    def in_group(self, municipalities):
+        """Máscara dos setores dos municípios (rótulos) `municipalities`."""
+        return self.labels.isin(municipalities).to_numpy()
+
+    def paths(self, level):
+        """MeshPaths da região no nível de detalhe `level` (None = geometria original)."""
+        if level not in self._paths:
+            geoms = self.lod.geometry(level) if level is not None else self.data.geometry.values
+            self._paths[level] = MeshPaths(geoms)
+        return self._paths[level]
+
+    def draw_panel(self, ax, basemap, municipality, layers, palette, title,
+                   clip_margin=0.05, simplify=True):
+        """
+        Desenha o município no eixo (fundo, setores coloridos por `palette[layers]`, título e
+        enquadramento na mancha urbana). Retorna False se o município não tem extensão.
+        """
+        urban_bounds = self.extents.bounds(self.name(municipality), self.uf(municipality))
+        if not urban_bounds:
+            return False
+
+        # Camadas auxiliares: só as feições do retângulo visível (+ margem)
+        view = expand_bounds(urban_bounds, clip_margin)
+        tolerance = pixel_size(view, PANEL_WIDTH_IN, DPI) / 2 if simplify else None
+        basemap.draw(ax, view, tolerance)
+
+        # Setores no nível de detalhe do painel, numa só coleção (classes maiores por cima)
+        level = pick_level(tolerance, self.lod.levels) if simplify else None
+        rows = self.rows[municipality]
+        paths = self.paths(level)
+        order = paths.nonempty(rows[np.argsort(layers[rows], kind='stable')])   # cor ↔ Path alinhados
+        draw_paths(ax, paths.take(order), palette[layers[order]],
+                   edgecolors='gray', linewidth=0.1)
+
+        ax.set_title(title, fontsize=15, fontweight='bold')
+        ax.set_xlim([urban_bounds[0], urban_bounds[2]])
+        ax.set_ylim([urban_bounds[1], urban_bounds[3]])
+        set_geographic_aspect(ax, urban_bounds)
+        ax.axis("off")
+        return True
+
+
+class PanelFigure:
+    """Figura 2 × 3 única; `start` limpa os eixos para o próximo grupo e `save` grava o PNG."""
+
+    def __init__(self):
+        self.fig, self.axes, self._legend = None, None, None
+
+    def start(self, title):
+        if self.fig is None:
+            import matplotlib.pyplot as plt
+
+            self.fig, axes = plt.subplots(nrows=2, ncols=3, figsize=(18, 12))
+            self.axes = axes.ravel()
+        for ax in self.axes:
+            ax.cla()
+            ax.set_visible(True)
+        if self._legend is not None:
+            self._legend.remove()
+            self._legend = None
+        self.fig.suptitle(title, fontsize=26, fontweight='bold')
+        return self.axes
+
+    def legend(self, labels, colors):
+        from matplotlib.patches import Patch
+
+        handles = [Patch(facecolor=c, edgecolor='gray', linewidth=0.5, label=l) for l, c in zip(labels, colors)]
+        self._legend = self.fig.legend(handles=handles, loc='lower center', ncol=len(handles),
+                                       fontsize=14, frameon=False)
+
+    def save(self, filename, n_panels):
+        # Ocultar subplots vazios
+        for ax in self.axes[n_panels:]:
+            ax.set_visible(False)
+        self.fig.tight_layout()
+        self.fig.subplots_adjust(top=0.92, bottom=0.06 if self._legend is not None else None)
+        with span('write', path=filename):
+            self.fig.savefig(filename, dpi=DPI, bbox_inches='tight')
+
+    def close(self):
+        if self.fig is not None:
+            import matplotlib.pyplot as plt
+
+            plt.close(self.fig)
+            self.fig = None
@@ -0,0 +1,102 @@
+"""
+Servidor HTTP local mínimo para inspecionar um MBTiles de vector tiles (script 14).
+
+Rotas:
+    /                  → visualizador MapLibre (setores coloridos por Quintil)
+    /tiles.json        → TileJSON 3.0 (metadados + URL dos tiles)
+    /{z}/{x}/{y}.pbf   → tile gzip (204 se vazio)
+Apenas para uso local (sem autenticação); a biblioteca MapLibre é carregada de CDN pelo navegador.
+"""
+
+import json
+import re
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from common.mbtiles import MBTilesReader
+
+TILE_RE = re.compile(r"^/(\d+)/(\d+)/(\d+)\.pbf$")
+
+VIEWER_HTML = """<!doctype html>
+<html><head><meta charset="utf-8"><title>{name}</title>
+<link href="https://unpkg.com/maplibre-gl@4/dist/maplibre-gl.css" rel="stylesheet">
+<script src="https://unpkg.com/maplibre-gl@4/dist/maplibre-gl.js"></script>
+<style>html,body,#map{{margin:0;height:100%}}</style></head>
+<body><div id="map"></div><script>
+const map = new maplibre.Map({{
+  container: 'map', center: [{lon}, {lat}], zoom: {zoom},
+  style: {{version: 8, sources: {{
+      setores: {{type: 'vector', url: location.origin + '/tiles.json'}},
+      osm: {{type: 'raster', tiles: ['https://tile.openstreetmap.org/{{z}}/{{x}}/{{y}}.png'], tileSize: 256,
+             attribution: '© OpenStreetMap'}}}},
+    layers: [
+      {{id: 'osm', type: 'raster', source: 'osm', paint: {{'raster-opacity': 0.5}}}},
+      {{id: 'setores', type: 'fill', source: 'setores', 'source-layer': '{layer}',
+        paint: {{'fill-outline-color': '#808080', 'fill-opacity': 0.8,
+          'fill-color': ['match', ['get', 'Quintil'],
+            1, '#EF7C80', 2, '#F4B6B8', 3, '#D6E6F2', 4, '#8CC2C9', 5, '#156E7A', '#D6E6F2']}}}}]
+  }}
+}});
+map.on('click', 'setores', e => new maplibre.Popup().setLngLat(e.lngLat)
+  .setHTML('<pre>' + JSON.stringify(e.features[0].properties, null, 1) + '</pre>').addTo(map));
+</script></body></html>
+"""
+
+
+def make_handler(reader):
+    meta = reader.metadata()
+    layer = json.loads(meta.get("json", "{}")).get("vector_layers", [{}])[0].get("id", "setores")
+    lon, lat, zoom = (meta.get("center") or "0,0,2").split(",")
+
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status, body=b"", content_type="text/plain", headers=()):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Access-Control-Allow-Origin", "*")
+            for k, v in headers:
+                self.send_header(k, v)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            path = self.path.split("?", 1)[0]
+            m = TILE_RE.match(path)
+            if m:
+                data = reader.tile(*map(int, m.groups()))
+                if data is None:
+                    return self._send(204)
+                return self._send(200, data, "application/x-protobuf",
+                                  [("Content-Encoding", "gzip"), ("Cache-Control", "no-cache")])
+            if path == "/tiles.json":
+                host = self.headers.get("Host", "localhost")
+                tilejson = {
+                    "tilejson": "3.0.0", "name": meta.get("name", ""),
+                    "tiles": [f"http://{host}/{{z}}/{{x}}/{{y}}.pbf"],
+                    "minzoom": int(meta.get("minzoom", 0)), "maxzoom": int(meta.get("maxzoom", 14)),
+                    "bounds": [float(v) for v in meta.get("bounds", "-180,-85,180,85").split(",")],
+                    "vector_layers": json.loads(meta.get("json", "{}")).get("vector_layers", []),
+                }
+                return self._send(200, json.dumps(tilejson).encode("utf-8"), "application/json")
+            if path in ("/", "/index.html"):
+                html = VIEWER_HTML.format(name=meta.get("name", ""), lon=lon, lat=lat, zoom=zoom, layer=layer)
+                return self._send(200, html.encode("utf-8"), "text/html; charset=utf-8")
+            return self._send(404, b"not found")
+
+        def log_message(self, fmt, *args):
+            pass
+
+    return Handler
+
+
+def serve_mbtiles(path, host="127.0.0.1", port=8080):
+    """Serve o MBTiles em http://host:port/ até Ctrl+C."""
+    reader = MBTilesReader(path)
+    server = ThreadingHTTPServer((host, port), make_handler(reader))
+    print(f"🌐 Servindo {path} em http://{host}:{port}/  (Ctrl+C para encerrar)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        reader.close()
@@ -0,0 +1,165 @@
+"""
+Extensão da mancha urbana principal de cada município, calculada uma única vez para todos
+(script 10 e demais ferramentas consultam a tabela em vez de recalcular por renderização).
+
+Mesma regra usada antes por renderização no script 10 (`determine_main_urban_area`):
+    1. setores em EPSG:3857, com buffer de `buffer_km`;
+    2. componentes conexos dos buffers que se intersectam (dentro do município);
+    3. componente principal = maior área; o 2º é unido se estiver a ≤ `buffer_km`;
+    4. bbox da união em EPSG:4326.
+A tabela traz também o centroide da mancha principal (`cx`, `cy`, EPSG:4326): média dos
+centroides dos setores ponderada pela área, que é o centroide da união.
+Implementação: buffer vetorizado (shapely), uma consulta em lote no STRtree para a lista de
+arestas de todo o país e `scipy.sparse.csgraph.connected_components`; áreas e bboxes dos
+componentes por agregação (os setores não se sobrepõem), e uniões só dos dois maiores
+componentes de cada município (para a distância entre eles).
+
+Como 3857 → 4326 transforma x e y de forma independente e monotônica, a bbox em 4326 é
+exatamente a transformação dos cantos da bbox em 3857.
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import shapely
+from pyproj import Transformer
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+
+from common.correlation_stats import group_labels
+from common.spatial_weights import mesh_key
+
+# Colunas que identificam o município na tabela de extensões
+KEY_COLS = ['NM_MUN', 'NM_UF']
+
+EXTENT_COLS = ['minx', 'miny', 'maxx', 'maxy']
+CENTROID_COLS = ['cx', 'cy']
+
+
+def key_columns(df, key_cols=KEY_COLS):
+    """Colunas da chave do município presentes em `df` (ex.: sem NM_UF, só NM_MUN)."""
+    return [c for c in key_cols if c in df.columns]
+
+
+def compute_urban_extents(gdf, buffer_km=1, key_cols=KEY_COLS):
+    """
+    Tabela com uma linha por município: chave (`key_cols`, e CD_MUN se existir), bbox da
+    mancha principal em EPSG:4326 (minx, miny, maxx, maxy), seu centroide (cx, cy) e
+    estatísticas dos componentes.
+    """
+    key_cols = key_columns(gdf, key_cols)
+    metric = gdf.to_crs(epsg=3857)
+    geoms = np.asarray(metric.geometry.values)
+    mun = pd.factorize(group_labels(gdf, key_cols))[0]      # −1 = município não identificado
+    n = len(geoms)
+    d = buffer_km * 1000
+
+    # Grafo de contiguidade dos buffers (arestas só dentro do mesmo município)
+    buffered = shapely.buffer(geoms, d, quad_segs=16)
+    i, j = shapely.STRtree(buffered).query(buffered, predicate="intersects")
+    keep = (i != j) & (mun[i] == mun[j]) & (mun[i] >= 0)
+    G = sparse.csr_matrix((np.ones(int(keep.sum())), (i[keep], j[keep])), shape=(n, n))
+    _, comp = connected_components(G, directed=False)
+
+    # Área e bbox por componente (setores não se sobrepõem: área da união = soma)
+    bounds = shapely.bounds(geoms)
+    area = shapely.area(geoms)
+    centroids = shapely.centroid(geoms)
+    parts = pd.DataFrame({
+        'mun': mun, 'comp': comp, 'area': area,
+        'minx': bounds[:, 0], 'miny': bounds[:, 1], 'maxx': bounds[:, 2], 'maxy': bounds[:, 3],
+        'ax': area * shapely.get_x(centroids), 'ay': area * shapely.get_y(centroids),
+    })
+    parts = parts[parts['mun'] >= 0]
+    comps = parts.groupby('comp').agg(
+        mun=('mun', 'first'), n=('area', 'size'), area=('area', 'sum'),
+        minx=('minx', 'min'), miny=('miny', 'min'), maxx=('maxx', 'max'), maxy=('maxy', 'max'),
+        ax=('ax', 'sum'), ay=('ay', 'sum'),
+    )
+    comps = comps.sort_values(['mun', 'area'], ascending=[True, False], kind='stable')
+    comps['rank'] = comps.groupby('mun').cumcount()
+    first = comps[comps['rank'] == 0].set_index('mun')
+    second = comps[comps['rank'] == 1].set_index('mun')
+
+    # Distância entre os dois maiores componentes (uniões só desses dois)
+    members = pd.Series(comp).groupby(comp).indices       # posições em `geoms`
+    dist = pd.Series(np.nan, index=first.index)
+    c1_of = dict(zip(comps.loc[comps['rank'] == 0, 'mun'], comps.index[comps['rank'] == 0]))
+    c2_of = dict(zip(comps.loc[comps['rank'] == 1, 'mun'], comps.index[comps['rank'] == 1]))
+    for m, c2 in c2_of.items():
+        u1 = shapely.union_all(geoms[members[c1_of[m]]])
+        u2 = shapely.union_all(geoms[members[c2]])
+        dist[m] = u1.distance(u2)
+    joined = dist <= d
+
+    box = first[EXTENT_COLS].copy()
+    s = second[EXTENT_COLS].reindex(box.index)
+    box.loc[joined, ['minx', 'miny']] = np.minimum(box.loc[joined, ['minx', 'miny']], s.loc[joined, ['minx', 'miny']])
+    box.loc[joined, ['maxx', 'maxy']] = np.maximum(box.loc[joined, ['maxx', 'maxy']], s.loc[joined, ['maxx', 'maxy']])
+
+    # Centroide da mancha principal (com o 2º componente, se unido)
+    moments = first[['area', 'ax', 'ay']].copy()
+    moments.loc[joined] += second[['area', 'ax', 'ay']].reindex(moments.index).loc[joined]
+
+    to_wgs84 = Transformer.from_crs(3857, 4326, always_xy=True)
+    minx, miny = to_wgs84.transform(box['minx'].to_numpy(), box['miny'].to_numpy())
+    maxx, maxy = to_wgs84.transform(box['maxx'].to_numpy(), box['maxy'].to_numpy())
+    cx, cy = to_wgs84.transform((moments['ax'] / moments['area']).to_numpy(),
+                                (moments['ay'] / moments['area']).to_numpy())
+
+    keys = gdf[key_cols + (['CD_MUN'] if 'CD_MUN' in gdf.columns else [])][mun >= 0] \
+        .groupby(mun[mun >= 0]).first().reindex(box.index)
+    out = pd.DataFrame({
+        **{c: keys[c].astype(str).to_numpy() for c in keys.columns},
+        'minx': minx, 'miny': miny, 'maxx': maxx, 'maxy': maxy, 'cx': cx, 'cy': cy,
+        'n_setores': parts.groupby('mun').size().reindex(box.index).to_numpy(),
+        'n_componentes': comps.groupby('mun').size().reindex(box.index).to_numpy(),
+        'setores_principal': first['n'].to_numpy(),
+        'area_principal_km2': first['area'].to_numpy() / 1e6,
+        'area_segundo_km2': second['area'].reindex(box.index).to_numpy() / 1e6,
+        'dist_segundo_km': dist.reindex(box.index).to_numpy() / 1000,
+        'segundo_unido': joined.reindex(box.index).to_numpy(),
+    })
+    return out.reset_index(drop=True)
+
+
+class UrbanExtents:
+    """
+    Tabela de extensões persistida em CSV, reconstruída só quando a malha ou `buffer_km` mudam.
+
+    Uso:
+        extents = UrbanExtents.load_or_build(base_gdf, "outputs/cache/urban_extents.csv")
+        bounds = extents.bounds('Alfa', 'SP')   # (minx, miny, maxx, maxy) ou None
+    """
+
+    def __init__(self, table):
+        self.table = table
+        self.key_cols = key_columns(table)       # como em compute_urban_extents
+        n = len(self.key_cols)
+        self._index = {tuple(map(str, r[:n])): tuple(r[n:])
+                       for r in table[self.key_cols + EXTENT_COLS].itertuples(index=False)}
+
+    def bounds(self, *key):
+        """
+        Bbox (EPSG:4326) da mancha principal do município `key` (NM_MUN, NM_UF). Numa base sem
+        NM_UF, só o nome conta (a UF passada é ignorada).
+        """
+        return self._index.get(tuple(str(k) for k in key[:len(self.key_cols)]))
+
+    @classmethod
+    def load_or_build(cls, gdf, path, buffer_km=1):
+        path = Path(path)
+        ids = group_labels(gdf, key_columns(gdf, ['CD_SETOR'] + KEY_COLS))
+        key = f"{mesh_key(ids, gdf.geometry.values)}:{buffer_km}"
+        if path.exists():
+            table = pd.read_csv(path, dtype={c: str for c in KEY_COLS + ['CD_MUN']})
+            if len(table) and (table['mesh_key'] == key).all() and set(CENTROID_COLS) <= set(table.columns):
+                return cls(table)
+        table = compute_urban_extents(gdf, buffer_km=buffer_km)
+        table['mesh_key'] = key
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix('.tmp')
+        table.to_csv(tmp, index=False, encoding='utf-8')
+        tmp.replace(path)
+        return cls(table)
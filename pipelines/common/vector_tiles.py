@@ -0,0 +1,280 @@
+"""
+Geração de vector tiles (Mapbox Vector Tile 2.1) a partir da base de setores (script 14).
+
+Sem dependências além de numpy/shapely: a codificação protobuf do MVT é feita aqui
+(varints + campos delimitados), seguindo a especificação:
+    Tile   { repeated Layer layers = 3; }
+    Layer  { name = 1; features = 2; keys = 3; values = 4; extent = 5; version = 15; }
+    Feature{ id = 1; tags = 2 (packed); type = 3; geometry = 4 (packed); }
+    Value  { string = 1; double = 3; sint = 6; bool = 7; }
+
+Por tile (z, x, y), em EPSG:3857:
+    1. consulta no STRtree pelas feições que tocam o tile (+ `buffer` unidades);
+    2. recorte ao retângulo (`shapely.clip_by_rect`, vetorizado);
+    3. simplificação a 1 unidade do tile (tolerância adequada ao zoom);
+    4. quantização para a grade 0…extent e codificação (anéis externos em sentido horário
+       na grade do tile, internos anti-horário, como exige a especificação).
+Feições que colapsam na grade (área < 1 unidade²) são descartadas no tile.
+
+`init_worker`/`render_chunk` são o estado e a tarefa dos processos de trabalho do script 14;
+ficam aqui (e não no script) para que os processos os importem pelo nome do módulo.
+"""
+
+import gzip
+import math
+import struct
+
+import numpy as np
+import pandas as pd
+import shapely
+
+# Meia circunferência da projeção Web Mercator (m)
+ORIGIN_SHIFT = 20037508.342789244
+
+EXTENT = 4096
+BUFFER = 64
+
+GEOM_POLYGON = 3
+
+# Estado de cada processo de trabalho (preenchido uma vez por `init_worker`)
+_WORKER = {}
+
+
+# -----------------------------------------------------------------------------
+# Grade de tiles (XYZ)
+# -----------------------------------------------------------------------------
+def tile_size(z):
+    """Lado de um tile no zoom z (m, EPSG:3857)."""
+    return 2 * ORIGIN_SHIFT / (1 << z)
+
+
+def tile_bounds(z, x, y):
+    """(minx, miny, maxx, maxy) do tile em EPSG:3857 (y do esquema XYZ, origem no topo)."""
+    size = tile_size(z)
+    minx = -ORIGIN_SHIFT + x * size
+    maxy = ORIGIN_SHIFT - y * size
+    return (minx, maxy - size, minx + size, maxy)
+
+
+def tiles_for_bounds(bounds, z):
+    """
+    Tiles (x, y) do zoom z que cobrem as caixas `bounds` (n × 4, EPSG:3857).
+    Retorna array (m, 2) sem repetição.
+    """
+    bounds = np.asarray(bounds, dtype=float).reshape(-1, 4)
+    n = 1 << z
+    size = tile_size(z)
+    x0 = np.clip(np.floor((bounds[:, 0] + ORIGIN_SHIFT) / size), 0, n - 1).astype(np.int64)
+    x1 = np.clip(np.floor((bounds[:, 2] + ORIGIN_SHIFT) / size), 0, n - 1).astype(np.int64)
+    y0 = np.clip(np.floor((ORIGIN_SHIFT - bounds[:, 3]) / size), 0, n - 1).astype(np.int64)
+    y1 = np.clip(np.floor((ORIGIN_SHIFT - bounds[:, 1]) / size), 0, n - 1).astype(np.int64)
+    nx_, ny_ = x1 - x0 + 1, y1 - y0 + 1
+    count = nx_ * ny_
+    owner = np.repeat(np.arange(len(bounds)), count)
+    k = np.arange(count.sum()) - np.repeat(np.cumsum(count) - count, count)
+    xs = x0[owner] + k % nx_[owner]
+    ys = y0[owner] + k // nx_[owner]
+    return np.unique(np.column_stack([xs, ys]), axis=0)
+
+
+# -----------------------------------------------------------------------------
+# Protobuf mínimo
+# -----------------------------------------------------------------------------
+def _varint(value):
+    out = bytearray()
+    while True:
+        b = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(b | 0x80)
+        else:
+            out.append(b)
+            return bytes(out)
+
+
+def _zigzag(n):
+    return (n << 1) ^ (n >> 63)
+
+
+def _key(field, wire_type):
+    return _varint((field << 3) | wire_type)
+
+
+def _bytes_field(field, payload):
+    return _key(field, 2) + _varint(len(payload)) + payload
+
+
+def _varint_field(field, value):
+    return _key(field, 0) + _varint(value)
+
+
+def _packed(field, values):
+    return _bytes_field(field, b"".join(_varint(v) for v in values))
+
+
+def _value(v):
+    """Value do MVT (None/NaN não são codificados)."""
+    if isinstance(v, (bool, np.bool_)):
+        return _varint_field(7, int(v))
+    if isinstance(v, (int, np.integer)):
+        return _varint_field(6, _zigzag(int(v)))
+    if isinstance(v, (float, np.floating)):
+        return _key(3, 1) + struct.pack("<d", float(v))
+    return _bytes_field(1, str(v).encode("utf-8"))
+
+
+def _missing(v):
+    if v is None or v is pd.NA:
+        return True
+    return isinstance(v, (float, np.floating)) and math.isnan(v)
+
+
+# -----------------------------------------------------------------------------
+# Geometria → comandos MVT
+# -----------------------------------------------------------------------------
+def _ring_commands(ring, cursor):
+    """Comandos de um anel (sem o ponto de fechamento) a partir do cursor (x, y)."""
+    dx = np.diff(np.concatenate([[cursor[0]], ring[:, 0]]))
+    dy = np.diff(np.concatenate([[cursor[1]], ring[:, 1]]))
+    zz = np.column_stack([(dx << 1) ^ (dx >> 63), (dy << 1) ^ (dy >> 63)])
+    cmds = [(1 | (1 << 3)), int(zz[0, 0]), int(zz[0, 1]), (2 | ((len(ring) - 1) << 3))]
+    cmds.extend(int(v) for v in zz[1:].ravel())
+    cmds.append(7 | (1 << 3))
+    return cmds, (int(ring[-1, 0]), int(ring[-1, 1]))
+
+
+def _signed_area(ring):
+    x, y = ring[:, 0].astype(float), ring[:, 1].astype(float)
+    return 0.5 * (np.dot(x, np.roll(y, -1)) - np.dot(np.roll(x, -1), y))
+
+
+def _clean_ring(coords):
+    """Anel quantizado sem fechamento e sem pontos consecutivos repetidos (ou None)."""
+    ring = coords[:-1] if len(coords) > 1 and (coords[0] == coords[-1]).all() else coords
+    if len(ring) == 0:
+        return None
+    keep = np.ones(len(ring), dtype=bool)
+    keep[1:] = (np.diff(ring, axis=0) != 0).any(axis=1)
+    ring = ring[keep]
+    if len(ring) > 1 and (ring[0] == ring[-1]).all():
+        ring = ring[:-1]
+    if len(ring) < 3 or _signed_area(ring) == 0:
+        return None
+    return ring
+
+
+def polygon_commands(geom, to_tile):
+    """Comandos MVT de um (Multi)Polygon já em coordenadas do tile (função `to_tile`)."""
+    cmds, cursor = [], (0, 0)
+    parts = geom.geoms if geom.geom_type == "MultiPolygon" else [geom]
+    for poly in parts:
+        if poly.is_empty or poly.geom_type != "Polygon":
+            continue
+        ext = _clean_ring(to_tile(shapely.get_coordinates(poly.exterior)))
+        if ext is None:
+            continue
+        # Na grade do tile (y para baixo), anel externo com área positiva
+        if _signed_area(ext) < 0:
+            ext = ext[::-1]
+        c, cursor = _ring_commands(ext, cursor)
+        cmds.extend(c)
+        for interior in poly.interiors:
+            hole = _clean_ring(to_tile(shapely.get_coordinates(interior)))
+            if hole is None:
+                continue
+            if _signed_area(hole) > 0:
+                hole = hole[::-1]
+            c, cursor = _ring_commands(hole, cursor)
+            cmds.extend(c)
+    return cmds
+
+
+# -----------------------------------------------------------------------------
+# Tile
+# -----------------------------------------------------------------------------
+def encode_layer(name, features, extent=EXTENT):
+    """
+    Layer MVT. `features`: iterável de (id, comandos, {atributo: valor}).
+    Chaves e valores são deduplicados na camada.
+    """
+    keys, values = {}, {}
+    body = [_bytes_field(1, name.encode("utf-8"))]
+    for fid, cmds, props in features:
+        tags = []
+        for k, v in props.items():
+            if _missing(v):
+                continue
+            if isinstance(v, np.generic):
+                v = v.item()
+            ki = keys.setdefault(k, len(keys))
+            vi = values.setdefault((type(v).__name__, v), len(values))
+            tags.extend((ki, vi))
+        feat = _varint_field(1, int(fid))
+        if tags:
+            feat += _packed(2, tags)
+        feat += _varint_field(3, GEOM_POLYGON) + _packed(4, cmds)
+        body.append(_bytes_field(2, feat))
+    body.extend(_bytes_field(3, k.encode("utf-8")) for k in keys)
+    body.extend(_bytes_field(4, _value(v)) for (_, v) in values)
+    body.append(_varint_field(5, extent))
+    body.append(_varint_field(15, 2))
+    return b"".join(body)
+
+
+def render_tile(z, x, y, tree, geoms, attributes, layer_name, extent=EXTENT, buffer=BUFFER,
+                compress=True):
+    """
+    Tile (z, x, y) codificado (gzip se `compress`) ou None se vazio.
+
+    `geoms`: array de geometrias em EPSG:3857; `tree`: STRtree sobre `geoms`;
+    `attributes`: lista de dicts (um por feição) com os atributos a incluir.
+    """
+    minx, miny, maxx, maxy = tile_bounds(z, x, y)
+    unit = (maxx - minx) / extent
+    pad = buffer * unit
+    clip = (minx - pad, miny - pad, maxx + pad, maxy + pad)
+
+    idx = np.sort(tree.query(shapely.box(*clip), predicate="intersects"))
+    if len(idx) == 0:
+        return None
+    clipped = shapely.clip_by_rect(geoms[idx], *clip)
+    clipped = shapely.simplify(clipped, unit, preserve_topology=True)
+    visible = ~shapely.is_empty(clipped) & (shapely.area(clipped) >= unit * unit)
+    if not visible.any():
+        return None
+
+    def to_tile(coords):
+        px = np.rint((coords[:, 0] - minx) / unit).astype(np.int64)
+        py = np.rint((maxy - coords[:, 1]) / unit).astype(np.int64)
+        return np.column_stack([px, py])
+
+    features = []
+    for i, geom in zip(idx[visible], clipped[visible]):
+        cmds = polygon_commands(geom, to_tile)
+        if cmds:
+            features.append((i + 1, cmds, attributes[i]))
+    if not features:
+        return None
+    data = _bytes_field(3, encode_layer(layer_name, features, extent))
+    return gzip.compress(data, mtime=0) if compress else data
+
+
+# -----------------------------------------------------------------------------
+# Processos de trabalho
+# -----------------------------------------------------------------------------
+def init_worker(wkb, attributes, layer_name):
+    """Recebe a malha (WKB, EPSG:3857) uma única vez por processo e monta o STRtree."""
+    geoms = shapely.from_wkb(wkb)
+    _WORKER.update(geoms=geoms, tree=shapely.STRtree(geoms), attributes=attributes,
+                   layer_name=layer_name)
+
+
+def render_chunk(z, tiles):
+    """Renderiza um lote de tiles do zoom z; retorna [(z, x, y, dados)] só dos não vazios."""
+    out = []
+    for x, y in tiles:
+        data = render_tile(z, int(x), int(y), _WORKER['tree'], _WORKER['geoms'],
+                           _WORKER['attributes'], _WORKER['layer_name'])
+        if data is not None:
+            out.append((z, int(x), int(y), data))
+    return out
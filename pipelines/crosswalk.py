@@ -0,0 +1,128 @@
+# scripts/crosswalk.py
+"""
+Crosswalks entre malhas de setores de censos diferentes e harmonização de variáveis de
+qualquer ano para uma malha-alvo (ver `common/crosswalk.py`).
+
+Uso:
+    python pipelines/crosswalk.py register 2000 data/raw/Setores_2000.shp --id-col CD_GEOCODI --year 2000
+    python pipelines/crosswalk.py register 2010 data/raw/Pessoa_Renda_Resultado.shp --id-col CD_GEOCODI --year 2010
+    python pipelines/crosswalk.py register 2022 outputs/00_build_base/Setores_Indicadores_Censo_22.shp \\
+        --year 2022 --population-col v0001
+    python pipelines/crosswalk.py build 2000 2010               # overlay de cada par (uma vez)
+    python pipelines/crosswalk.py build 2010 2022
+    python pipelines/crosswalk.py harmonize 2000 2022 --columns RpC --out outputs/crosswalks/RpC_2000.parquet
+    python pipelines/crosswalk.py list
+
+`harmonize` usa o crosswalk direto em cache ou, na falta dele, compõe os do cache
+(2000 → 2010 → 2022) por produto de matrizes esparsas, sem novo overlay; só calcula um
+overlay se não houver caminho. As variáveis vêm do arquivo da malha de origem ou de
+`--table` (CSV/Parquet com a coluna de ID da origem). A saída tem o ID da malha-alvo e as
+colunas harmonizadas (CSV ou Parquet, pela extensão).
+
+Os pesos seguem os métodos do script 02 (`--method area|population|urban`; os dasimétricos
+usam a coluna de população ou a situação urbana da malha-alvo).
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Pacote compartilhado (pipelines/common)
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from common import profiling
+from common.areal_weights import METHODS
+from common.crosswalk import CrosswalkRegistry
+
+# >>>>>> PREENCHA AQUI <<<<<<
+REGISTRY_DIR = r"outputs/crosswalks"
+# <<<<<<<<<<<<<<<<<<<<<<<<<<<<
+
+
+def read_table(path, id_col):
+    import pandas as pd
+
+    path = Path(path)
+    if path.suffix.lower() in ('.parquet', '.geoparquet'):
+        df = pd.read_parquet(path)
+    else:
+        df = pd.read_csv(path, sep=None, engine='python', dtype={id_col: str})
+    return df.set_index(id_col)
+
+
+def write_table(df, path, id_col):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    df = df.rename_axis(id_col).reset_index()
+    if path.suffix.lower() in ('.parquet', '.geoparquet'):
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False, encoding='utf-8')
+
+
+def print_registry(registry):
+    print(f"🗂️ Registro: {registry.manifest_path}")
+    print("   Malhas:")
+    for name, info in sorted(registry.meshes.items()):
+        print(f"      {name:<10} ano={info['year'] or '-':<6} id={info['id_col']:<12} {info['path']}")
+    print("   Crosswalks:")
+    for key, entry in sorted(registry.crosswalks.items()):
+        how = "composição " + " → ".join(entry['composed_of']) if entry.get('composed_of') else "overlay"
+        state = "ok" if registry.is_fresh(key) else "desatualizado"
+        print(f"      {entry['source']} → {entry['target']} ({entry['method']}): {entry['nnz']} pesos, "
+              f"{how} [{state}]")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Crosswalks entre malhas censitárias (matrizes esparsas).")
+    ap.add_argument("--registry", default=REGISTRY_DIR, help="Pasta do registro e do cache de crosswalks.")
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    reg = sub.add_parser("register", help="Registra (ou atualiza) uma malha.")
+    reg.add_argument("name", help="Nome da malha (ex.: 2010).")
+    reg.add_argument("path", help="Shapefile/GeoPackage/GeoParquet da malha.")
+    reg.add_argument("--id-col", default="CD_SETOR", help="Coluna de ID dos setores (padrão: CD_SETOR).")
+    reg.add_argument("--year", type=int, help="Ano do censo.")
+    reg.add_argument("--population-col", help="Coluna de população (método 'population' com esta malha como alvo).")
+
+    build = sub.add_parser("build", help="Calcula (overlay) e grava o crosswalk direto de um par.")
+    build.add_argument("source")
+    build.add_argument("target")
+    build.add_argument("--method", default="area", choices=METHODS)
+    build.add_argument("--approx-cell", type=float, metavar="METROS",
+                       help="Rasteriza as malhas no lugar do overlay exato (ver script 02).")
+    profiling.add_profile_argument(build)
+
+    harm = sub.add_parser("harmonize", help="Leva variáveis da malha de origem à malha-alvo.")
+    harm.add_argument("source")
+    harm.add_argument("target")
+    harm.add_argument("--columns", nargs="+", required=True, help="Variáveis a harmonizar.")
+    harm.add_argument("--table", help="CSV/Parquet com as variáveis (padrão: atributos da malha de origem).")
+    harm.add_argument("--method", default="area", choices=METHODS)
+    harm.add_argument("--out", required=True, help="Saída (.csv ou .parquet).")
+    profiling.add_profile_argument(harm)
+
+    sub.add_parser("list", help="Mostra malhas e crosswalks registrados.")
+    args = ap.parse_args()
+    profiling.setup(args)
+
+    registry = CrosswalkRegistry(args.registry)
+    if args.command == "register":
+        registry.register_mesh(args.name, args.path, args.id_col, args.year, args.population_col)
+        print(f"✅ Malha registrada: {args.name} → {args.path}")
+    elif args.command == "build":
+        cw = registry.build(args.source, args.target, args.method, args.approx_cell)
+        print(f"✅ {cw}")
+    elif args.command == "harmonize":
+        values = None
+        if args.table:
+            values = read_table(args.table, registry.mesh(args.source)['id_col'])
+        out = registry.harmonize(args.source, args.target, args.columns, args.method, values)
+        write_table(out, args.out, registry.mesh(args.target)['id_col'])
+        print(f"✅ Salvo: {args.out} | setores {args.target}: {len(out)} | "
+              f"com valor: {int(out.notna().all(axis=1).sum())}")
+    else:
+        print_registry(registry)
+
+
+if __name__ == "__main__":
+    main()
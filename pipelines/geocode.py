@@ -0,0 +1,102 @@
+# scripts/geocode.py
+"""
+Associa registros pontuais (escolas, unidades de saúde, endereços…) ao setor censitário das
+cidades médias que os contém e aos indicadores do setor (ver `common/geocode.py`).
+
+Uso:
+    python pipelines/geocode.py escolas.csv --lon longitude --lat latitude --out escolas_setores.parquet
+    python pipelines/geocode.py enderecos.parquet --workers 4 --columns RpC_2010 Quintil --out enderecos.csv
+    python pipelines/geocode.py ubs.csv --prefix setor_ --out ubs_setores.csv   # entrada já tem NM_MUN…
+    python pipelines/geocode.py --build            # só (re)gera o índice em cache
+
+A entrada é CSV ou Parquet com coordenadas em graus (EPSG:4326). A saída (CSV ou Parquet,
+pela extensão) tem todas as colunas da entrada, na mesma ordem de linhas, mais `CD_SETOR` e
+os atributos do setor; pontos fora das cidades médias ficam com esses campos vazios. Se a
+entrada já tiver uma coluna com o nome de um atributo (NM_MUN, CD_SETOR, Quintil…, comum em
+cadastros de escolas e unidades de saúde), a execução para sem gravar nada: use `--prefix`
+(ex.: `setor_`) para anexar os atributos com outro nome ou `--columns` para escolhê-los.
+
+O índice dos setores é gravado em `INDEX_PATH` na 1ª execução e reaproveitado enquanto a
+base (`BASE`) não mudar. Arquivos grandes são lidos e consultados de uma vez, em lotes de
+`--chunk` pontos; com `--workers N`, os lotes são distribuídos entre N processos.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Pacote compartilhado (pipelines/common)
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from common import profiling
+from common.geocode import ATTRIBUTES, CHUNK, ID_COL, SectorIndex
+
+# >>>>>> PREENCHA AQUI <<<<<<
+BASE = r"outputs/00_build_base/cidades_medias/Cidades_Medias_Variaveis.parquet"
+INDEX_PATH = r"outputs/cache/geocode/setores_cidades_medias.parquet"
+LON_COL = "lon"
+LAT_COL = "lat"
+# <<<<<<<<<<<<<<<<<<<<<<<<<<<<
+
+
+def read_points(path):
+    import pandas as pd
+
+    path = Path(path)
+    if path.suffix.lower() in ('.parquet', '.geoparquet'):
+        return pd.read_parquet(path)
+    return pd.read_csv(path, sep=None, engine='python')
+
+
+def write_points(df, path):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.suffix.lower() in ('.parquet', '.geoparquet'):
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False, encoding='utf-8')
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Coordenadas → setor censitário → indicadores.")
+    ap.add_argument("input", nargs="?", help="CSV/Parquet com os pontos.")
+    ap.add_argument("--out", help="Saída (.csv ou .parquet).")
+    ap.add_argument("--lon", default=LON_COL, help=f"Coluna de longitude (padrão: {LON_COL}).")
+    ap.add_argument("--lat", default=LAT_COL, help=f"Coluna de latitude (padrão: {LAT_COL}).")
+    ap.add_argument("--columns", nargs="+", help="Atributos do setor a anexar (padrão: todos do índice).")
+    ap.add_argument("--prefix", default="", help="Prefixo dos atributos anexados (ex.: setor_).")
+    ap.add_argument("--base", default=BASE, help="Base de setores das cidades médias.")
+    ap.add_argument("--index", default=INDEX_PATH, help="Arquivo do índice em cache.")
+    ap.add_argument("--chunk", type=int, default=CHUNK, help=f"Pontos por lote (padrão: {CHUNK}).")
+    ap.add_argument("--workers", type=int, default=1, help="Processos paralelos (padrão: 1).")
+    ap.add_argument("--build", action="store_true", help="Só gera (ou valida) o índice.")
+    profiling.add_profile_argument(ap)
+    args = ap.parse_args()
+    profiling.setup(args)
+    if not args.build and not (args.input and args.out):
+        ap.error("informe a entrada e --out (ou use --build)")
+
+    t0 = time.perf_counter()
+    columns = ATTRIBUTES + [c for c in args.columns or [] if c not in ATTRIBUTES]
+    index = SectorIndex.load_or_build(args.base, args.index, columns)
+    print(f"🗂️ Índice: {args.index} | setores: {len(index)} | {time.perf_counter() - t0:.1f}s")
+    if args.build:
+        return
+
+    t0 = time.perf_counter()
+    points = read_points(args.input)
+    attached = [args.prefix + c for c in [ID_COL] + [c for c in args.columns or index.columns if c != ID_COL]]
+    clashes = [c for c in attached if c in points.columns]
+    if clashes:
+        sys.exit(f"❌ A entrada já tem as colunas {', '.join(clashes)}, que seriam sobrescritas pelos atributos "
+                 f"do setor. Use --prefix (ex.: --prefix setor_) ou --columns.")
+    found = index.lookup(points[args.lon], points[args.lat], args.columns, args.chunk, args.workers)
+    n_in = int(found[ID_COL].notna().sum())
+    out = points.reset_index(drop=True).join(found.add_prefix(args.prefix))
+    write_points(out, args.out)
+    print(f"✅ Salvo: {args.out} | pontos: {len(out)} | em setores: {n_in} | "
+          f"fora: {len(out) - n_in} | {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
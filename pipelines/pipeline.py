@@ -0,0 +1,266 @@
+# scripts/pipeline.py
+"""
+Executa o pipeline completo (01 → 17) como um grafo de etapas, pulando as que já estão
+atualizadas (ver `common/pipeline.py`).
+
+Uso:
+    python pipelines/pipeline.py run                      # todas as etapas desatualizadas
+    python pipelines/pipeline.py run 10_maps 15_atlas     # só essas (e o que elas exigem)
+    python pipelines/pipeline.py run --force 10_maps      # refaz a etapa 10 mesmo se atualizada
+    python pipelines/pipeline.py status                   # situação de cada etapa, sem executar
+    python pipelines/pipeline.py deps                     # confere os módulos de código de cada etapa
+    python pipelines/pipeline.py chain --checkpoint 03_select   # 01 → 17 num só processo
+
+Os caminhos dos dados brutos e a pasta de saída ficam no bloco abaixo; os demais caminhos
+são derivados de `OUTPUT_ROOT` e passados aos scripts por linha de comando. Etapas
+independentes (04–08, 11–13, 16, 17, 09 → 10/14/15) rodam em paralelo (`--jobs`); cada uma grava
+seu log em `OUTPUT_ROOT/logs/`. Ao final, o resumo mostra o tempo de cada etapa.
+
+Com `--profile [PASTA]`, cada etapa grava um relatório de tempos, memória e contagens por
+passo (JSON, CSV e Chrome trace; ver `common/profiling.py`).
+
+`chain` executa as mesmas etapas em sequência neste processo, passando a base de uma etapa
+para a seguinte em memória (01 → 02 → 03 → 04…15): os intermediários (indicadores 2022,
+base harmonizada, base das cidades médias, base de quintis) só são gravados para as etapas
+indicadas em `--checkpoint`. Os gráficos, tabelas e mapas são sempre gravados.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Pacote compartilhado (pipelines/common)
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from common import profiling
+from common.pipeline import Pipeline, Stage, check_code_dependencies, code_dependencies, load_script
+
+# >>>>>> PREENCHA AQUI <<<<<<
+# Dados brutos
+EXCEL_DIR = r"data/raw/agregados_setores_2022"          # Excel agregados do IBGE (script 01)
+SECTORS_2022_SHP = r"data/raw/BR_setores_CD2022.shp"    # malha de setores 2022 (Brasil)
+SECTORS_2010_SHP = r"data/raw/Pessoa_Renda_Resultado.shp"  # setores 2010 com renda (script 02)
+RPC_COL = "RpC"
+HARMONIZE_METHOD = "area"      # script 02: area | population | urban (ver common/areal_weights.py)
+
+# Camadas auxiliares dos mapas (scripts 10 e 15)
+OCEAN_SHP = r"data/auxiliary/ne_10m_ocean.shp"
+WATER_BODIES_SHP = r"data/auxiliary/geoft_bho_massa_dagua_v2019.shp"
+
+# Pasta-raiz das saídas (estado do pipeline em OUTPUT_ROOT/.pipeline_state.json)
+OUTPUT_ROOT = r"outputs"
+
+# Etapas em paralelo
+JOBS = 4
+# <<<<<<<<<<<<<<<<<<<<<<<<<<<<
+
+HERE = Path(__file__).resolve().parent
+
+
+# Etapas de análise: nome → (script em 02_analysis/, pasta de saída em OUTPUT_ROOT)
+ANALYSES = {
+    "04_corr_national": ("04_plot_correlation_national.py", "01_correlation_national"),
+    "05_corr_region": ("05_plot_correlation_by_region.py", "02_correlation_region"),
+    "06_infra_quintile": ("06_plot_access_infrastructure_quintile.py", "03_access_infra_quintile"),
+    "07_discrepancy": ("07_plot_discrepancy_by_region.py", "04_discrepancy_region"),
+    "08_participation": ("08_plot_participation_by_region.py", "05_participation_region"),
+    "11_corr_stats": ("11_export_correlation_statistics.py", "06_correlation_statistics"),
+    "12_segregation": ("12_compute_segregation_indices.py", "07_segregation_indices"),
+    "13_autocorrelation": ("13_compute_spatial_autocorrelation.py", "08_spatial_autocorrelation"),
+    "16_opportunity": ("16_compute_opportunity_distances.py", "11_opportunity_distance"),
+}
+
+# Etapas de análise com cache em disco: nome → chave de `stage_paths` (passada em `--cache-dir`)
+ANALYSIS_CACHES = {
+    "13_autocorrelation": 'adjacency_cache',
+    "16_opportunity": 'cache',
+}
+
+
+def stage_paths(root=OUTPUT_ROOT):
+    """Caminhos dos produtos intermediários e finais sob `root`."""
+    out = Path(root)
+    build_dir = out / "00_build_base"
+    return {
+        'build_dir': build_dir,
+        'indicators': build_dir / "Setores_Indicadores_Censo_22.shp",
+        'harmonized': build_dir / "Setores_raca_renda.parquet",
+        'cities_dir': build_dir / "cidades_medias",
+        'base': build_dir / "cidades_medias" / "Cidades_Medias_Variaveis.parquet",
+        'quintiles': out / "03_mapping" / "Cidades_Medias_Quintis.parquet",
+        'maps_dir': out / "03_mapping" / "maps",
+        'atlas_dir': out / "03_mapping" / "atlas",
+        'mbtiles': out / "09_vector_tiles" / "cidades_medias.mbtiles",
+        'hexgrid': out / "10_hexgrid" / "Cidades_Medias_Hex500.parquet",
+        'hexgrid_cache': out / "cache" / "hexgrid",
+        'adjacency_cache': out / "cache" / "adjacency",
+        'cache': out / "cache",
+    }
+
+
+def build_stages(root=OUTPUT_ROOT):
+    """Declaração das etapas: script, argumentos, entradas e saídas."""
+    out = Path(root)
+    paths = stage_paths(root)
+    build_dir, indicators, harmonized = paths['build_dir'], paths['indicators'], paths['harmonized']
+    cities_dir, base, quintiles = paths['cities_dir'], paths['base'], paths['quintiles']
+    maps_dir, atlas_dir, mbtiles = paths['maps_dir'], paths['atlas_dir'], paths['mbtiles']
+    hexgrid = paths['hexgrid']
+
+    def analysis(name):
+        script, output_dir = ANALYSES[name]
+        output = out / output_dir
+        argv = ["--input", base, "--out", output]
+        if name in ANALYSIS_CACHES:
+            argv += ["--cache-dir", paths[ANALYSIS_CACHES[name]]]
+        return Stage(name, HERE / "02_analysis" / script, argv, inputs=[base], outputs=[output])
+
+    return [
+        Stage("01_build", HERE / "01_build_base" / "01_build_indicators_from_excels.py",
+              ["--input-excel-dir", EXCEL_DIR, "--sectors-shp", SECTORS_2022_SHP, "--out-dir", build_dir],
+              inputs=[EXCEL_DIR, SECTORS_2022_SHP], outputs=[indicators]),
+        Stage("02_harmonize", HERE / "01_build_base" / "02_harmonize_renda_2010_to_2022.py",
+              ["--in-2022", indicators, "--in-2010", SECTORS_2010_SHP, "--rpc-col", RPC_COL,
+               "--method", HARMONIZE_METHOD, "--out", harmonized],
+              inputs=[indicators, SECTORS_2010_SHP], outputs=[harmonized]),
+        Stage("03_select", HERE / "01_build_base" / "03_select_mid_sized_cities_idsafe.py",
+              ["--in-2022", harmonized, "--out-dir", cities_dir],
+              inputs=[harmonized], outputs=[base]),
+
+        *[analysis(name) for name in ANALYSES],
+
+        Stage("09_quintiles", HERE / "03_mapping" / "09_select_quintiles_q1_q5.py",
+              ["--input", base, "--out", quintiles],
+              inputs=[base], outputs=[quintiles]),
+        Stage("10_maps", HERE / "03_mapping" / "10_plot_income_maps_grouped_by_region.py",
+              ["--input", quintiles, "--ocean", OCEAN_SHP, "--water", WATER_BODIES_SHP, "--out", maps_dir],
+              inputs=[quintiles, OCEAN_SHP, WATER_BODIES_SHP], outputs=[maps_dir]),
+        Stage("14_vector_tiles", HERE / "03_mapping" / "14_export_vector_tiles.py",
+              ["--input", quintiles, "--out", mbtiles],
+              inputs=[quintiles], outputs=[mbtiles]),
+        Stage("15_atlas", HERE / "03_mapping" / "15_plot_thematic_atlas.py",
+              ["--input", quintiles, "--ocean", OCEAN_SHP, "--water", WATER_BODIES_SHP,
+               "--out", atlas_dir, "--cache-dir", atlas_dir],
+              inputs=[quintiles, OCEAN_SHP, WATER_BODIES_SHP], outputs=[atlas_dir]),
+        Stage("17_hexgrid", HERE / "03_mapping" / "17_aggregate_hexgrid.py",
+              ["--input", base, "--out", hexgrid, "--cache-dir", paths['hexgrid_cache']],
+              inputs=[base], outputs=[hexgrid]),
+    ]
+
+
+def build_calls(root=OUTPUT_ROOT):
+    """
+    Etapas em memória para `Pipeline.chain`: nome → (função(resultados), gravação do checkpoint).
+    Cada função recebe {etapa: GeoDataFrame} das etapas anteriores e chama a API do script.
+    """
+    from common.schema import write_partitioned, write_sectors
+
+    out = Path(root)
+    paths = stage_paths(root)
+
+    def script(folder, filename):
+        return load_script(HERE / folder / filename)
+
+    def build(r):
+        return script("01_build_base", "01_build_indicators_from_excels.py").build_indicators(
+            SECTORS_2022_SHP, EXCEL_DIR)
+
+    def harmonize(r):
+        return script("01_build_base", "02_harmonize_renda_2010_to_2022.py").harmonize_income(
+            r["01_build"], SECTORS_2010_SHP, RPC_COL, HARMONIZE_METHOD)
+
+    def select(r):
+        return script("01_build_base", "03_select_mid_sized_cities_idsafe.py").select_mid_sized_cities(
+            r["02_harmonize"])
+
+    def quintiles(r):
+        return script("03_mapping", "09_select_quintiles_q1_q5.py").select_quintiles(r["03_select"])
+
+    def maps(r):
+        script("03_mapping", "10_plot_income_maps_grouped_by_region.py").plot_income_maps_grouped_by_region_unified(
+            r["09_quintiles"], OCEAN_SHP, WATER_BODIES_SHP, paths['maps_dir'])
+
+    def vector_tiles(r):
+        script("03_mapping", "14_export_vector_tiles.py").export_vector_tiles(r["09_quintiles"], paths['mbtiles'])
+
+    def atlas(r):
+        s15 = script("03_mapping", "15_plot_thematic_atlas.py")
+        s15.plot_thematic_atlas(r["09_quintiles"], OCEAN_SHP, WATER_BODIES_SHP, paths['atlas_dir'],
+                                s15.VARIABLES, cache_dir=paths['atlas_dir'])
+
+    def hexgrid(r):
+        return script("03_mapping", "17_aggregate_hexgrid.py").aggregate_hexgrid(
+            r["03_select"], paths['hexgrid'], cache_dir=paths['hexgrid_cache'])
+
+    def analysis(name):
+        filename, output_dir = ANALYSES[name]
+        cache = [paths[ANALYSIS_CACHES[name]]] if name in ANALYSIS_CACHES else []
+        return lambda r: script("02_analysis", filename).main(r["03_select"], out / output_dir, *cache)
+
+    calls = {
+        "01_build": (build, lambda gdf: write_sectors(gdf, paths['indicators'])),
+        "02_harmonize": (harmonize, lambda gdf: write_sectors(gdf, paths['harmonized'])),
+        "03_select": (select, lambda gdf: write_sectors(gdf, paths['base'])),
+        "09_quintiles": (quintiles, lambda gdf: write_partitioned(gdf, paths['quintiles'], 'NM_REGIAO')),
+        "10_maps": (maps, None),
+        "14_vector_tiles": (vector_tiles, None),
+        "15_atlas": (atlas, None),
+        "17_hexgrid": (hexgrid, None),
+    }
+    for name in ANALYSES:
+        calls[name] = (analysis(name), None)
+    return calls
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Pipeline completo com cache por etapa.")
+    ap.add_argument("--root", default=OUTPUT_ROOT, help="Pasta-raiz das saídas.")
+    sub = ap.add_subparsers(dest="command", required=True)
+    run = sub.add_parser("run", help="Executa as etapas desatualizadas.")
+    run.add_argument("stages", nargs="*", help="Etapas-alvo (padrão: todas).")
+    run.add_argument("--jobs", type=int, default=JOBS, help="Etapas em paralelo.")
+    run.add_argument("--force", action="store_true", help="Refaz as etapas-alvo mesmo se atualizadas.")
+    profiling.add_profile_argument(run)
+    status = sub.add_parser("status", help="Mostra a situação das etapas.")
+    status.add_argument("stages", nargs="*")
+    deps = sub.add_parser("deps", help="Confere os módulos de `common` na impressão digital de cada etapa.")
+    deps.add_argument("stages", nargs="*")
+    chain = sub.add_parser("chain", help="Executa as etapas neste processo, com as bases em memória.")
+    chain.add_argument("stages", nargs="*", help="Etapas-alvo (padrão: todas).")
+    chain.add_argument("--checkpoint", nargs="+", default=[], metavar="ETAPA",
+                       help="Etapas cujas bases intermediárias são gravadas (ex.: 03_select 09_quintiles).")
+    profiling.add_profile_argument(chain)
+    args = ap.parse_args()
+
+    pipe = Pipeline(build_stages(args.root), args.root)
+    if args.command == "chain":
+        profiling.setup(args)
+        pipe.chain(build_calls(args.root), args.stages or None, checkpoints=args.checkpoint)
+        return
+    if args.command == "deps":
+        # Módulos lidos do código × módulos carregados ao importar o script (não precisa dos dados)
+        unknown = set(args.stages) - set(pipe.stages)
+        if unknown:
+            raise KeyError(f"Etapas desconhecidas: {sorted(unknown)} (disponíveis: {list(pipe.stages)})")
+        failed = False
+        for name in args.stages or pipe.stages:
+            script = pipe.stages[name].script
+            modules = ", ".join(p.stem for p in code_dependencies(script)[1:])
+            missing = check_code_dependencies(script)
+            failed = failed or bool(missing)
+            flag = f"❌ faltam: {', '.join(missing)}" if missing else "✔"
+            print(f"{name:<28} {flag}  ({modules})")
+        if failed:
+            sys.exit(1)
+        return
+    if args.command == "status":
+        for name, situation in pipe.status(args.stages or None):
+            deps = ", ".join(pipe.deps[name]) or "-"
+            print(f"{name:<28} {situation:<14} (depende de: {deps})")
+        return
+
+    result = pipe.run(args.stages or None, jobs=args.jobs, force=args.force, profile=args.profile)
+    if any(status in ("falhou", "bloqueada") for status, _ in result.values()):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
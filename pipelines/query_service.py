@@ -0,0 +1,46 @@
+# scripts/query_service.py
+"""
+Serviço HTTP local de consultas sobre a base processada das cidades médias (ver
+`common/query_service.py`): resumos por município, UF ou região sem reexecutar os scripts.
+
+Uso:
+    python pipelines/query_service.py                       # http://127.0.0.1:8081/
+    python pipelines/query_service.py --input outputs/03_mapping/Cidades_Medias_Quintis.parquet --port 9000
+
+Exemplos de consulta:
+    curl "http://127.0.0.1:8081/participation?level=regiao"
+    curl "http://127.0.0.1:8081/infrastructure?level=municipio&uf=Bahia"
+    curl "http://127.0.0.1:8081/correlation?level=uf&regiao=Nordeste"
+    curl "http://127.0.0.1:8081/metrics"
+
+A base é lida uma única vez na partida; as respostas ficam num cache LRU de `--cache-size`
+consultas. Funciona sem internet e só escuta em `127.0.0.1`, salvo `--host`.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Pacote compartilhado (pipelines/common)
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from common.query_service import CACHE_SIZE, serve_indicators
+
+# >>>>>> PREENCHA AQUI <<<<<<
+INPUT = r"outputs/00_build_base/cidades_medias/Cidades_Medias_Variaveis.parquet"
+HOST = "127.0.0.1"
+PORT = 8081
+# <<<<<<<<<<<<<<<<<<<<<<<<<<<<
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Consultas agregadas sobre a base das cidades médias (HTTP local).")
+    ap.add_argument("--input", default=INPUT, help="Base de setores (shapefile ou GeoParquet).")
+    ap.add_argument("--host", default=HOST)
+    ap.add_argument("--port", type=int, default=PORT)
+    ap.add_argument("--cache-size", type=int, default=CACHE_SIZE, help="Respostas mantidas no cache LRU.")
+    args = ap.parse_args()
+    serve_indicators(args.input, args.host, args.port, args.cache_size)
+
+
+if __name__ == "__main__":
+    main()